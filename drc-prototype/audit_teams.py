@@ -1,24 +1,6 @@
 import json
-from difflib import SequenceMatcher
-
-def similarity(a, b):
-    """Calcule la similarité entre deux chaînes (0 à 1)"""
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
-
-def normalize_name(name):
-    """Normalise un nom pour améliorer le matching"""
-    replacements = {
-        'fc ': '', 'sc ': '', '1. ': '', '1899 ': '',
-        'vfb ': '', 'vfl ': '', 'fsv ': '',
-        ' fc': '', ' sc': '', ' cf': '',
-        'aek athens fc': 'aek',
-        'olympiakos piraeus': 'olympiakos',
-        'volos nfc': 'nfc volos',
-    }
-    name_lower = name.lower()
-    for old, new in replacements.items():
-        name_lower = name_lower.replace(old, new)
-    return name_lower.strip()
+from club_matcher import auto_match_clubs
+from match_records import iter_matches
 
 def create_manual_mappings():
     """Mappings manuels pour les cas difficiles"""
@@ -99,53 +81,6 @@ def create_manual_mappings():
         'Kayserispor': 'Kayseri',
     }
 
-def auto_match_clubs(history_clubs, elo_clubs, manual_mappings):
-    """Match automatique avec fallback sur similarité"""
-    mapping = {}
-    unmatched = []
-    
-    for hist_club in history_clubs:
-        # 1. Chercher dans les mappings manuels
-        if hist_club in manual_mappings:
-            mapping[hist_club] = manual_mappings[hist_club]
-            continue
-        
-        # 2. Chercher une correspondance exacte (insensible à la casse)
-        exact_match = None
-        for elo_club in elo_clubs:
-            if hist_club.lower() == elo_club.lower():
-                exact_match = elo_club
-                break
-        
-        if exact_match:
-            mapping[hist_club] = exact_match
-            continue
-        
-        # 3. Chercher par similarité normalisée
-        hist_normalized = normalize_name(hist_club)
-        best_match = None
-        best_score = 0.0
-        
-        for elo_club in elo_clubs:
-            elo_normalized = normalize_name(elo_club)
-            score = similarity(hist_normalized, elo_normalized)
-            
-            if score > best_score:
-                best_score = score
-                best_match = elo_club
-        
-        # Seuil de confiance à 0.7 (70% de similarité)
-        if best_score >= 0.7:
-            mapping[hist_club] = best_match
-        else:
-            unmatched.append({
-                'history': hist_club,
-                'best_elo_match': best_match,
-                'confidence': round(best_score, 2)
-            })
-    
-    return mapping, unmatched
-
 def generate_full_mapping():
     """Génère le mapping complet pour toutes les ligues"""
     
@@ -153,9 +88,6 @@ def generate_full_mapping():
     with open('current_elo.json', 'r', encoding='utf-8') as f:
         elo_data = json.load(f)
     
-    with open('history.json', 'r', encoding='utf-8') as f:
-        history_data = json.load(f)
-    
     manual_mappings = create_manual_mappings()
     
     full_mapping = {}
@@ -176,10 +108,11 @@ def generate_full_mapping():
     for league_id, league_name in leagues.items():
         print(f"\n🏆 Traitement : {league_name}")
         
-        # Récupérer les noms des clubs
-        history_clubs = [match['home'] for match in history_data.get(league_id, [])]
-        history_clubs += [match['away'] for match in history_data.get(league_id, [])]
-        history_clubs = sorted(list(set(history_clubs)))
+        # Récupérer les noms des clubs (lecture en flux de history_<id>.json)
+        history_clubs = set()
+        for match in iter_matches(league_id):
+            history_clubs.update((match.home_name, match.away_name))
+        history_clubs = sorted(history_clubs)
         
         elo_clubs = [team['club'] for team in elo_data.get(league_id, [])]
         
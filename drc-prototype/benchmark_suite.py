@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import clubelo_stub_server
+import club_matcher
+import dixon_coles
+import fetch_history_elo
+import instrumentation
+import market_pricer
+import match_table
+import model
+import prob_table
+import synthetic_league
+
+# Suite de benchmarks sur ligues synthétiques : chargement de la table de matchs,
+# évaluation d'un essai, appariement des clubs, construction de l'archive Elo (faux
+# ClubElo local) et pricing des marchés. Ce sont les fonctions du pipeline (model,
+# match_table, fetch_history_elo) qui sont chronométrées, pointées sur le dossier
+# généré. Les temps sont écrits en JSON avec l'environnement ; `compare` signale
+# les régressions face à une référence.
+#   python benchmark_suite.py run --leagues 9 --seasons 1
+#   python benchmark_suite.py compare --baseline benchmark_baseline.json
+
+RESULTS_FILE = 'benchmark_results.json'
+BASELINE_FILE = 'benchmark_baseline.json'
+REPEATS = 5
+REGRESSION_THRESHOLD = 0.20  # +20% sur le meilleur temps = régression
+BENCH_VERSION = 2
+
+
+def timed(fn, repeats=REPEATS, setup=None):
+    """ Médiane / meilleur temps de `repeats` appels ; renvoie (mesures, dernier résultat) """
+    times, result = [], None
+    for _ in range(repeats):
+        if setup: setup()
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return {'median': statistics.median(times), 'best': min(times), 'repeats': repeats}, result
+
+
+def environment():
+    """ Métadonnées de la machine et du code mesuré """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, timeout=10,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    try:
+        import scipy
+        scipy_version = scipy.__version__
+    except ImportError:
+        scipy_version = None
+    return {
+        'date': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy_version,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'git_commit': commit,
+    }
+
+
+def run_suite(work_dir, n_leagues=9, n_seasons=1, n_teams=synthetic_league.TEAMS_PER_LEAGUE, repeats=REPEATS):
+    """ Génère le jeu synthétique dans work_dir et chronomètre chaque étape """
+    start = time.perf_counter()
+    manifest = synthetic_league.generate(work_dir, n_leagues, n_seasons, n_teams)
+    generate_seconds = time.perf_counter() - start
+    leagues = manifest['leagues']
+    results = {}
+
+    # Les vraies fonctions du pipeline, pointées sur work_dir (données, caches et métriques)
+    cache_dir = os.path.join(work_dir, 'cache')
+    metrics_file = instrumentation.METRICS_FILE
+    if instrumentation.enabled():
+        instrumentation.METRICS_FILE = os.path.join(work_dir, 'metrics.jsonl')
+    server = None
+    try:
+        # 1. Table de matchs : construction à froid depuis les JSON, puis chargement depuis le cache + features
+        results['match_table_build'], _ = timed(
+            lambda: match_table.load_match_table(leagues, rebuild=True, data_dir=work_dir), max(1, repeats // 2))
+        results['load_all_matches'], table = timed(
+            lambda: model.load_all_matches(leagues=leagues, data_dir=work_dir, table_leagues=leagues), repeats)
+
+        # 2. Archive Elo : téléchargement (cache vidé à chaque passe), parsing et assemblage
+        server, base_url = clubelo_stub_server.start_stub_server(os.path.join(work_dir, synthetic_league.CLUBELO_DIR))
+        elo_cache = os.path.join(cache_dir, 'clubelo_bench')
+        rounds_by_league = fetch_history_elo.round_start_dates(leagues, data_dir=work_dir)
+        results['elo_archive_build'], archive = timed(
+            lambda: fetch_history_elo.build_archive(rounds_by_league, manifest['countries'], manifest['mapping'],
+                                                    elo_cache, base_url, rate=1e9),
+            max(1, repeats // 2), setup=lambda: shutil.rmtree(elo_cache, ignore_errors=True))
+        results['elo_archive_build']['dates'] = len(manifest['dates'])
+
+        # 3. Appariement des noms API-Football -> ClubElo (toutes ligues confondues)
+        history_clubs = sorted({str(name) for name in table['team_names']})
+        elo_clubs = [club for lid in leagues for club in manifest['mapping'][lid].values()]
+        results['auto_match_clubs'], (mapping, unmatched) = timed(
+            lambda: club_matcher.auto_match_clubs(history_clubs, elo_clubs, {}), repeats)
+        results['auto_match_clubs']['clubs'] = len(history_clubs)
+        results['auto_match_clubs']['unmatched'] = len(unmatched)
+
+        # 4. Évaluation d'un essai Optuna (log-loss sur tous les matchs évaluables)
+        data = model.build_match_arrays(table, archive)
+        params = {name: (low + high) / 2 for name, (low, high) in dixon_coles.PARAM_BOUNDS.items()}
+        results['evaluate_model'], _ = timed(lambda: model.evaluate_model(data, params), repeats)
+        results['evaluate_model']['matches'] = len(data['outcome'])
+
+        # 5. Pricing : tous les marchés, puis 1X2 / O2.5 / BTTS par la table précalculée
+        lh, la = dixon_coles.compute_lambdas(data['xg_h'], data['xg_a'], data['delta_elo'],
+                                             params['w_xg'], params['w_elo'], params['hfa'])
+        results['market_pricing'], _ = timed(lambda: market_pricer.price_markets(lh, la, params['rho']), repeats)
+        results['market_pricing']['fixtures'] = len(lh)
+        table_lookup = prob_table.load_table(table_path=os.path.join(cache_dir, 'prob_table.npy'),
+                                             spec_path=os.path.join(cache_dir, 'prob_table.json'))
+        results['prob_table_lookup'], _ = timed(lambda: table_lookup.lookup(lh, la, params['rho']), repeats)
+        results['prob_table_lookup']['fixtures'] = len(lh)
+    finally:
+        if server: server.shutdown()
+        instrumentation.METRICS_FILE = metrics_file
+
+    return {
+        'version': BENCH_VERSION,
+        'environment': environment(),
+        'scale': {'leagues': n_leagues, 'seasons': n_seasons, 'teams': n_teams,
+                  'matches': match_table.match_count(table)},
+        'generate_seconds': generate_seconds,
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """ [(benchmark, temps référence, temps actuel, ratio, régression ?)]
+
+    On compare les meilleurs temps : moins sensibles que la médiane au bruit de la machine.
+    """
+    rows = []
+    for name, entry in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None: continue
+        ratio = entry['best'] / base['best'] if base['best'] else float('inf')
+        rows.append((name, base['best'], entry['best'], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def write_json(data, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks du modèle sur ligues synthétiques")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help="Génère les données et chronomètre la suite")
+    run.add_argument('--leagues', type=int, default=9, help="Nombre de ligues (9 à 300)")
+    run.add_argument('--seasons', type=int, default=1, help="Nombre de saisons (1 à 10)")
+    run.add_argument('--teams', type=int, default=synthetic_league.TEAMS_PER_LEAGUE)
+    run.add_argument('--repeats', type=int, default=REPEATS)
+    run.add_argument('--output', default=RESULTS_FILE)
+    run.add_argument('--keep', help="Dossier où garder les données générées (sinon dossier temporaire)")
+    run.add_argument('--save-baseline', action='store_true', help=f"Copie aussi les résultats dans {BASELINE_FILE}")
+
+    cmp = sub.add_parser('compare', help="Compare des résultats à une référence")
+    cmp.add_argument('--baseline', default=BASELINE_FILE)
+    cmp.add_argument('--results', default=RESULTS_FILE)
+    cmp.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        work_dir = args.keep or tempfile.mkdtemp(prefix='drc_bench_')
+        try:
+            report = run_suite(work_dir, args.leagues, args.seasons, args.teams, args.repeats)
+        finally:
+            if not args.keep:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        scale = report['scale']
+        print(f"🧪 {scale['leagues']} ligues x {scale['seasons']} saison(s), {scale['matches']} matchs")
+        for name, entry in report['results'].items():
+            print(f"   ⏱️ {name:18s} médiane {entry['median'] * 1000:9.2f} ms (meilleur {entry['best'] * 1000:.2f} ms)")
+        write_json(report, args.output)
+        print(f"📁 Fichier créé : {args.output}")
+        if args.save_baseline:
+            write_json(report, BASELINE_FILE)
+            print(f"📁 Référence enregistrée : {BASELINE_FILE}")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.results, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+    if baseline['scale'] != current['scale']:
+        print(f"⚠️ Échelles différentes (référence {baseline['scale']}, actuel {current['scale']})")
+    regressions = 0
+    for name, base, now, ratio, regressed in compare(baseline, current, args.threshold):
+        flag = '❌' if regressed else '✅'
+        regressions += regressed
+        print(f"   {flag} {name:18s} {base * 1000:9.2f} ms -> {now * 1000:9.2f} ms (x{ratio:.2f})")
+    if regressions:
+        print(f"❌ {regressions} régression(s) au-delà de +{args.threshold:.0%}")
+        return 1
+    print("✅ Aucune régression.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+import argparse
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Registre des paris en SQLite (mode WAL) à la place des réécritures complètes de
+# bets_history.json / bets_pending.json par cash.js et kelly.js. Chaque pari est
+# une ligne ; les agrégats (global, par tier, par ligue) sont tenus à jour dans la
+# même transaction que l'écriture du pari, si bien que bankroll et PnL se lisent
+# en une requête sur clé primaire au lieu d'un parcours de tout l'historique. Un
+# règlement (tous les paris d'un match) est une transaction unique : un crash en
+# cours de route ne laisse jamais le registre à moitié écrit.
+
+LEDGER_FILE = 'bets_ledger.db'
+HISTORY_FILE = 'bets_history.json'
+PENDING_FILE = 'bets_pending.json'
+START_BANKROLL = 150.0  # Comme cash.js / kelly.js
+
+PENDING, WON, LOST, VOID = 'PENDING', 'WON', 'LOST', 'VOID'
+FINISHED = ('FT', 'AET', 'PEN')
+CANCELLED = ('PST', 'CANC', 'ABD')
+
+# Portées des agrégats : 'all' (clé ''), 'tier', 'league'
+SCOPES = ('all', 'tier', 'league')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bets (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    fixture_id  INTEGER NOT NULL,
+    date        TEXT,
+    league      TEXT,
+    match       TEXT,
+    pred        TEXT NOT NULL,
+    tier        TEXT,
+    score       REAL,
+    odd         REAL NOT NULL,
+    bookie      TEXT,
+    stake       REAL NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'PENDING',
+    ft_score    TEXT,
+    pnl         REAL,
+    result_date TEXT,
+    extra       TEXT,
+    UNIQUE (fixture_id, pred)
+);
+CREATE INDEX IF NOT EXISTS bets_status ON bets (status, fixture_id);
+CREATE TABLE IF NOT EXISTS aggregates (
+    scope       TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    bets        INTEGER NOT NULL DEFAULT 0,
+    pending     INTEGER NOT NULL DEFAULT 0,
+    pending_stake REAL NOT NULL DEFAULT 0,
+    settled     INTEGER NOT NULL DEFAULT 0,
+    wins        INTEGER NOT NULL DEFAULT 0,
+    staked      REAL NOT NULL DEFAULT 0,
+    pnl         REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, key)
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+BET_FIELDS = ('fixture_id', 'date', 'league', 'match', 'pred', 'tier', 'score', 'odd', 'bookie', 'stake',
+              'status', 'ft_score', 'pnl', 'result_date')
+
+
+def connect(path=LEDGER_FILE, start_bankroll=START_BANKROLL):
+    """ Connexion en autocommit (transactions explicites), WAL, schéma créé au besoin """
+    conn = sqlite3.connect(path, isolation_level=None, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('start_bankroll', ?)", (str(start_bankroll),))
+    return conn
+
+
+@contextmanager
+def transaction(conn):
+    """ BEGIN IMMEDIATE ... COMMIT, ROLLBACK sur exception """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+
+def _bump(conn, bet, bets=0, pending=0, pending_stake=0.0, settled=0, wins=0, staked=0.0, pnl=0.0):
+    """ Ajoute des deltas aux trois agrégats du pari (global, tier, ligue) """
+    for scope, key in (('all', ''), ('tier', bet['tier'] or ''), ('league', bet['league'] or '')):
+        conn.execute("""
+            INSERT INTO aggregates (scope, key, bets, pending, pending_stake, settled, wins, staked, pnl)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (scope, key) DO UPDATE SET
+                bets = bets + excluded.bets, pending = pending + excluded.pending,
+                pending_stake = pending_stake + excluded.pending_stake, settled = settled + excluded.settled,
+                wins = wins + excluded.wins, staked = staked + excluded.staked, pnl = pnl + excluded.pnl
+        """, (scope, key, bets, pending, pending_stake, settled, wins, staked, pnl))
+
+
+def _settled_deltas(bet):
+    """ Contribution d'un pari réglé aux agrégats (un VOID ne compte ni en mise ni en PnL) """
+    if bet['status'] == VOID:
+        return {'settled': 1}
+    return {'settled': 1, 'wins': int(bet['status'] == WON), 'staked': bet['stake'], 'pnl': bet['pnl'] or 0.0}
+
+
+def _insert(conn, bet):
+    """ Insère un pari (ignoré s'il existe déjà) ; renvoie True si ajouté """
+    row = {name: bet.get(name) for name in BET_FIELDS}
+    row['status'] = row['status'] or PENDING
+    extra = {k: v for k, v in bet.items() if k not in BET_FIELDS and k != 'id'}
+    cur = conn.execute(f"""
+        INSERT OR IGNORE INTO bets ({', '.join(BET_FIELDS)}, extra)
+        VALUES ({', '.join('?' * len(BET_FIELDS))}, ?)
+    """, [row[name] for name in BET_FIELDS] + [json.dumps(extra) if extra else None])
+    if cur.rowcount != 1:
+        return False
+    if row['status'] == PENDING:
+        _bump(conn, row, bets=1, pending=1, pending_stake=row['stake'])
+    else:
+        _bump(conn, row, bets=1, **_settled_deltas(row))
+    return True
+
+
+def from_js(bet):
+    """ Pari au format kelly.js / cash.js (id = fixture) -> champs du registre """
+    bet = dict(bet)
+    bet['fixture_id'] = bet.get('fixture_id', bet.get('id'))
+    for name in ('score', 'odd', 'stake', 'pnl'):
+        if bet.get(name) is not None:
+            bet[name] = float(bet[name])
+    return bet
+
+
+def add_bets(conn, bets):
+    """ Nouveaux paris en attente ; un doublon (même match, même pronostic) est ignoré
+
+    saveBets (kelly.js) dédoublonne sur le seul id du match. Le registre garde un pari par
+    pronostic : kelly_engine peut miser plusieurs issues d'un même match.
+    """
+    with transaction(conn):
+        return sum(_insert(conn, from_js(b)) for b in bets)
+
+
+def bet_result(pred, goals_h, goals_a):
+    winner = 'Home' if goals_h > goals_a else 'Away' if goals_a > goals_h else 'Draw'
+    return WON if pred == winner else LOST
+
+
+def settle_fixture(conn, fixture_id, status, goals_h=None, goals_a=None, result_date=None):
+    """ Règle atomiquement tous les paris en attente d'un match ; renvoie les paris réglés
+
+    status : statut API-Football (FT / AET / PEN -> gagné ou perdu, PST / CANC / ABD -> VOID).
+    """
+    if status not in FINISHED and status not in CANCELLED:
+        return []
+    result_date = result_date or datetime.now(timezone.utc).isoformat()
+    settled = []
+    with transaction(conn):
+        pending = conn.execute("SELECT * FROM bets WHERE status = ? AND fixture_id = ?",
+                               (PENDING, fixture_id)).fetchall()
+        for row in pending:
+            bet = dict(row)
+            if status in FINISHED:
+                bet['status'] = bet_result(bet['pred'], goals_h, goals_a)
+                bet['pnl'] = round(bet['stake'] * bet['odd'] - bet['stake'] if bet['status'] == WON
+                                   else -bet['stake'], 2)
+                bet['ft_score'] = f"{goals_h}-{goals_a}"
+            else:
+                bet['status'], bet['pnl'], bet['ft_score'] = VOID, 0.0, status
+            bet['result_date'] = result_date
+            conn.execute("UPDATE bets SET status = ?, pnl = ?, ft_score = ?, result_date = ? WHERE id = ?",
+                         (bet['status'], bet['pnl'], bet['ft_score'], bet['result_date'], bet['id']))
+            _bump(conn, bet, pending=-1, pending_stake=-bet['stake'], **_settled_deltas(bet))
+            settled.append(bet)
+    return settled
+
+
+def start_bankroll(conn):
+    return float(conn.execute("SELECT value FROM meta WHERE key = 'start_bankroll'").fetchone()[0])
+
+
+def aggregate(conn, scope='all', key=''):
+    """ Agrégat d'une portée (lecture par clé primaire) ; zéros si inconnu """
+    row = conn.execute("SELECT * FROM aggregates WHERE scope = ? AND key = ?", (scope, key)).fetchone()
+    if row is None:
+        return {'scope': scope, 'key': key, 'bets': 0, 'pending': 0, 'pending_stake': 0.0,
+                'settled': 0, 'wins': 0, 'staked': 0.0, 'pnl': 0.0}
+    return dict(row)
+
+
+def current_bankroll(conn):
+    """ Capital de départ + PnL réglé, jamais négatif (calculateCurrentBankroll) """
+    return max(start_bankroll(conn) + aggregate(conn)['pnl'], 0.0)
+
+
+def breakdown(conn, scope):
+    """ Agrégats de toutes les clés d'une portée ('tier' ou 'league') """
+    return [dict(r) for r in conn.execute("SELECT * FROM aggregates WHERE scope = ? ORDER BY pnl DESC", (scope,))]
+
+
+def pending_bets(conn):
+    return [dict(r) for r in conn.execute("SELECT * FROM bets WHERE status = ? ORDER BY date", (PENDING,))]
+
+
+def rebuild_aggregates(conn):
+    """ Recalcule les agrégats depuis les paris (contrôle ou réparation) """
+    with transaction(conn):
+        conn.execute("DELETE FROM aggregates")
+        for row in conn.execute("SELECT * FROM bets").fetchall():
+            bet = dict(row)
+            if bet['status'] == PENDING:
+                _bump(conn, bet, bets=1, pending=1, pending_stake=bet['stake'])
+            else:
+                _bump(conn, bet, bets=1, **_settled_deltas(bet))
+
+
+def import_json(conn, history_path=HISTORY_FILE, pending_path=PENDING_FILE):
+    """ Import unique (rejouable sans doublon) des fichiers JSON de cash.js / kelly.js """
+    counts = {}
+    with transaction(conn):
+        for name, path in (('history', history_path), ('pending', pending_path)):
+            bets = []
+            if path and os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    bets = json.load(f)
+            counts[name] = sum(_insert(conn, from_js(b)) for b in bets)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Registre des paris (SQLite)")
+    parser.add_argument('--db', default=LEDGER_FILE)
+    sub = parser.add_subparsers(dest='command', required=True)
+    imp = sub.add_parser('import', help="Importe bets_history.json et bets_pending.json")
+    imp.add_argument('--history', default=HISTORY_FILE)
+    imp.add_argument('--pending', default=PENDING_FILE)
+    sub.add_parser('summary', help="Bankroll et PnL par tier / ligue")
+    settle = sub.add_parser('settle', help="Règle les paris d'un match")
+    settle.add_argument('--fixture', type=int, required=True)
+    settle.add_argument('--status', default='FT', help="FT / AET / PEN ou PST / CANC / ABD")
+    settle.add_argument('--score', help="Score final domicile-extérieur, ex. 2-1")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.command == 'import':
+        counts = import_json(conn, args.history, args.pending)
+        print(f"✅ Import : {counts['history']} paris réglés, {counts['pending']} en attente -> {args.db}")
+    elif args.command == 'settle':
+        goals = [int(g) for g in args.score.split('-')] if args.score else [None, None]
+        if args.status in FINISHED and None in goals:
+            parser.error("--score est requis pour un match terminé")
+        for bet in settle_fixture(conn, args.fixture, args.status, *goals):
+            print(f"   {'✅' if bet['status'] == WON else '❌' if bet['status'] == LOST else '⚠️'} "
+                  f"{bet['match']} : {bet['status']} ({bet['pnl']:+.2f} €)")
+
+    total = aggregate(conn)
+    print(f"💰 Bankroll : {current_bankroll(conn):.2f} € (départ {start_bankroll(conn):.0f} €), "
+          f"{total['settled']} paris réglés, PnL {total['pnl']:+.2f} €, {total['pending']} en attente")
+    if args.command == 'summary':
+        for scope in ('tier', 'league'):
+            for entry in breakdown(conn, scope):
+                roi = entry['pnl'] / entry['staked'] if entry['staked'] else 0.0
+                print(f"   🏆 {entry['key'] or '-':22s} {entry['settled']:4d} paris, PnL {entry['pnl']:+8.2f} €, "
+                      f"ROI {roi * 100:+.1f}%")
@@ -0,0 +1,117 @@
+import numpy as np
+import dixon_coles
+import walk_forward
+
+# Intervalles de confiance par bootstrap pour la log-loss, le Brier et le ROI des
+# value bets. Les métriques sont calculées une seule fois par match puis sommées par
+# bloc (ligue, journée) : les matchs d'une même journée sont corrélés, on tire donc
+# des journées entières. Les R rééchantillonnages forment une seule matrice d'indices
+# (R, blocs), convertie en effectifs par bloc ; chaque statistique devient un produit
+# matriciel effectifs @ sommes par bloc. Les différences entre deux jeux de paramètres
+# sont appariées (mêmes tirages pour les deux).
+
+RESAMPLES = 10000
+CONFIDENCE = 0.95
+# Colonnes sommées par bloc
+COLUMNS = ('matches', 'log_loss', 'brier', 'staked', 'pnl')
+
+
+def match_metrics(data, params, store=None, min_edge=walk_forward.MIN_EDGE):
+    """ Métriques par match (N, colonnes de COLUMNS) pour un jeu de paramètres """
+    lh, la = dixon_coles.compute_lambdas(data['xg_h'], data['xg_a'], data['delta_elo'],
+                                         params['w_xg'], params['w_elo'], params['hfa'])
+    probs = dixon_coles.outcome_probabilities(lh, la, params['rho'])
+    outcomes = data['outcome']
+    staked, pnl = walk_forward.bet_returns(lh, la, params['rho'], data, store, min_edge)
+    return np.column_stack([np.ones(len(outcomes)), dixon_coles.log_losses(probs, outcomes),
+                            walk_forward.brier_scores(probs, outcomes), staked, pnl])
+
+
+def round_blocks(data):
+    """ Numéro de bloc (ligue, journée) de chaque match """
+    keys = data['league'].astype(np.int64) << 32 | data['round'].astype(np.int64)
+    return np.unique(keys, return_inverse=True)[1].ravel()
+
+
+def block_counts(n_blocks, resamples=RESAMPLES, seed=0):
+    """ Effectifs (R, blocs) : combien de fois chaque bloc est tiré dans chaque rééchantillonnage """
+    rng = np.random.default_rng(seed)
+    index = rng.integers(0, n_blocks, size=(resamples, n_blocks))
+    flat = index + (np.arange(resamples) * n_blocks)[:, None]
+    counts = np.bincount(flat.ravel(), minlength=resamples * n_blocks)
+    return counts.reshape(resamples, n_blocks).astype(np.float64)
+
+
+def ratios(totals):
+    """ (log-loss, Brier, ROI) depuis des sommes (..., colonnes de COLUMNS) """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'log_loss': totals[..., 1] / totals[..., 0],
+            'brier': totals[..., 2] / totals[..., 0],
+            'roi': np.where(totals[..., 3] > 0, totals[..., 4] / totals[..., 3], np.nan),
+        }
+
+
+def interval(point, samples, confidence=CONFIDENCE):
+    """ Estimation, intervalle percentile et écart-type bootstrap """
+    samples = samples[~np.isnan(samples)]
+    if not len(samples) or np.isnan(point):
+        return {'estimate': None, 'low': None, 'high': None, 'std': None}
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(samples, [alpha, 1 - alpha])
+    return {'estimate': float(point), 'low': float(low), 'high': float(high), 'std': float(samples.std())}
+
+
+def bootstrap_report(data, params, store=None, baseline_params=None, resamples=RESAMPLES,
+                     confidence=CONFIDENCE, seed=0):
+    """ IC de log-loss / Brier / ROI, et différences appariées params - baseline_params si fourni """
+    blocks = round_blocks(data)
+    n_blocks = int(blocks.max()) + 1 if len(blocks) else 0
+    if n_blocks == 0: return None
+    counts = block_counts(n_blocks, resamples, seed)
+
+    def block_sums(metrics):
+        sums = np.zeros((n_blocks, metrics.shape[1]))
+        np.add.at(sums, blocks, metrics)
+        return sums
+
+    current = block_sums(match_metrics(data, params, store))
+    point, samples = ratios(current.sum(0)), ratios(counts @ current)
+    report = {
+        'matches': len(blocks), 'blocks': n_blocks, 'resamples': resamples, 'confidence': confidence,
+        'bets': int(current[:, 3].sum()),
+        'metrics': {name: interval(point[name], samples[name], confidence) for name in point},
+    }
+    if baseline_params is None: return report
+
+    other = block_sums(match_metrics(data, baseline_params, store))
+    point_other, samples_other = ratios(other.sum(0)), ratios(counts @ other)
+    report['baseline_bets'] = int(other[:, 3].sum())
+    report['paired'] = {}
+    for name in point:
+        diff = samples[name] - samples_other[name]
+        entry = interval(point[name] - point_other[name], diff, confidence)
+        valid = diff[~np.isnan(diff)]
+        # Part des rééchantillonnages où le nouveau jeu fait mieux (moins de perte, plus de ROI)
+        better = valid > 0 if name == 'roi' else valid < 0
+        entry['p_better'] = float(better.mean()) if len(valid) else None
+        report['paired'][name] = entry
+    return report
+
+
+def print_report(report):
+    print(f"\n🎲 Bootstrap : {report['resamples']} tirages de {report['blocks']} journées "
+          f"({report['matches']} matchs, {report['bets']} paris), IC {report['confidence']:.0%}")
+    for name, ci in report['metrics'].items():
+        if ci['estimate'] is None:
+            print(f"   {name:8s} -")
+            continue
+        print(f"   {name:8s} {ci['estimate']:+.4f}  [{ci['low']:+.4f}, {ci['high']:+.4f}]")
+    if 'paired' not in report: return
+    print("   ⚖️ Différences appariées (nouveau - référence) :")
+    for name, ci in report['paired'].items():
+        if ci['estimate'] is None:
+            print(f"   {name:8s} -")
+            continue
+        print(f"   {name:8s} {ci['estimate']:+.4f}  [{ci['low']:+.4f}, {ci['high']:+.4f}]  "
+              f"meilleur dans {ci['p_better']:.1%} des tirages")
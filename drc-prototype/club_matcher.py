@@ -0,0 +1,123 @@
+from collections import Counter
+from difflib import SequenceMatcher
+
+# Appariement indexé des noms de clubs (API-Football -> ClubElo).
+# Chaque nom ClubElo est normalisé une seule fois ; la correspondance exacte passe
+# par un dict insensible à la casse et la similarité n'est calculée que pour les
+# meilleurs candidats d'un index inversé de trigrammes.
+
+MATCH_THRESHOLD = 0.7  # Seuil de confiance (70% de similarité)
+TOP_K = 10
+
+
+def similarity(a, b):
+    """Calcule la similarité entre deux chaînes (0 à 1)"""
+    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+
+
+def normalize_name(name):
+    """Normalise un nom pour améliorer le matching"""
+    replacements = {
+        'fc ': '', 'sc ': '', '1. ': '', '1899 ': '',
+        'vfb ': '', 'vfl ': '', 'fsv ': '',
+        ' fc': '', ' sc': '', ' cf': '',
+        'aek athens fc': 'aek',
+        'olympiakos piraeus': 'olympiakos',
+        'volos nfc': 'nfc volos',
+    }
+    name_lower = name.lower()
+    for old, new in replacements.items():
+        name_lower = name_lower.replace(old, new)
+    return name_lower.strip()
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ClubIndex:
+    """ Index des noms ClubElo : exact (casefold) en O(1), trigrammes pour la similarité """
+
+    def __init__(self, elo_clubs):
+        self.clubs = list(elo_clubs)
+        self.normalized = [normalize_name(c) for c in self.clubs]
+
+        # Premier club rencontré gagne, comme l'ancien parcours linéaire avec break
+        self.exact = {}
+        for club in self.clubs:
+            self.exact.setdefault(club.lower(), club)
+
+        self.postings = {}
+        for idx, norm in enumerate(self.normalized):
+            for gram in trigrams(norm):
+                self.postings.setdefault(gram, []).append(idx)
+
+    def exact_match(self, name):
+        return self.exact.get(name.lower())
+
+    def candidates(self, normalized, top_k=TOP_K):
+        """ Indices des top_k clubs partageant le plus de trigrammes """
+        shared = Counter()
+        for gram in trigrams(normalized):
+            shared.update(self.postings.get(gram, ()))
+        return [idx for idx, _ in sorted(shared.items(), key=lambda kv: (-kv[1], kv[0]))[:top_k]]
+
+    def best_match(self, name, candidates=None, start=(None, 0.0, -1)):
+        """ (club, score, indice) le plus proche ; à égalité le premier de la liste ClubElo gagne """
+        hist_normalized = normalize_name(name)
+        pool = sorted(candidates) if candidates is not None else range(len(self.clubs))
+        best_match, best_score, best_idx = start
+        for idx in pool:
+            matcher = SequenceMatcher(None, hist_normalized, self.normalized[idx])
+            # Bornes supérieures bon marché de ratio() : on saute les clubs qui ne peuvent pas gagner
+            if not self._may_beat(matcher.real_quick_ratio(), idx, best_score, best_idx): continue
+            if not self._may_beat(matcher.quick_ratio(), idx, best_score, best_idx): continue
+            score = matcher.ratio()
+            if self._may_beat(score, idx, best_score, best_idx):
+                best_match, best_score, best_idx = self.clubs[idx], score, idx
+        return best_match, best_score, best_idx
+
+    @staticmethod
+    def _may_beat(score, idx, best_score, best_idx):
+        return score > best_score or (score == best_score and score > 0 and idx < best_idx)
+
+    def match(self, name, top_k=TOP_K, threshold=MATCH_THRESHOLD):
+        best = self.best_match(name, self.candidates(normalize_name(name), top_k))
+        # Sous le seuil (cas rare) : balayage complet, élagué par les bornes, pour que le
+        # rapport des non-appariés donne le même meilleur candidat qu'avant
+        if best[1] < threshold:
+            best = self.best_match(name, start=best)
+        return best[0], best[1]
+
+
+def auto_match_clubs(history_clubs, elo_clubs, manual_mappings, top_k=TOP_K):
+    """Match automatique avec fallback sur similarité"""
+    index = ClubIndex(elo_clubs)
+    mapping = {}
+    unmatched = []
+
+    for hist_club in history_clubs:
+        # 1. Chercher dans les mappings manuels
+        if hist_club in manual_mappings:
+            mapping[hist_club] = manual_mappings[hist_club]
+            continue
+
+        # 2. Chercher une correspondance exacte (insensible à la casse)
+        exact_match = index.exact_match(hist_club)
+        if exact_match:
+            mapping[hist_club] = exact_match
+            continue
+
+        # 3. Chercher par similarité normalisée, sur les meilleurs candidats trigrammes
+        best_match, best_score = index.match(hist_club, top_k)
+        if best_score >= MATCH_THRESHOLD:
+            mapping[hist_club] = best_match
+        else:
+            unmatched.append({
+                'history': hist_club,
+                'best_elo_match': best_match,
+                'confidence': round(best_score, 2)
+            })
+
+    return mapping, unmatched
@@ -0,0 +1,127 @@
+import csv
+import gzip
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Couche de téléchargement ClubElo : un CSV brut (gzip) par date sur disque,
+# jamais retéléchargé pour une date passée. Les dates manquantes partent dans
+# un pool de threads borné, avec une limite de débit polie et une Session HTTP
+# partagée (connexions réutilisées).
+
+# CLUBELO_URL permet de pointer vers le serveur local (clubelo_stub_server.py)
+BASE_URL = os.environ.get('CLUBELO_URL', 'http://api.clubelo.com')
+CACHE_DIR = os.path.join('cache', 'clubelo')
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+MAX_WORKERS = 4
+REQUESTS_PER_SECOND = 1.0  # Débit de courtoisie de l'ancien script (une requête par seconde)
+
+
+class TokenBucket:
+    """ Limiteur de débit partagé entre threads : `rate` requêtes/s, rafale de `capacity` """
+
+    def __init__(self, rate=REQUESTS_PER_SECOND, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # Le jeton est réservé sous le verrou (le solde peut devenir négatif) ; l'attente se fait
+        # verrou relâché, pour que les autres threads réservent leur propre créneau pendant ce temps
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+def make_session(pool_size=MAX_WORKERS):
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=2)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def snapshot_path(date_str, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f'{date_str}.csv.gz')
+
+
+def read_cached(date_str, cache_dir=CACHE_DIR):
+    path = snapshot_path(date_str, cache_dir)
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
+def write_cached(date_str, text, cache_dir=CACHE_DIR):
+    """ Écriture atomique : un fichier présent est toujours un CSV complet """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = snapshot_path(date_str, cache_dir)
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def download_snapshot(date_str, session, bucket, base_url=BASE_URL):
+    """ CSV brut du classement mondial à une date, ou None """
+    bucket.acquire()
+    try:
+        response = session.get(f'{base_url}/{date_str}', timeout=15)
+        if "Rank" not in response.text: return None
+        return response.text.strip()
+    except requests.RequestException as e:
+        print(f"  ❌ Erreur ClubElo au {date_str}: {e}")
+        return None
+
+
+def load_snapshots(dates, cache_dir=CACHE_DIR, base_url=BASE_URL,
+                   max_workers=MAX_WORKERS, rate=REQUESTS_PER_SECOND):
+    """ {date: CSV brut ou None} ; seules les dates absentes du disque sont téléchargées """
+    today = date.today().isoformat()
+    snapshots = {d: read_cached(d, cache_dir) for d in sorted(set(dates))}
+    missing = [d for d, text in snapshots.items() if text is None]
+    if not missing:
+        return snapshots
+
+    print(f"  📥 Téléchargement Elo : {len(missing)} date(s) manquante(s) sur {len(snapshots)}...")
+    bucket = TokenBucket(rate)
+    with make_session(max_workers) as session, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        texts = pool.map(lambda d: download_snapshot(d, session, bucket, base_url), missing)
+        for d, text in zip(missing, texts):
+            snapshots[d] = text
+            # Le classement du jour bouge encore : on ne fige que les dates passées
+            if text is not None and d < today:
+                write_cached(d, text, cache_dir)
+    return snapshots
+
+
+def parse_snapshot(text):
+    """ Indexe un CSV ClubElo par [Pays][Nom_ClubElo] -> Elo """
+    if text is None: return None
+    reader = csv.DictReader(io.StringIO(text))
+    reader.fieldnames = [n.strip() for n in reader.fieldnames]
+
+    data = {}
+    for row in reader:
+        try:
+            elo = float(row['Elo'])
+        except (TypeError, ValueError):
+            continue
+        data.setdefault(row['Country'], {})[row['Club']] = elo
+    return data
@@ -0,0 +1,126 @@
+import argparse
+import gzip
+import os
+import re
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Faux api.clubelo.com local : sert les CSV enregistrés (<date>.csv.gz ou <date>.csv)
+# pour tester le téléchargement Elo hors-ligne.
+#   python clubelo_stub_server.py --dir cache/clubelo --port 8765
+#   CLUBELO_URL=http://localhost:8765 python fetch_history_elo.py
+#   python clubelo_stub_server.py --check   (téléchargement, cache et débit vérifiés hors-ligne)
+
+DEFAULT_DIR = os.path.join('cache', 'clubelo')
+# Noms servis : une date ou un club ClubElo, jamais un chemin (pas de / ni de ..)
+SAFE_NAME = re.compile(r'[A-Za-z0-9_-]+')
+
+
+def read_recorded(directory, date_str):
+    for name, opener in ((f'{date_str}.csv.gz', gzip.open), (f'{date_str}.csv', open)):
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            with opener(path, 'rt', encoding='utf-8') as f:
+                return f.read()
+    return None
+
+
+def make_handler(directory):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            date_str = self.path.split('?')[0].strip('/')
+            if not SAFE_NAME.fullmatch(date_str):
+                self.send_error(404)
+                return
+            # Comme ClubElo : une date inconnue renvoie une réponse vide, pas une erreur
+            body = (read_recorded(directory, date_str) or '').encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/csv; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            self.server.hits.append(date_str)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_stub_server(directory=DEFAULT_DIR, port=0):
+    """ Démarre le serveur dans un thread ; renvoie (serveur, url de base) """
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(directory))
+    server.hits = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+CHECK_CSV = ("Rank,Club,Country,Level,Elo,From,To\n"
+             "1,Arsenal,ENG,1,2010.5,{d},{d}\n"
+             "2,Lens,FRA,1,1750.0,{d},{d}\n")
+
+
+def self_check(n_dates=4, rate=20.0):
+    """ Chaîne complète contre le faux serveur : téléchargement, archive, cache disque, refus des chemins """
+    import http.client
+    import time
+    import clubelo_cache
+    import fetch_history_elo
+
+    work_dir = tempfile.mkdtemp(prefix='drc_clubelo_')
+    server = None
+    try:
+        recorded, cache_dir = os.path.join(work_dir, 'recorded'), os.path.join(work_dir, 'cache')
+        os.makedirs(recorded)
+        dates = [f'2024-09-{day:02d}' for day in range(1, n_dates + 1)]
+        for d in dates:
+            with open(os.path.join(recorded, f'{d}.csv'), 'w', encoding='utf-8') as f:
+                f.write(CHECK_CSV.format(d=d))
+        with open(os.path.join(work_dir, 'secret.csv'), 'w', encoding='utf-8') as f:
+            f.write('Rank,secret')
+        server, base_url = start_stub_server(recorded)
+
+        rounds = {'39': {f'Regular Season - {i + 1}': d for i, d in enumerate(dates)}}
+        mapping = {'39': {'Arsenal FC': 'Arsenal'}}
+        start = time.perf_counter()
+        archive = fetch_history_elo.build_archive(rounds, {'39': 'ENG'}, mapping, cache_dir, base_url, rate=rate)
+        seconds = time.perf_counter() - start
+        expected = {'39': {r: {'Arsenal FC': 2010.5} for r in rounds['39']}}
+        assert archive == expected, f"archive inattendue : {archive}"
+        assert sorted(server.hits) == dates, f"requêtes inattendues : {server.hits}"
+        # Débit : n requêtes à `rate` par seconde prennent au moins (n - 1) / rate
+        assert seconds >= (n_dates - 1) / rate * 0.9, f"limite de débit non respectée ({seconds:.3f} s)"
+
+        # Deuxième passe : tout vient du cache disque, aucune requête
+        fetch_history_elo.build_archive(rounds, {'39': 'ENG'}, mapping, cache_dir, base_url, rate=rate)
+        assert len(server.hits) == n_dates, "le cache disque n'a pas servi les dates connues"
+        assert clubelo_cache.read_cached(dates[0], cache_dir) == CHECK_CSV.format(d=dates[0]).strip()
+
+        # Un chemin qui sort du dossier enregistré est refusé
+        conn = http.client.HTTPConnection(*server.server_address)
+        conn.request('GET', '/../secret')
+        response = conn.getresponse()
+        assert response.status == 404 and b'secret' not in response.read(), "chemin hors du dossier servi"
+        conn.close()
+    finally:
+        if server: server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print(f"✅ ClubElo hors-ligne : {n_dates} dates téléchargées en {seconds:.2f} s, cache et chemins vérifiés")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur ClubElo local pour tests hors-ligne")
+    parser.add_argument('--dir', default=DEFAULT_DIR, help="Dossier des CSV enregistrés")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--check', action='store_true', help="Vérifie le téléchargeur contre un serveur temporaire")
+    args = parser.parse_args()
+    if args.check:
+        raise SystemExit(self_check())
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(args.dir))
+    server.hits = []
+    print(f"🌐 Faux ClubElo sur http://127.0.0.1:{args.port} (CSV : {args.dir})")
+    server.serve_forever()
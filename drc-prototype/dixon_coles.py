@@ -0,0 +1,104 @@
+import numpy as np
+
+# Noyau vectorisé Poisson / Dixon-Coles.
+# Toutes les fonctions prennent des tableaux de N matchs et travaillent sur un
+# tenseur (N x MAX_GOALS x MAX_GOALS) au lieu de boucler match par match.
+
+MAX_GOALS = 8  # Grille 0..7 buts, comme la double boucle range(8) historique
+# (market_pricer travaille sur une grille plus large et renormalisée : voir market_pricer.MAX_GOALS)
+
+# Code du résultat réel : 0 = victoire domicile, 1 = nul, 2 = victoire extérieur
+HOME, DRAW, AWAY = 0, 1, 2
+
+# Espace de recherche des paramètres du modèle (Optuna comme L-BFGS-B)
+PARAM_BOUNDS = {
+    'w_xg': (0.5, 2.0),
+    'w_elo': (0.1, 2.0),
+    'rho': (-0.1, 0.2),
+    'hfa': (20, 120)
+}
+
+
+def _outcome_masks(max_goals):
+    """ Matrice (max_goals² x 3) qui somme chaque case dans H / D / A """
+    i, j = np.indices((max_goals, max_goals))
+    masks = np.stack([(i > j), (i == j), (i < j)], axis=-1)
+    return masks.reshape(max_goals * max_goals, 3).astype(np.float64)
+
+
+_OUTCOME_MASKS = {MAX_GOALS: _outcome_masks(MAX_GOALS)}
+
+
+def outcome_masks(max_goals=MAX_GOALS):
+    if max_goals not in _OUTCOME_MASKS:
+        _OUTCOME_MASKS[max_goals] = _outcome_masks(max_goals)
+    return _OUTCOME_MASKS[max_goals]
+
+
+def poisson_pmf_grid(lam, max_goals=MAX_GOALS):
+    """ P(k buts) pour k = 0..max_goals-1, forme (N, max_goals) """
+    lam = np.asarray(lam, dtype=np.float64)
+    k = np.arange(max_goals)
+    log_fact = np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, max_goals)))))
+    return np.exp(k * np.log(lam)[:, None] - lam[:, None] - log_fact)
+
+
+def clubelo_win_probability(delta_elo):
+    return 1 / (10 ** (-np.asarray(delta_elo, dtype=np.float64) / 400) + 1)
+
+
+def compute_lambdas(xg_h, xg_a, delta_elo, w_xg, w_elo, hfa):
+    """ Version tableau de model.compute_lambdas """
+    prob_win_h = clubelo_win_probability(np.asarray(delta_elo) + hfa)
+    prob_win_a = 1 - prob_win_h
+
+    lambda_h = np.asarray(xg_h) * w_xg * ((prob_win_h / 0.5) ** w_elo)
+    lambda_a = np.asarray(xg_a) * w_xg * ((prob_win_a / 0.5) ** w_elo)
+
+    return np.maximum(lambda_h, 0.01), np.maximum(lambda_a, 0.01)
+
+
+def score_matrices(lambda_h, lambda_a, rho, max_goals=MAX_GOALS):
+    """ Tenseur (N, max_goals, max_goals) des probabilités de score corrigées Dixon-Coles """
+    lambda_h = np.asarray(lambda_h, dtype=np.float64)
+    lambda_a = np.asarray(lambda_a, dtype=np.float64)
+    matrices = poisson_pmf_grid(lambda_h, max_goals)[:, :, None] * poisson_pmf_grid(lambda_a, max_goals)[:, None, :]
+
+    # La correction ne touche que le bloc 2x2 des petits scores (0-0, 0-1, 1-0, 1-1)
+    if np.any(rho != 0):
+        matrices[:, 0, 0] *= 1 - lambda_h * lambda_a * rho
+        matrices[:, 0, 1] *= 1 + lambda_h * rho
+        matrices[:, 1, 0] *= 1 + lambda_a * rho
+        matrices[:, 1, 1] *= 1 - rho
+    return matrices
+
+
+def outcome_probabilities(lambda_h, lambda_a, rho, max_goals=MAX_GOALS):
+    """ Probabilités (N, 3) domicile / nul / extérieur """
+    matrices = score_matrices(lambda_h, lambda_a, rho, max_goals)
+    return matrices.reshape(len(matrices), -1) @ outcome_masks(max_goals)
+
+
+def match_outcomes(goals_h, goals_a):
+    """ Code HOME / DRAW / AWAY du score final """
+    goals_h = np.asarray(goals_h)
+    goals_a = np.asarray(goals_a)
+    return np.where(goals_h > goals_a, HOME, np.where(goals_h == goals_a, DRAW, AWAY)).astype(np.int8)
+
+
+def log_losses(probs, outcomes):
+    """ Log-loss par match (même plancher 1e-10 que la boucle d'origine) """
+    res_prob = probs[np.arange(len(probs)), outcomes]
+    return -np.log(np.maximum(res_prob, 1e-10))
+
+
+def match_log_losses(xg_h, xg_a, delta_elo, outcomes, params, probabilities=None):
+    """ Log-loss de chaque match ; `probabilities` remplace outcome_probabilities (ex. prob_table) """
+    lh, la = compute_lambdas(xg_h, xg_a, delta_elo, params['w_xg'], params['w_elo'], params['hfa'])
+    probs = (probabilities or outcome_probabilities)(lh, la, params['rho'])
+    return log_losses(probs, outcomes)
+
+
+def average_log_loss(xg_h, xg_a, delta_elo, outcomes, params):
+    """ Log-loss moyenne d'un jeu de paramètres sur des tableaux de matchs """
+    return float(match_log_losses(xg_h, xg_a, delta_elo, outcomes, params).mean())
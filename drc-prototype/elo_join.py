@@ -0,0 +1,74 @@
+import numpy as np
+
+# Jointure Elo en une passe : l'archive { ligue: { journée: { équipe: elo } } }
+# est convertie une seule fois en matrice (couple ligue/journée x équipe) indexée
+# par les codes entiers de match_table. Les essais Optuna ne lisent ensuite que
+# des tableaux alignés, jamais de chaînes ni de dicts.
+
+# Codes d'exclusion (même priorité que l'ancienne boucle : Elo d'abord, puis xG)
+OK, NO_ELO, NO_XG = 0, 1, 2
+EXCLUSION_REASONS = {NO_ELO: 'no_elo', NO_XG: 'no_xg'}
+
+
+def round_keys(table):
+    """ Code unique par couple (ligue, journée) : les libellés de journée sont partagés entre ligues """
+    return table['league'].astype(np.int64) * len(table['round_names']) + table['round']
+
+
+def build_elo_matrix(table, archive):
+    """ Matrice (couples ligue/journée x équipes) des Elo de l'archive, NaN si absent """
+    keys = round_keys(table)
+    pair_keys, pair_index = np.unique(keys, return_inverse=True)
+    matrix = np.full((len(pair_keys), len(table['team_names'])), np.nan)
+
+    name_to_codes = {}
+    for code, name in enumerate(table['team_names']):
+        name_to_codes.setdefault(str(name), []).append(code)
+
+    n_rounds = len(table['round_names'])
+    for row, key in enumerate(pair_keys):
+        lid = str(table['league_ids'][key // n_rounds])
+        round_name = str(table['round_names'][key % n_rounds])
+        for team_name, elo in archive.get(lid, {}).get(round_name, {}).items():
+            for code in name_to_codes.get(team_name, ()):
+                matrix[row, code] = elo
+
+    return matrix, pair_index
+
+
+def join_elo(table, archive):
+    """ Elo domicile / extérieur de chaque match de la table, au bon round (NaN si introuvable) """
+    matrix, pair_index = build_elo_matrix(table, archive)
+    return matrix[pair_index, table['home']], matrix[pair_index, table['away']]
+
+
+def exclusion_mask(elo_h, elo_a, xg_h, xg_a):
+    """ Code d'exclusion par match : OK, NO_ELO ou NO_XG """
+    codes = np.full(len(elo_h), OK, dtype=np.uint8)
+    codes[np.isnan(xg_h) | np.isnan(xg_a)] = NO_XG
+    codes[np.isnan(elo_h) | np.isnan(elo_a)] = NO_ELO
+    return codes
+
+
+def exclusion_report(codes):
+    """ Compteurs {"no_elo": n, "no_xg": n} déduits du masque """
+    counts = np.bincount(codes, minlength=len(EXCLUSION_REASONS) + 1)
+    return {reason: int(counts[code]) for code, reason in EXCLUSION_REASONS.items()}
+
+
+def exclusion_report_by_league(table, codes):
+    """ {ligue: {"matches", "kept", "no_elo", "no_xg", "not_ft", "duplicates"}} ; not_ft et duplicates viennent de la construction de la table """
+    n_leagues = len(table['league_ids'])
+    counts = np.zeros((n_leagues, len(EXCLUSION_REASONS) + 1), dtype=np.int64)
+    np.add.at(counts, (table['league'], codes), 1)
+    not_finished = table.get('not_finished')
+    duplicates = table.get('duplicates')
+    report = {}
+    for code, lid in enumerate(table['league_ids']):
+        if not counts[code].any(): continue
+        entry = {'matches': int(counts[code].sum()), 'kept': int(counts[code, OK])}
+        entry.update({reason: int(counts[code, c]) for c, reason in EXCLUSION_REASONS.items()})
+        entry['not_ft'] = int(not_finished[code]) if not_finished is not None else None
+        entry['duplicates'] = int(duplicates[code]) if duplicates is not None else None
+        report[str(lid)] = entry
+    return report
@@ -0,0 +1,118 @@
+import numpy as np
+import dixon_coles
+import model
+
+# Ajustement rapide par maximum de vraisemblance : gradient analytique de la
+# log-loss moyenne par rapport à (w_xg, w_elo, rho, hfa), puis L-BFGS-B borné.
+# Optuna (TPE) reste disponible comme recherche globale de secours.
+
+PARAM_NAMES = list(dixon_coles.PARAM_BOUNDS)
+
+# Mise à l'échelle interne : hfa vaut ~100 quand rho vaut ~0.1, on ramène tout vers ~1
+PARAM_SCALE = np.array([1.0, 1.0, 0.1, 100.0])
+
+LN10_400 = np.log(10) / 400
+
+
+def to_params(theta):
+    return {name: float(v) for name, v in zip(PARAM_NAMES, theta)}
+
+
+def to_theta(params):
+    return np.array([params[name] for name in PARAM_NAMES], dtype=np.float64)
+
+
+def loss_and_gradient(theta, data, max_goals=dixon_coles.MAX_GOALS):
+    """ Log-loss moyenne et son gradient exact (4,) pour theta = (w_xg, w_elo, rho, hfa) """
+    w_xg, w_elo, rho, hfa = theta
+    xg_h, xg_a, outcomes = data['xg_h'], data['xg_a'], data['outcome']
+    n = len(outcomes)
+
+    # Lambdas et leurs dérivées (nulles là où le plancher 0.01 s'applique)
+    p = dixon_coles.clubelo_win_probability(data['delta_elo'] + hfa)
+    raw_h = xg_h * w_xg * (2 * p) ** w_elo
+    raw_a = xg_a * w_xg * (2 * (1 - p)) ** w_elo
+    lh, la = np.maximum(raw_h, 0.01), np.maximum(raw_a, 0.01)
+    act_h, act_a = raw_h > 0.01, raw_a > 0.01
+    dlh = np.stack([raw_h / w_xg, raw_h * np.log(2 * p), raw_h * w_elo * (1 - p) * LN10_400]) * act_h
+    dla = np.stack([raw_a / w_xg, raw_a * np.log(2 * (1 - p)), -raw_a * w_elo * p * LN10_400]) * act_a
+
+    # Matrice de score et dérivées partielles par case (N, G, G)
+    k = np.arange(max_goals)
+    ph = dixon_coles.poisson_pmf_grid(lh, max_goals)
+    pa = dixon_coles.poisson_pmf_grid(la, max_goals)
+    base = ph[:, :, None] * pa[:, None, :]
+
+    tau = np.ones((n, max_goals, max_goals))
+    tau[:, 0, 0] = 1 - lh * la * rho
+    tau[:, 0, 1] = 1 + lh * rho
+    tau[:, 1, 0] = 1 + la * rho
+    tau[:, 1, 1] = 1 - rho
+
+    dtau_dlh = np.zeros_like(tau)
+    dtau_dlh[:, 0, 0] = -la * rho
+    dtau_dlh[:, 0, 1] = rho
+    dtau_dla = np.zeros_like(tau)
+    dtau_dla[:, 0, 0] = -lh * rho
+    dtau_dla[:, 1, 0] = rho
+    dtau_drho = np.zeros_like(tau)
+    dtau_drho[:, 0, 0] = -lh * la
+    dtau_drho[:, 0, 1] = lh
+    dtau_drho[:, 1, 0] = la
+    dtau_drho[:, 1, 1] = -1
+
+    d_lh = base * ((k / lh[:, None] - 1)[:, :, None] * tau + dtau_dlh)
+    d_la = base * ((k / la[:, None] - 1)[:, None, :] * tau + dtau_dla)
+    d_rho = base * dtau_drho
+
+    # On ne garde que les cases du résultat réellement observé
+    cells = dixon_coles.outcome_masks(max_goals).T[outcomes]
+    prob = ((base * tau).reshape(n, -1) * cells).sum(1)
+    g_lh = (d_lh.reshape(n, -1) * cells).sum(1)
+    g_la = (d_la.reshape(n, -1) * cells).sum(1)
+    g_rho = (d_rho.reshape(n, -1) * cells).sum(1)
+
+    floored = prob < 1e-10
+    loss = -np.log(np.maximum(prob, 1e-10)).mean()
+    weight = np.where(floored, 0.0, -1.0 / np.maximum(prob, 1e-10)) / n
+
+    grad = np.empty(4)
+    grad[[0, 1, 3]] = (dlh * g_lh + dla * g_la) @ weight
+    grad[2] = g_rho @ weight
+    return float(loss), grad
+
+
+def fit(data, start=None, max_iter=200, prior=None, prior_weight=0.0):
+    """ L-BFGS-B borné sur la log-loss moyenne ; renvoie les paramètres et le diagnostic
+
+    prior / prior_weight : pénalité quadratique prior_weight/2 * ||theta - prior||² (en
+    unités mises à l'échelle) qui tire l'ajustement vers `prior` (rétrécissement).
+    """
+    from scipy.optimize import minimize
+
+    # Point de départ : best_params.json s'il existe, sinon le centre de l'espace de recherche
+    start = start or model.load_params() or {name: (low + high) / 2 for name, (low, high) in dixon_coles.PARAM_BOUNDS.items()}
+    theta0 = to_theta(start)
+    bounds = [dixon_coles.PARAM_BOUNDS[name] for name in PARAM_NAMES]
+    theta0 = np.clip(theta0, [b[0] for b in bounds], [b[1] for b in bounds])
+    scaled_bounds = [(low / s, high / s) for (low, high), s in zip(bounds, PARAM_SCALE)]
+    center = to_theta(prior) / PARAM_SCALE if prior is not None and prior_weight > 0 else None
+
+    def scaled(u):
+        loss, grad = loss_and_gradient(u * PARAM_SCALE, data)
+        grad = grad * PARAM_SCALE
+        if center is not None:
+            loss += 0.5 * prior_weight * float((u - center) @ (u - center))
+            grad += prior_weight * (u - center)
+        return loss, grad
+
+    res = minimize(scaled, theta0 / PARAM_SCALE, jac=True, method='L-BFGS-B',
+                   bounds=scaled_bounds, options={'maxiter': max_iter})
+    return {
+        'params': to_params(res.x * PARAM_SCALE),
+        'loss': float(res.fun),
+        'n_evals': int(res.nfev),
+        'n_iter': int(res.nit),
+        'converged': bool(res.success),
+        'message': str(res.message)
+    }
@@ -1,99 +1,123 @@
-import requests
 import json
 import os
-import io
-import csv
-import time
-from datetime import datetime
+import argparse
+import clubelo_cache
+import match_records
 from CLUB_NAME_MAPPING import CLUB_NAME_MAPPING
 
+ARCHIVE_FILE = "elo_history_archive.json"
+
 # Configuration des codes pays ClubElo
 COUNTRY_CODES = {
     '39': 'ENG', '61': 'FRA', '78': 'GER', '140': 'ESP',
     '135': 'ITA', '94': 'POR', '88': 'NED', '197': 'GRE', '203': 'TUR'
 }
 
-def get_round_start_dates(league_id):
+def get_round_start_dates(league_id, data_dir=''):
     """ Trouve la date la plus ancienne pour chaque journée (round) """
-    filename = f"history_{league_id}.json"
-    if not os.path.exists(filename): return {}
-    
-    with open(filename, 'r', encoding='utf-8') as f:
-        matches = json.load(f)
-    
     round_dates = {}
-    for m in matches:
-        r = m['league']['round']
-        d = m['fixture']['date'][:10] # On garde YYYY-MM-DD
+    for m in match_records.iter_matches(league_id, data_dir=data_dir):
+        r = m.round_name
+        d = m.date[:10] # On garde YYYY-MM-DD
         if r not in round_dates or d < round_dates[r]:
             round_dates[r] = d
     return round_dates
 
+def round_start_dates(league_ids, data_dir=''):
+    """ { league_id: { round_name: YYYY-MM-DD } } : même règle en reconstruction et en incrémental """
+    # Tous les matchs comptent, quel que soit leur statut : la journée d'un premier match reporté
+    # garde sa date d'origine, comme dans l'archive complète
+    return {lid: get_round_start_dates(lid, data_dir) for lid in league_ids}
+
 def fetch_elo_map_for_date(date_str):
-    """ Télécharge le classement mondial complet pour une date donnée """
-    url = f"http://api.clubelo.com/{date_str}"
-    headers = {'User-Agent': 'Mozilla/5.0'}
-    try:
-        response = requests.get(url, headers=headers, timeout=15)
-        if "Rank" not in response.text: return None
-        
-        f = io.StringIO(response.text.strip())
-        reader = csv.DictReader(f)
-        reader.fieldnames = [n.strip() for n in reader.fieldnames]
-        
-        # On indexe par [Pays][Nom_ClubElo] pour une recherche ultra-rapide
-        data = {}
-        for row in reader:
-            country = row['Country']
-            if country not in data: data[country] = {}
-            data[country][row['Club']] = float(row['Elo'])
-        return data
-    except Exception as e:
-        print(f"  ❌ Erreur ClubElo au {date_str}: {e}")
-        return None
+    """ Classement mondial complet pour une date donnée (cache disque, sinon téléchargement) """
+    return clubelo_cache.parse_snapshot(clubelo_cache.load_snapshots([date_str])[date_str])
+
+def map_round_elos(day_data, lid, country, mapping=CLUB_NAME_MAPPING):
+    """ Elo ClubElo du jour traduits en noms API-Football via CLUB_NAME_MAPPING """
+    current_day_data = day_data.get(country, {}) if day_data else {}
+    mapped_elos = {}
+    for api_name, elo_name in mapping.get(lid, {}).items():
+        if elo_name in current_day_data:
+            mapped_elos[api_name] = current_day_data[elo_name]
+    return mapped_elos
+
+def build_archive(rounds_by_league, countries=COUNTRY_CODES, mapping=CLUB_NAME_MAPPING,
+                  cache_dir=clubelo_cache.CACHE_DIR, base_url=clubelo_cache.BASE_URL,
+                  rate=clubelo_cache.REQUESTS_PER_SECOND):
+    """ { ligue: { journée: { nom API: elo } } } pour les journées demandées { ligue: { journée: date } } """
+    # Toutes les dates d'un coup : le cache disque sert les dates connues,
+    # les autres sont téléchargées en parallèle (une seule fois même si plusieurs ligues jouent le même jour)
+    dates = {d for rounds in rounds_by_league.values() for d in rounds.values()}
+    snapshots = clubelo_cache.load_snapshots(dates, cache_dir, base_url, rate=rate)
+    day_data = {d: clubelo_cache.parse_snapshot(text) for d, text in snapshots.items()}
+    return {lid: {r_name: map_round_elos(day_data[d], lid, countries[lid], mapping) for r_name, d in rounds.items()}
+            for lid, rounds in rounds_by_league.items()}
+
+def save_archive(elo_archive, path=ARCHIVE_FILE):
+    """ Écriture atomique : une coupure en plein milieu laisse l'ancienne archive intacte """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, "w", encoding='utf-8') as f:
+        json.dump(elo_archive, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, path)
 
 def main():
     # Structure finale : { league_id: { round_name: { api_team_name: elo_value } } }
-    elo_archive = {}
-    
-    # Pour éviter de télécharger 10 fois la même date si plusieurs ligues jouent le même jour
-    global_date_cache = {}
-
+    rounds_by_league = round_start_dates(COUNTRY_CODES)
     for lid, country in COUNTRY_CODES.items():
-        print(f"📦 Traitement Ligue {lid} ({country})...")
-        rounds = get_round_start_dates(lid)
-        elo_archive[lid] = {}
-        
-        # On trie les dates pour un log plus propre
-        unique_dates = sorted(list(set(rounds.values())))
-        
-        for d in unique_dates:
-            if d not in global_date_cache:
-                print(f"  📥 Téléchargement Elo pour le {d}...")
-                global_date_cache[d] = fetch_elo_map_for_date(d)
-                time.sleep(1) # Politesse serveur
-            
-            # Pour chaque journée commençant à cette date 'd'
-            current_day_data = global_date_cache[d].get(country, {}) if global_date_cache[d] else {}
-            
-            # On applique le mapping pour transformer le nom ClubElo en nom API-Football
-            mapped_elos = {}
-            # On parcourt ton mapping pour cette ligue
-            for api_name, elo_name in CLUB_NAME_MAPPING.get(lid, {}).items():
-                if elo_name in current_day_data:
-                    mapped_elos[api_name] = current_day_data[elo_name]
-            
-            # On assigne cet état de force à toutes les journées qui commencent ce jour-là
-            for r_name, r_date in rounds.items():
-                if r_date == d:
-                    elo_archive[lid][r_name] = mapped_elos
+        print(f"📦 Ligue {lid} ({country}) : {len(rounds_by_league[lid])} journées")
+    elo_archive = build_archive(rounds_by_league)
 
     # Sauvegarde finale
-    with open("elo_history_archive.json", "w", encoding='utf-8') as f:
-        json.dump(elo_archive, f, indent=4, ensure_ascii=False)
+    save_archive(elo_archive)
     
-    print(f"\n✅ Terminé ! Archive créée : elo_history_archive.json")
+    print(f"\n✅ Terminé ! Archive créée : {ARCHIVE_FILE}")
     print(f"💡 Ton backtest peut maintenant simuler le passé avec précision.")
 
+def update_archive(path=ARCHIVE_FILE):
+    """ Mode incrémental : ne traite que les journées absentes (ou vides) de l'archive existante """
+    if not os.path.exists(path):
+        print("⚠️ Pas d'archive existante, reconstruction complète.")
+        return main()
+
+    with open(path, 'r', encoding='utf-8') as f:
+        elo_archive = json.load(f)
+
+    rounds_by_league = round_start_dates(COUNTRY_CODES)
+
+    # Journées jouées qui n'ont pas encore d'Elo dans l'archive
+    pending = {}
+    for lid in COUNTRY_CODES:
+        known = elo_archive.get(lid, {})
+        new_rounds = {r: d for r, d in rounds_by_league.get(lid, {}).items() if not known.get(r)}
+        if new_rounds:
+            pending[lid] = new_rounds
+
+    if not pending:
+        print("✅ Archive déjà à jour, aucune nouvelle journée.")
+        return
+
+    dates = {d for rounds in pending.values() for d in rounds.values()}
+    new_elos = build_archive(pending)
+
+    added = 0
+    for lid, rounds in pending.items():
+        for r_name, d in rounds.items():
+            mapped_elos = new_elos[lid][r_name]
+            if mapped_elos:
+                elo_archive.setdefault(lid, {})[r_name] = mapped_elos
+                added += 1
+            else:
+                print(f"  ⚠️ Ligue {lid}, {r_name} ({d}) : pas encore d'Elo disponible")
+
+    save_archive(elo_archive, path)
+    print(f"\n✅ Archive mise à jour : {added} journée(s) ajoutée(s) sur {len(dates)} date(s) demandée(s).")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Construction de l'archive Elo historique")
+    parser.add_argument('--incremental', action='store_true', help="Ajoute seulement les nouvelles journées")
+    args = parser.parse_args()
+    if args.incremental:
+        update_archive()
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,141 @@
+import atexit
+import json
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows : pas de getrusage, la mémoire crête n'est pas mesurée
+    resource = None
+
+# Instrumentation en JSON lines : une ligne par événement (étape, essai, exclusions...)
+# dans DRC_METRICS (défaut metrics.jsonl, "off" pour couper). Le coût est celui d'un
+# perf_counter, d'un getrusage et d'une écriture de ligne : on peut la laisser active.
+# DRC_PROFILE=cprofile|tracemalloc ajoute un profil (plus coûteux, pour enquêter) :
+#  - cprofile : profil complet écrit dans <run_id>.prof à la fin du processus ;
+#  - tracemalloc : pic mémoire Python par étape et principaux sites d'allocation.
+
+METRICS_FILE = os.environ.get('DRC_METRICS', 'metrics.jsonl')
+PROFILE = os.environ.get('DRC_PROFILE', '').lower()
+# Identifiant commun au processus principal et aux workers forkés
+RUN_ID = os.environ.get('DRC_RUN_ID') or uuid.uuid4().hex[:12]
+
+_profiler = None
+
+
+def enabled():
+    return METRICS_FILE.lower() not in ('', 'off', '0', 'false')
+
+
+def emit(event, **fields):
+    """ Écrit une ligne JSON (ajout atomique : une seule écriture par ligne, sûr entre processus) """
+    if not enabled(): return
+    record = {'ts': round(time.time(), 3), 'run': RUN_ID, 'pid': os.getpid(), 'event': event}
+    record.update(fields)
+    line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+    fd = os.open(METRICS_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode('utf-8'))
+    finally:
+        os.close(fd)
+
+
+def peak_rss_mb():
+    """ Pic de mémoire résidente du processus depuis son démarrage (Mo) """
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+@contextmanager
+def stage(name, **fields):
+    """ Chronomètre une étape : temps mur, pic RSS (et pic Python si tracemalloc) """
+    tracing = PROFILE == 'tracemalloc'
+    if tracing:
+        import tracemalloc
+        tracemalloc.reset_peak()
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        # Les mesures sont aussi rendues à l'appelant via le dict `fields`
+        fields['wall_s'] = round(time.perf_counter() - start, 6)
+        rss_after = peak_rss_mb()
+        if rss_after is not None:
+            fields['rss_peak_mb'] = rss_after
+            fields['rss_peak_growth_mb'] = round(rss_after - rss_before, 1)
+        if tracing:
+            fields['py_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+        emit('stage', stage=name, **fields)
+
+
+def trial_callback(study, trial):
+    """ Callback Optuna : une ligne par essai terminé (durée, état, valeur) """
+    duration = trial.duration.total_seconds() if trial.duration else None
+    emit('trial', study=study.study_name, number=trial.number, state=trial.state.name,
+         value=trial.value, duration_s=duration, rss_peak_mb=peak_rss_mb())
+
+
+def percentiles(values, qs=(0, 10, 50, 90, 99, 100)):
+    if not values: return {}
+    ordered = sorted(values)
+    out = {}
+    for q in qs:
+        k = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        out[f'p{q}'] = round(ordered[k], 6)
+    return out
+
+
+def study_summary(study, since, wall_s):
+    """ Débit et distribution des durées des essais lancés depuis `since` (datetime) """
+    trials = [t for t in study.trials if t.datetime_start and t.datetime_start >= since]
+    durations = [t.duration.total_seconds() for t in trials if t.duration]
+    states = {}
+    for t in trials:
+        states[t.state.name] = states.get(t.state.name, 0) + 1
+    finished = len(durations)
+    emit('study', study=study.study_name, trials=len(trials), states=states, wall_s=round(wall_s, 3),
+         trials_per_s=round(finished / wall_s, 3) if wall_s else None,
+         duration_mean_s=round(sum(durations) / finished, 6) if finished else None,
+         duration_s=percentiles(durations))
+
+
+def emit_exclusions(report):
+    """ Une ligne par ligue : matchs, exclusions par raison (no_elo / no_xg / not_ft / duplicates) """
+    for league, counts in report.items():
+        emit('exclusions', league=league, **counts)
+
+
+def start_profiling():
+    """ Active le profil demandé par DRC_PROFILE (sans effet sinon) """
+    global _profiler
+    if PROFILE == 'cprofile' and _profiler is None:
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+        atexit.register(_dump_cprofile)
+    elif PROFILE == 'tracemalloc':
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            atexit.register(_dump_tracemalloc)
+
+
+def _dump_cprofile():
+    _profiler.disable()
+    path = f'{RUN_ID}.prof'
+    _profiler.dump_stats(path)
+    emit('profile', kind='cprofile', path=path)
+
+
+def _dump_tracemalloc(limit=10):
+    import tracemalloc
+    snapshot = tracemalloc.take_snapshot()
+    top = [{'site': str(stat.traceback[0]), 'size_mb': round(stat.size / 2 ** 20, 3), 'count': stat.count}
+           for stat in snapshot.statistics('lineno')[:limit]]
+    emit('profile', kind='tracemalloc', peak_mb=round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2), top=top)
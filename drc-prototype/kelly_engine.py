@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+import bet_ledger
+
+# Kelly simultané pour les paris ouverts en même temps. calculateKellyStake (kelly.js)
+# dimensionne chaque pari seul : une douzaine de paris du même week-end, chacun à
+# sa fraction de Kelly, sur-expose la bankroll commune. Ici on maximise la croissance
+# logarithmique espérée du portefeuille entier :
+#   max_f  E[ log(1 + R f) ]   sous 0 <= f_i <= plafond, somme f <= exposition max
+# L'espérance est une moyenne sur S scénarios tirés (3^50 issues exactes pour 50
+# matchs) : un tirage uniforme par match, chaque pari gagnant si le tirage tombe dans
+# son intervalle de probabilité. Les paris d'un même match (Home / Draw / Away) sont
+# donc mutuellement exclusifs, les matchs indépendants. R (S, n) vaut cote - 1 si le
+# pari gagne, -1 sinon. L'objectif est concave : SLSQP avec gradient analytique
+# converge vers l'optimum global. Le problème est résolu en Kelly complet, avec la
+# seule contrainte de solvabilité (somme f < 1) : c'est là que les paris simultanés
+# se partagent la bankroll. Le Kelly fractionnaire et le plafond par pari de kelly.js
+# sont appliqués ensuite à cette solution, puis l'exposition totale est plafonnée.
+
+# Comme STRATEGY dans kelly.js
+KELLY_FRACTION = 0.15
+MAX_STAKE_PCT = 0.05
+WIN_PROBABILITY = {'SUPREME': 0.75, 'SOLID': 0.60, 'VALUE': 0.45}
+DEFAULT_PROBABILITY = 0.5
+
+MAX_EXPOSURE = 0.25  # Part maximale de la bankroll engagée au total (mises finales)
+SCENARIOS = 20000
+# Kelly complet : exposition strictement < 1, la richesse reste positive même si tous les paris perdent
+SOLVENT_EXPOSURE = 0.999
+
+
+def bet_probability(bet):
+    """ Probabilité du modèle si fournie ('prob'), sinon estimation par tier comme kelly.js """
+    if bet.get('prob') is not None:
+        return float(bet['prob'])
+    return WIN_PROBABILITY.get(bet.get('tier'), DEFAULT_PROBABILITY)
+
+
+def coherent_probabilities(probs, fixtures):
+    """ Probabilités des paris d'un même match ramenées à une somme <= 1
+
+    Deux paris estimés par tier sur un même match (0.60 + 0.60) sont incohérents : on les
+    renormalise proportionnellement, avec un avertissement, au lieu d'abandonner toute la liste.
+    """
+    probs = np.array(probs, dtype=np.float64)
+    match_ids, match_index = np.unique(np.asarray(fixtures), return_inverse=True)
+    match_index = match_index.ravel()
+    totals = np.bincount(match_index, weights=probs, minlength=len(match_ids))
+    for m in np.flatnonzero(totals > 1 + 1e-9):
+        print(f"⚠️ Match {match_ids[m]} : probabilités des paris sommées à {totals[m]:.2f}, renormalisées")
+    scale = np.where(totals > 1, 1 / np.maximum(totals, 1e-12), 1.0)
+    return probs * scale[match_index]
+
+
+def scenario_returns(probs, odds, fixtures, scenarios=SCENARIOS, seed=0):
+    """ Rendements nets (S, n) par scénario ; un tirage uniforme par match (probabilités cohérentes) """
+    probs, odds = np.asarray(probs, dtype=np.float64), np.asarray(odds, dtype=np.float64)
+    match_ids, match_index = np.unique(np.asarray(fixtures), return_inverse=True)
+    match_index = match_index.ravel()
+    # Intervalle [bas, haut) de chaque pari dans le tirage de son match
+    high = np.zeros(len(probs))
+    for m in range(len(match_ids)):
+        members = np.flatnonzero(match_index == m)
+        high[members] = np.cumsum(probs[members])
+    low = high - probs
+
+    rng = np.random.default_rng(seed)
+    draws = rng.random((scenarios, len(match_ids)))[:, match_index]
+    won = (draws >= low) & (draws < high)
+    return np.where(won, odds - 1, -1.0)
+
+
+def growth_and_gradient(f, returns):
+    """ -E[log(1 + R f)] et son gradient """
+    # Les itérés de SLSQP peuvent frôler la contrainte d'exposition : richesse gardée > 0
+    wealth = np.maximum(1.0 + returns @ f, 1e-9)
+    loss = -np.log(wealth).mean()
+    grad = -(returns.T @ (1.0 / wealth)) / len(wealth)
+    return loss, grad
+
+
+def expected_growth(f, returns):
+    """ E[log(1 + R f)] ; -inf si un scénario ruine la bankroll """
+    wealth = 1.0 + returns @ f
+    if (wealth <= 0).any(): return -np.inf
+    return float(np.log(wealth).mean())
+
+
+def independent_kelly(probs, odds, fraction=KELLY_FRACTION, cap=MAX_STAKE_PCT):
+    """ Fractions pari par pari comme calculateKellyStake (sans arrondi en euros) """
+    probs, b = np.asarray(probs, dtype=np.float64), np.asarray(odds, dtype=np.float64) - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f = np.where(b > 0, (b * probs - (1 - probs)) / b, 0.0)
+    return np.minimum(np.clip(f, 0.0, None) * fraction, cap)
+
+
+def simultaneous_kelly(probs, odds, fixtures, fraction=KELLY_FRACTION, cap=MAX_STAKE_PCT,
+                       max_exposure=MAX_EXPOSURE, scenarios=SCENARIOS, seed=0, returns=None):
+    """ Fractions de bankroll : Kelly complet conjoint, puis fraction, plafond par pari et exposition
+
+    Renvoie (fractions, infos) ; infos contient la croissance log espérée par scénario
+    de la solution et de Kelly indépendant, et le nombre d'itérations.
+    """
+    from scipy.optimize import minimize
+
+    probs = coherent_probabilities(probs, fixtures) if len(probs) else np.zeros(0)
+    odds = np.asarray(odds, dtype=np.float64)
+    n = len(probs)
+    if n == 0:
+        return np.zeros(0), {'growth': 0.0, 'independent_growth': 0.0, 'iterations': 0, 'converged': True}
+    if returns is None:
+        returns = scenario_returns(probs, odds, fixtures, scenarios, seed)
+
+    # Kelly complet conjoint sur les paris d'espérance positive, sous la seule contrainte de solvabilité
+    active = np.flatnonzero(probs * odds - 1 > 0)
+    full, iterations, converged = np.zeros(n), 0, True
+    if len(active):
+        sub = returns[:, active]
+        start = independent_kelly(probs[active], odds[active], 1.0, SOLVENT_EXPOSURE)
+        if start.sum() > SOLVENT_EXPOSURE:
+            start *= SOLVENT_EXPOSURE / start.sum()
+        constraint = {'type': 'ineq', 'fun': lambda f: SOLVENT_EXPOSURE - f.sum(),
+                      'jac': lambda f: -np.ones(len(active))}
+        res = minimize(growth_and_gradient, start, args=(sub,), jac=True, method='SLSQP',
+                       bounds=[(0.0, SOLVENT_EXPOSURE)] * len(active), constraints=[constraint],
+                       options={'maxiter': 200, 'ftol': 1e-12})
+        full[active] = np.clip(res.x, 0.0, SOLVENT_EXPOSURE)
+        iterations, converged = int(res.nit), bool(res.success)
+
+    # Comme kelly.js, mais sur la solution conjointe : fraction, plafond par pari, puis exposition totale
+    fractions = np.minimum(full * fraction, cap)
+    if fractions.sum() > max_exposure:
+        fractions *= max_exposure / fractions.sum()
+
+    independent = independent_kelly(probs, odds, fraction, cap)
+    info = {
+        'growth': expected_growth(fractions, returns),
+        'independent_growth': expected_growth(independent, returns),
+        'iterations': iterations,
+        'converged': converged,
+    }
+    return fractions, info
+
+
+def stake_bets(bets, bankroll, fraction=KELLY_FRACTION, cap=MAX_STAKE_PCT, max_exposure=MAX_EXPOSURE,
+               scenarios=SCENARIOS, seed=0):
+    """ Mises en euros (arrondies à l'euro comme kelly.js, 0 si pas de pari) pour des paris au format JS """
+    probs = [bet_probability(b) for b in bets]
+    odds = [float(b['odd']) for b in bets]
+    fixtures = [b.get('fixture_id', b.get('id')) for b in bets]
+    fractions, info = simultaneous_kelly(probs, odds, fixtures, fraction, cap, max_exposure, scenarios, seed)
+    staked = []
+    for bet, f in zip(bets, fractions):
+        stake = float(round(bankroll * f))
+        staked.append(dict(bet, stake=stake, kelly_pct=f"{stake / bankroll * 100:.1f}" if bankroll else '0.0'))
+    return staked, fractions, info
+
+
+def synthetic_bets(n, seed=0):
+    """ n paris 1X2 fictifs sur des matchs distincts (démonstration / mesure de temps) """
+    rng = np.random.default_rng(seed)
+    probs = rng.uniform(0.3, 0.75, n)
+    odds = np.round(1 / probs * rng.uniform(1.0, 1.25, n), 2)
+    return [{'id': i, 'match': f"Match {i}", 'pred': 'Home', 'prob': float(p), 'odd': float(o)}
+            for i, (p, o) in enumerate(zip(probs, odds))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mises Kelly simultanées des paris en attente")
+    parser.add_argument('--pending', default=bet_ledger.PENDING_FILE)
+    parser.add_argument('--ledger', default=bet_ledger.LEDGER_FILE, help="Bankroll lue dans le registre s'il existe")
+    parser.add_argument('--bankroll', type=float, help="Bankroll imposée")
+    parser.add_argument('--demo', type=int, default=0, help="N paris fictifs au lieu des paris en attente")
+    parser.add_argument('--fraction', type=float, default=KELLY_FRACTION)
+    parser.add_argument('--cap', type=float, default=MAX_STAKE_PCT)
+    parser.add_argument('--max-exposure', type=float, default=MAX_EXPOSURE)
+    parser.add_argument('--scenarios', type=int, default=SCENARIOS)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.bankroll is not None:
+        bankroll = args.bankroll
+    elif os.path.exists(args.ledger):
+        bankroll = bet_ledger.current_bankroll(bet_ledger.connect(args.ledger))
+    else:
+        bankroll = bet_ledger.START_BANKROLL
+
+    if args.demo:
+        bets = synthetic_bets(args.demo, args.seed)
+    else:
+        with open(args.pending, 'r', encoding='utf-8') as f:
+            bets = [b for b in json.load(f) if b.get('status', bet_ledger.PENDING) == bet_ledger.PENDING]
+    if not bets:
+        print("⚠️ Aucun pari en attente")
+        raise SystemExit(0)
+
+    start = time.perf_counter()
+    staked, fractions, info = stake_bets(bets, bankroll, args.fraction, args.cap, args.max_exposure,
+                                         args.scenarios, args.seed)
+    seconds = time.perf_counter() - start
+    independent = independent_kelly([bet_probability(b) for b in bets], [float(b['odd']) for b in bets],
+                                    args.fraction, args.cap)
+    print(f"⚖️ {len(bets)} paris, {args.scenarios} scénarios, résolu en {seconds * 1000:.0f} ms "
+          f"({info['iterations']} itérations{'' if info['converged'] else ', non convergé'})")
+    print(f"   💰 Bankroll {bankroll:.2f} € : exposition {fractions.sum() * 100:.1f}% "
+          f"(Kelly indépendant : {independent.sum() * 100:.1f}%)")
+    print(f"   📈 Croissance log espérée : {info['growth'] * 100:+.3f}% "
+          f"(Kelly indépendant : {info['independent_growth'] * 100:+.3f}%)")
+    for bet in staked:
+        if bet['stake'] > 0:
+            print(f"   🎲 {bet['match']:30s} {bet['pred']:5s} @ {bet['odd']:.2f}  "
+                  f"{bet['stake']:.0f} € ({bet['kelly_pct']}%)")
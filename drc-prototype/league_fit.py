@@ -0,0 +1,186 @@
+import json
+import os
+import multiprocessing as mp
+from datetime import datetime
+from multiprocessing import shared_memory
+import numpy as np
+import fast_fit
+import instrumentation
+import model
+
+# Un jeu de paramètres (w_xg, w_elo, rho, hfa) par ligue, ajusté en parallèle.
+# Les tableaux train / test du jeu global sont copiés une seule fois dans un bloc
+# de mémoire partagée : chaque worker s'y attache au démarrage (vues NumPy, sans
+# copie ni pickling) puis ajuste ses ligues avec fast_fit. Avec --shrinkage K,
+# chaque ligue est tirée vers l'ajustement global comme si K matchs "moyens"
+# s'ajoutaient à son train : les petites ligues restent proches du global.
+
+LEAGUE_PARAMS_FILE = 'best_params_by_league.json'
+SHARED_KEYS = ('xg_h', 'xg_a', 'delta_elo', 'outcome', 'league')
+MIN_LEAGUE_MATCHES = 60
+ALIGN = 64
+
+# Tableaux partagés, attachés par _init_worker : {'train': {...}, 'test': {...}}
+_SHARED = None
+_SHM = None
+
+
+def share_arrays(parts, keys=SHARED_KEYS):
+    """ Copie {partie: {clé: tableau}} dans un seul bloc partagé ; renvoie (bloc, description) """
+    layout, offset = [], 0
+    for part, data in parts.items():
+        for key in keys:
+            arr = np.ascontiguousarray(data[key])
+            layout.append((part, key, offset, arr.shape, arr.dtype.str))
+            offset += -(-arr.nbytes // ALIGN) * ALIGN
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for part, key, start, shape, dtype in layout:
+        view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)
+        view[...] = parts[part][key]
+    return shm, layout
+
+
+def attach_arrays(name, layout):
+    """ Vues NumPy en lecture seule sur un bloc créé par share_arrays """
+    # Les workers partagent le resource_tracker du parent : seul le parent supprime le bloc (unlink)
+    shm = shared_memory.SharedMemory(name=name)
+    parts = {}
+    for part, key, start, shape, dtype in layout:
+        view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)
+        view.flags.writeable = False
+        parts.setdefault(part, {})[key] = view
+    return shm, parts
+
+
+def _init_worker(name, layout):
+    global _SHM, _SHARED
+    _SHM, _SHARED = attach_arrays(name, layout)
+
+
+def league_rows(data, code):
+    """ Matchs d'une ligue (code dense de la table) sous forme évaluable """
+    index = np.flatnonzero(data['league'] == code)
+    sub = {key: data[key][index] for key in ('xg_h', 'xg_a', 'delta_elo', 'outcome')}
+    sub['errors'] = None
+    return sub
+
+
+def fit_league(code, global_params, shrinkage=0.0, min_matches=MIN_LEAGUE_MATCHES, shared=None):
+    """ Ajuste une ligue sur sa part du train ; log-loss test ligue vs paramètres globaux """
+    shared = shared or _SHARED
+    train = league_rows(shared['train'], code)
+    test = league_rows(shared['test'], code)
+    n_train, n_test = len(train['outcome']), len(test['outcome'])
+    result = {'code': code, 'train_size': n_train, 'test_size': n_test}
+    if n_train < min_matches:
+        return result
+
+    # Pénalité en "matchs équivalents" : son poids relatif décroît avec la taille de la ligue
+    weight = shrinkage / n_train if shrinkage > 0 else 0.0
+    fit = fast_fit.fit(train, start=global_params, prior=global_params, prior_weight=weight)
+    params = fit['params']
+    result.update({
+        'best_params': params,
+        'train_log_loss': model.evaluate_model(train, params),
+        'test_log_loss': model.evaluate_model(test, params) if n_test else None,
+        'global_test_log_loss': model.evaluate_model(test, global_params) if n_test else None,
+        'n_evals': fit['n_evals'],
+        'converged': fit['converged'],
+    })
+    return result
+
+
+def _league_job(job):
+    return fit_league(*job)
+
+
+def fit_leagues(dataset, global_params, shrinkage=0.0, min_matches=MIN_LEAGUE_MATCHES, processes=None):
+    """ Une tâche par ligue dans un pool de processus partageant les tableaux du dataset """
+    train, test = dataset.train_data, dataset.test_data
+    codes = [int(c) for c in np.unique(train['league'])]
+    jobs = [(code, global_params, shrinkage, min_matches) for code in codes]
+
+    if processes == 1 or len(jobs) <= 1:
+        results = [fit_league(*job, shared={'train': train, 'test': test}) for job in jobs]
+    else:
+        shm, layout = share_arrays({'train': train, 'test': test})
+        try:
+            methods = mp.get_all_start_methods()
+            ctx = mp.get_context('fork' if 'fork' in methods else 'spawn')
+            with ctx.Pool(min(processes or os.cpu_count(), len(jobs)), initializer=_init_worker,
+                          initargs=(shm.name, layout)) as pool:
+                results = pool.map(_league_job, jobs, chunksize=1)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    league_ids = dataset.matches['league_ids']
+    for r in results:
+        r['league'] = str(league_ids[r.pop('code')])
+    return results
+
+
+def export_league_params(results, global_params, shrinkage, path=LEAGUE_PARAMS_FILE):
+    """ Écrit { ligue: entrée au format best_params.json } ; les ligues trop petites gardent le global """
+    leagues = {}
+    for r in results:
+        entry = {key: r.get(key) for key in ('best_params', 'train_log_loss', 'test_log_loss',
+                                             'global_test_log_loss', 'train_size', 'test_size')}
+        if entry['best_params'] is None:
+            entry['best_params'] = global_params
+            entry['fallback'] = 'global'
+        leagues[r['league']] = entry
+    report = {
+        'global_params': global_params,
+        'shrinkage': shrinkage,
+        'optimization_date': datetime.now().isoformat(),
+        'method': 'lbfgs_per_league',
+        'leagues': leagues,
+    }
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, path)
+    print(f"📁 Fichier créé : {path}")
+    return report
+
+
+def load_league_params(league_id, path=LEAGUE_PARAMS_FILE, default=None):
+    """ Paramètres d'une ligue (ou `default` si le fichier / la ligue manquent) """
+    if not os.path.exists(path): return default
+    with open(path, 'r', encoding='utf-8') as f:
+        entry = json.load(f)['leagues'].get(str(league_id))
+    return entry['best_params'] if entry else default
+
+
+def run(dataset, global_params=None, shrinkage=0.0, min_matches=MIN_LEAGUE_MATCHES, processes=None,
+        path=LEAGUE_PARAMS_FILE):
+    """ Ajustement global (point de départ et cible du rétrécissement), puis une ligue par tâche """
+    if global_params is None:
+        with instrumentation.stage('fast_fit') as info:
+            fit = fast_fit.fit(dataset.train_data)
+            info['n_evals'] = fit['n_evals']
+        global_params = fit['params']
+        print(f"⚡ Ajustement global : log-loss train {fit['loss']:.4f}")
+
+    with instrumentation.stage('league_fit', shrinkage=shrinkage, processes=processes) as info:
+        results = fit_leagues(dataset, global_params, shrinkage, min_matches, processes)
+        info['leagues'] = len(results)
+
+    for r in results:
+        if r.get('best_params') is None:
+            print(f"   ⚠️ Ligue {r['league']:>4s} : {r['train_size']} matchs de train, paramètres globaux conservés")
+            continue
+        p = r['best_params']
+        test = (f"test {r['test_log_loss']:.4f} (global {r['global_test_log_loss']:.4f})"
+                if r['test_log_loss'] is not None else "pas de test")
+        print(f"   🏆 Ligue {r['league']:>4s} : hfa={p['hfa']:6.1f} rho={p['rho']:+.3f} "
+              f"w_xg={p['w_xg']:.3f} w_elo={p['w_elo']:.3f} | {test}")
+
+    fitted = [r for r in results if r.get('test_log_loss') is not None]
+    if fitted:
+        n = sum(r['test_size'] for r in fitted)
+        league_loss = sum(r['test_log_loss'] * r['test_size'] for r in fitted) / n
+        global_loss = sum(r['global_test_log_loss'] * r['test_size'] for r in fitted) / n
+        print(f"\n🧪 Log-loss test pondérée : par ligue {league_loss:.4f} | global {global_loss:.4f} ({n} matchs)")
+    return export_league_params(results, global_params, shrinkage, path)
@@ -0,0 +1,108 @@
+import numpy as np
+import dixon_coles
+
+# Pricer multi-marchés : à partir de (lambda_h, lambda_a, rho) pour N matchs, on
+# construit en un seul tenseur les matrices de score Dixon-Coles, puis on en tire
+# 1X2, tous les Over/Under, BTTS, score exact et handicaps asiatiques par simples
+# produits matriciels (distribution du total de buts et de l'écart de buts).
+
+# Grille du pricer, distincte de celle du modèle évalué (dixon_coles.MAX_GOALS = 8, sans
+# renormalisation, pour garder les log-loss de la boucle range(8) historique). Ici 0..10
+# buts puis renormalisation : les lignes hautes (O/U 6.5, handicaps +-3) ont besoin de la
+# queue, et des cotes cohérentes d'une masse totale de 1. Pour les mêmes paramètres, le
+# 1X2 diffère donc de dixon_coles.outcome_probabilities : au plus 0.4 point pour des
+# lambdas entre 0.5 et 2.5, jusqu'à 5 points vers lambda = 4, où la grille 8x8 perd ~10 %
+# de la masse. Le 1X2 exact du modèle évalué reste dixon_coles.outcome_probabilities.
+MAX_GOALS = 11
+OU_LINES = (0.5, 1.5, 2.5, 3.5, 4.5, 5.5, 6.5)  # lignes cotées dans ultimate_*.json
+AH_LINES = tuple(np.arange(-3.0, 3.01, 0.25))
+
+
+def _sum_masks(max_goals):
+    """ Matrices (G², 2G-1) qui regroupent les cases par total (i+j) et par écart (i-j) """
+    i, j = np.indices((max_goals, max_goals))
+    i, j = i.ravel(), j.ravel()
+    k = np.arange(2 * max_goals - 1)
+    totals = (i + j)[:, None] == k[None, :]
+    diffs = (i - j)[:, None] == (k - (max_goals - 1))[None, :]
+    return totals.astype(np.float64), diffs.astype(np.float64)
+
+
+_SUM_MASKS = {}
+
+
+def sum_masks(max_goals=MAX_GOALS):
+    if max_goals not in _SUM_MASKS:
+        _SUM_MASKS[max_goals] = _sum_masks(max_goals)
+    return _SUM_MASKS[max_goals]
+
+
+def over_under(total_probs, line):
+    """ (over, under, push) pour une ligne de total de buts """
+    k = np.arange(total_probs.shape[1])
+    over = total_probs[:, k > line].sum(1)
+    under = total_probs[:, k < line].sum(1)
+    return over, under, 1 - over - under
+
+
+def _handicap_simple(diff_probs, line, max_goals):
+    d = np.arange(diff_probs.shape[1]) - (max_goals - 1)
+    win = diff_probs[:, d + line > 0].sum(1)
+    lose = diff_probs[:, d + line < 0].sum(1)
+    return win, 1 - win - lose, lose
+
+
+def asian_handicap(diff_probs, line, max_goals=MAX_GOALS):
+    """ {'win', 'push', 'lose', 'fair_odd'} de l'équipe à domicile avec handicap `line`
+
+    Les lignes en quart (-0.25, +0.75...) partagent la mise sur les deux lignes voisines :
+    chaque probabilité est alors la moyenne des deux demi-mises.
+    """
+    if (line * 4) % 2 == 1:
+        a = _handicap_simple(diff_probs, line - 0.25, max_goals)
+        b = _handicap_simple(diff_probs, line + 0.25, max_goals)
+        win, push, lose = [(x + y) / 2 for x, y in zip(a, b)]
+    else:
+        win, push, lose = _handicap_simple(diff_probs, line, max_goals)
+    with np.errstate(divide='ignore'):
+        fair_odd = 1 + lose / win
+    return {'win': win, 'push': push, 'lose': lose, 'fair_odd': fair_odd}
+
+
+def price_markets(lambda_h, lambda_a, rho, max_goals=MAX_GOALS, ou_lines=OU_LINES, ah_lines=AH_LINES):
+    """ Probabilités de tous les marchés pour N matchs (rho scalaire ou tableau (N,)) """
+    lambda_h = np.atleast_1d(np.asarray(lambda_h, dtype=np.float64))
+    lambda_a = np.atleast_1d(np.asarray(lambda_a, dtype=np.float64))
+    rho = np.asarray(rho, dtype=np.float64)
+    matrices = dixon_coles.score_matrices(lambda_h, lambda_a, rho, max_goals)
+    # La grille tronquée perd un peu de masse : on renormalise pour des cotes cohérentes
+    matrices /= matrices.sum(axis=(1, 2), keepdims=True)
+    flat = matrices.reshape(len(matrices), -1)
+
+    h_d_a = flat @ dixon_coles.outcome_masks(max_goals)
+    total_mask, diff_mask = sum_masks(max_goals)
+    total_probs = flat @ total_mask
+    diff_probs = flat @ diff_mask
+
+    btts_yes = matrices[:, 1:, 1:].sum(axis=(1, 2))
+
+    markets = {
+        'home': h_d_a[:, 0], 'draw': h_d_a[:, 1], 'away': h_d_a[:, 2],
+        'home_draw': h_d_a[:, 0] + h_d_a[:, 1], 'draw_away': h_d_a[:, 1] + h_d_a[:, 2],
+        'btts_yes': btts_yes, 'btts_no': 1 - btts_yes,
+        'correct_score': matrices,
+        'total_goals': total_probs,
+        'over': {}, 'under': {},
+        'asian_handicap': {},
+    }
+    for line in ou_lines:
+        markets['over'][line], markets['under'][line], _ = over_under(total_probs, line)
+    for line in ah_lines:
+        markets['asian_handicap'][float(line)] = asian_handicap(diff_probs, float(line), max_goals)
+    return markets
+
+
+def price_fixtures(xg_h, xg_a, delta_elo, params, **kwargs):
+    """ Raccourci : entrées du modèle (xG, écart Elo) + paramètres -> tous les marchés """
+    lh, la = dixon_coles.compute_lambdas(xg_h, xg_a, delta_elo, params['w_xg'], params['w_elo'], params['hfa'])
+    return price_markets(lh, la, params['rho'], **kwargs)
@@ -0,0 +1,151 @@
+import json
+import math
+import os
+import re
+from array import array
+
+# Lecture en flux des fichiers history_<id>.json : le tableau JSON est décodé
+# fixture par fixture et chaque objet est aussitôt projeté dans un MatchRecord
+# compact (__slots__). La mémoire crête suit le nombre de matchs, pas la taille
+# du JSON (logos, stades, arbitres... ne sont jamais conservés).
+
+# Statistiques numériques gardées, dans l'ordre du tableau MatchRecord.stats_h / stats_a
+# (clés produites par formatStats() dans enrich-all-history.js)
+STAT_KEYS = [
+    'expected_goals', 'shots_on_goal', 'shots_off_goal', 'total_shots', 'blocked_shots',
+    'shots_insidebox', 'shots_outsidebox', 'fouls', 'corner_kicks', 'offsides',
+    'ball_possession', 'yellow_cards', 'red_cards', 'goalkeeper_saves', 'total_passes',
+    'passes_accurate', 'passes_%', 'goals_prevented',
+]
+STAT_INDEX = {key: i for i, key in enumerate(STAT_KEYS)}
+
+CHUNK_SIZE = 1 << 16
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[\s,]*')
+
+
+def history_path(league_id, data_dir=''):
+    """ data_dir : dossier des history_<id>.json ('' = dossier courant) """
+    return os.path.join(data_dir, f'history_{league_id}.json')
+
+
+def parse_round_number(round_name):
+    """ Même règle que les scripts JS : on garde les chiffres du libellé """
+    digits = re.sub(r'[^0-9]', '', round_name or '')
+    return int(digits) if digits else 0
+
+
+def parse_stat(value):
+    """ 12 / "2.21" / "61%" / None -> float (NaN si absent) """
+    if value is None:
+        return math.nan
+    if isinstance(value, str):
+        value = value.strip().rstrip('%')
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        # Valeur non numérique ("N/A") ou structure inattendue (dict, liste)
+        return math.nan
+
+
+def parse_stats(side):
+    if not side: return None
+    return array('f', [parse_stat(side.get(key)) for key in STAT_KEYS])
+
+
+class MatchRecord:
+    """ Projection compacte d'une fixture API-Football """
+    __slots__ = (
+        'fixture_id', 'timestamp', 'date', 'status', 'league_id', 'round_name', 'round_num',
+        'home_id', 'home_name', 'away_id', 'away_name',
+        'goals_h', 'goals_a', 'ht_h', 'ht_a', 'stats_h', 'stats_a',
+    )
+
+    def __init__(self, m):
+        fixture, league, teams = m['fixture'], m['league'], m['teams']
+        goals = m.get('goals') or {}
+        halftime = (m.get('score') or {}).get('halftime') or {}
+        stats = m.get('stats') or {}
+
+        self.fixture_id = fixture['id']
+        self.timestamp = fixture['timestamp']
+        self.date = fixture['date']
+        self.status = (fixture.get('status') or {}).get('short')
+        self.league_id = str(league['id'])
+        self.round_name = league['round']
+        self.round_num = parse_round_number(league['round'])
+        self.home_id = teams['home']['id']
+        self.home_name = teams['home']['name']
+        self.away_id = teams['away']['id']
+        self.away_name = teams['away']['name']
+        self.goals_h = goals.get('home')
+        self.goals_a = goals.get('away')
+        self.ht_h = halftime.get('home')
+        self.ht_a = halftime.get('away')
+        self.stats_h = parse_stats(stats.get('home'))
+        self.stats_a = parse_stats(stats.get('away'))
+
+    @property
+    def finished(self):
+        """ Match terminé (FT) avec un score """
+        return self.status == 'FT' and self.goals_h is not None
+
+    def stat(self, side, key):
+        """ Statistique numérique d'un côté ('home' / 'away'), NaN si absente """
+        stats = self.stats_h if side == 'home' else self.stats_a
+        return stats[STAT_INDEX[key]] if stats is not None else math.nan
+
+    @property
+    def xg_h(self):
+        return self.stat('home', 'expected_goals')
+
+    @property
+    def xg_a(self):
+        return self.stat('away', 'expected_goals')
+
+
+def iter_json_array(path, chunk_size=CHUNK_SIZE):
+    """ Décode un tableau JSON élément par élément, sans charger tout le fichier en objets """
+    with open(path, 'r', encoding='utf-8') as f:
+        # Espaces de tête éventuellement plus longs qu'un bloc : on lit jusqu'au premier caractère utile
+        buffer = ''
+        while not buffer:
+            more = f.read(chunk_size)
+            buffer = more.lstrip()
+            if not more: break
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} : un tableau JSON est attendu")
+        pos = 1
+        eof = False
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            try:
+                obj, end = _DECODER.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Objet coupé en fin de tampon : on lit la suite
+                if eof:
+                    raise
+                more = f.read(chunk_size)
+                eof = not more
+                # La partie déjà décodée n'est libérée qu'ici, une fois par bloc lu
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+            yield obj
+            pos = end
+
+
+def iter_matches(league_id, finished_only=False, data_dir=''):
+    """ MatchRecord de history_<id>.json, dans l'ordre du fichier """
+    path = history_path(league_id, data_dir)
+    if not os.path.exists(path): return
+    for m in iter_json_array(path):
+        record = MatchRecord(m)
+        if not finished_only or record.finished:
+            yield record
+
+
+def load_matches(league_id, finished_only=False):
+    return list(iter_matches(league_id, finished_only))
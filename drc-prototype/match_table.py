@@ -0,0 +1,203 @@
+import json
+import os
+import hashlib
+import numpy as np
+import match_records
+
+# Table de matchs colonnaire : on projette une seule fois les fixtures "FT" des
+# fichiers history_<id>.json dans quelques tableaux typés, mis en cache en .npz.
+# Le cache est invalidé dès qu'un fichier source change (taille / mtime / sha1).
+
+# Les 30 ligues du scanner (3_scanner.js), dans le même ordre
+ALL_LEAGUES = [
+    '39', '61', '140', '78', '135', '94', '88', '144', '179', '203',
+    '197', '119', '207', '218', '40', '62', '136', '79', '141', '106',
+    '210', '209', '283', '253', '71', '128', '262', '307', '98', '188'
+]
+
+CACHE_DIR = 'cache'
+CACHE_FILE = os.path.join(CACHE_DIR, 'match_table.npz')
+CACHE_VERSION = 4
+
+# Colonnes alignées (une ligne par match terminé)
+COLUMNS = {
+    'league':      np.int32,    # code dense -> league_ids
+    'fixture_id':  np.int64,
+    'timestamp':   np.int64,
+    'round':       np.int32,    # code dense -> round_names
+    'round_num':   np.int16,    # numéro extrait du libellé ("Regular Season - 12" -> 12)
+    'home':        np.int32,    # code dense -> team_ids / team_names
+    'away':        np.int32,
+    'goals_h':     np.uint8,
+    'goals_a':     np.uint8,
+    'xg_h':        np.float32,  # expected_goals du match (NaN si absent)
+    'xg_a':        np.float32,
+}
+
+# Vocabulaires qui traduisent les codes denses (et compteurs par ligue, non alignés sur les matchs)
+VOCABULARIES = ['league_ids', 'team_ids', 'team_names', 'round_names', 'not_finished', 'duplicates']
+
+history_path = match_records.history_path
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def source_signature(league_ids, data_dir=''):
+    """ Empreinte des fichiers sources : {fichier: [taille, mtime_ns, sha1]} """
+    signature = {}
+    for lid in league_ids:
+        path = history_path(lid, data_dir)
+        if os.path.exists(path):
+            st = os.stat(path)
+            signature[path] = [st.st_size, st.st_mtime_ns, None]
+    return signature
+
+
+def signature_matches(cached, current):
+    """ Taille + mtime identiques -> valide ; sinon on tranche avec le sha1 (simple 'touch')
+
+    Si valide, le sha1 connu est reporté dans current : le manifeste peut être réécrit tel
+    quel (voir signature_touched) pour ne pas rehacher le fichier à chaque chargement.
+    """
+    if set(cached) != set(current):
+        return False
+    for path, (size, mtime_ns, sha1) in current.items():
+        c_size, c_mtime_ns, c_sha1 = cached[path]
+        if size != c_size:
+            return False
+        if mtime_ns != c_mtime_ns and file_sha1(path) != c_sha1:
+            return False
+        current[path][2] = c_sha1
+    return True
+
+
+def signature_touched(cached, current):
+    """ Sources valides mais dont le mtime a changé : manifeste à mettre à jour """
+    return any(cached[path][1] != current[path][1] for path in current)
+
+
+def build_match_table(league_ids=ALL_LEAGUES, data_dir=''):
+    """ Projette toutes les fixtures FT en colonnes typées (une ligne par fixture) """
+    rows = {name: [] for name in COLUMNS}
+    team_codes, team_ids, team_names = {}, [], []
+    round_codes, round_names = {}, []
+    league_ids = [lid for lid in league_ids if os.path.exists(history_path(lid, data_dir))]
+    not_finished = [0] * len(league_ids)  # fixtures écartées car pas "FT", par ligue
+    duplicates = [0] * len(league_ids)    # fixtures répétées dans le fichier source, par ligue
+    seen = set()
+
+    def team_code(team_id, name):
+        if team_id not in team_codes:
+            team_codes[team_id] = len(team_ids)
+            team_ids.append(team_id)
+            team_names.append(name)
+        return team_codes[team_id]
+
+    def round_code(name):
+        if name not in round_codes:
+            round_codes[name] = len(round_names)
+            round_names.append(name)
+        return round_codes[name]
+
+    for code, lid in enumerate(league_ids):
+        for r in match_records.iter_matches(lid, data_dir=data_dir):
+            if not r.finished:
+                not_finished[code] += 1
+                continue
+            # Certains fichiers répètent des fixtures à l'identique : on garde la première occurrence
+            if r.fixture_id in seen:
+                duplicates[code] += 1
+                continue
+            seen.add(r.fixture_id)
+            rows['league'].append(code)
+            rows['fixture_id'].append(r.fixture_id)
+            rows['timestamp'].append(r.timestamp)
+            rows['round'].append(round_code(r.round_name))
+            rows['round_num'].append(r.round_num)
+            rows['home'].append(team_code(r.home_id, r.home_name))
+            rows['away'].append(team_code(r.away_id, r.away_name))
+            rows['goals_h'].append(r.goals_h)
+            rows['goals_a'].append(r.goals_a)
+            rows['xg_h'].append(r.xg_h)
+            rows['xg_a'].append(r.xg_a)
+
+    table = {name: np.array(values, dtype=COLUMNS[name]) for name, values in rows.items()}
+
+    # Ordre chronologique global (on ne teste jamais le passé avec le futur)
+    order = np.lexsort((table['fixture_id'], table['timestamp']))
+    table = {name: col[order] for name, col in table.items()}
+
+    table['league_ids'] = np.array(league_ids, dtype=str)
+    table['team_ids'] = np.array(team_ids, dtype=np.int32)
+    table['team_names'] = np.array(team_names, dtype=str)
+    table['round_names'] = np.array(round_names, dtype=str)
+    table['not_finished'] = np.array(not_finished, dtype=np.int32)
+    table['duplicates'] = np.array(duplicates, dtype=np.int32)
+    return table
+
+
+def save_match_table(table, signature, path=CACHE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for file_path, entry in signature.items():
+        if entry[2] is None:
+            entry[2] = file_sha1(file_path)
+    meta = json.dumps({'version': CACHE_VERSION, 'sources': signature})
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, _meta=np.array(meta), **table)
+    os.replace(tmp_path, path)
+
+
+def read_cache(path, signature):
+    """ Table en cache si elle correspond encore aux sources, sinon None """
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as cached:
+        meta = json.loads(str(cached['_meta']))
+        if meta.get('version') != CACHE_VERSION or not signature_matches(meta['sources'], signature):
+            return None
+        table = {name: cached[name] for name in list(COLUMNS) + VOCABULARIES}
+    if signature_touched(meta['sources'], signature):
+        save_match_table(table, signature, path)
+    return table
+
+
+def load_match_table(league_ids=ALL_LEAGUES, path=None, rebuild=False, data_dir=''):
+    """ Charge la table depuis le cache, ou la reconstruit si une source a changé
+
+    data_dir : dossier des history_<id>.json ; le cache par défaut est data_dir/cache/match_table.npz.
+    """
+    path = path or os.path.join(data_dir, CACHE_FILE)
+    signature = source_signature(league_ids, data_dir)
+    table = None if rebuild else read_cache(path, signature)
+    if table is None:
+        table = build_match_table(league_ids, data_dir)
+        save_match_table(table, signature, path)
+    return table
+
+
+def take(table, index):
+    """ Sous-table (masque booléen ou indices) ; les vocabulaires sont partagés """
+    # Toutes les colonnes alignées suivent, y compris celles ajoutées après chargement (features)
+    return {name: col if name in VOCABULARIES else col[index] for name, col in table.items()}
+
+
+def select_leagues(table, league_ids):
+    """ Ne garde que les matchs des ligues demandées """
+    wanted = np.isin(table['league_ids'], [str(lid) for lid in league_ids])
+    return take(table, wanted[table['league']])
+
+
+def match_count(table):
+    return len(table['fixture_id'])
+
+
+if __name__ == "__main__":
+    table = load_match_table(rebuild=True)
+    print(f"✅ Table compilée : {match_count(table)} matchs, {len(table['league_ids'])} ligues, "
+          f"{len(table['team_ids'])} équipes -> {CACHE_FILE}")
@@ -0,0 +1,243 @@
+import json
+import os
+from datetime import datetime
+from functools import cached_property
+import numpy as np
+import dixon_coles
+import elo_join
+import instrumentation
+import match_table
+import native_elo
+import standings
+import xg_features
+
+# API du modèle, importable sans effet de bord : le scanner, les backtests ou un
+# notebook peuvent réutiliser compute_lambdas / evaluate_model sans rien charger.
+# Les données (archive Elo, table de matchs, features, split) ne sont lues qu'au
+# premier accès via Dataset ; optuna et scipy ne sont importés que par les
+# commandes qui s'en servent (optimizer.py fit, fast_fit).
+
+LEAGUES = ['39', '61', '78', '140', '135', '94', '88', '197', '203']
+XG_WINDOW = xg_features.DEFAULT_WINDOW  # Fenêtre des moyennes xG glissantes (<= xg_features.MAX_WINDOW)
+ELO_ARCHIVE_FILE = 'elo_history_archive.json'
+BEST_PARAMS_FILE = 'best_params.json'
+TRAIN_FRACTION = 0.8
+MIN_MATCHES_FOR_VALIDATION = 100
+
+# --- FONCTIONS MATHÉMATIQUES (version scalaire, un match à la fois) ---
+
+def clubelo_win_probability(delta_elo):
+    return 1 / (10**(-delta_elo / 400) + 1)
+
+def dixon_coles_adjustment(goals_h, goals_a, lambda_h, lambda_a, rho):
+    if rho == 0: return 1.0
+    if goals_h == 0 and goals_a == 0: return 1 - (lambda_h * lambda_a * rho)
+    if goals_h == 0 and goals_a == 1: return 1 + (lambda_h * rho)
+    if goals_h == 1 and goals_a == 0: return 1 + (lambda_a * rho)
+    if goals_h == 1 and goals_a == 1: return 1 - rho
+    return 1.0
+
+def compute_lambdas(xg_h, xg_a, delta_elo, w_xg, w_elo, hfa):
+    delta_elo_adjusted = delta_elo + hfa
+    prob_win_h = clubelo_win_probability(delta_elo_adjusted)
+    prob_win_a = 1 - prob_win_h
+
+    # Formule de puissance Elo
+    lambda_h = xg_h * w_xg * ((prob_win_h / 0.5) ** w_elo)
+    lambda_a = xg_a * w_xg * ((prob_win_a / 0.5) ** w_elo)
+
+    return max(lambda_h, 0.01), max(lambda_a, 0.01)
+
+# --- CHARGEMENT ---
+
+def load_elo_archive(path=ELO_ARCHIVE_FILE):
+    if not os.path.exists(path):
+        raise FileNotFoundError("L'archive Elo est manquante.")
+    with instrumentation.stage('elo_archive'), open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_all_matches(window=XG_WINDOW, leagues=LEAGUES, data_dir='', table_leagues=match_table.ALL_LEAGUES):
+    """ Matchs terminés (FT) des ligues, avec la moyenne xG pré-match et le SDM de chaque match
+
+    data_dir : dossier des history_<id>.json ; table_leagues : ligues de la table en cache,
+    dont on garde `leagues` (les 30 ligues par défaut, cache partagé avec walk_forward).
+    """
+    with instrumentation.stage('load', leagues=len(leagues)) as info:
+        table = match_table.load_match_table(table_leagues, data_dir=data_dir)
+        table = match_table.select_leagues(table, leagues)
+        info['matches'] = match_table.match_count(table)
+    with instrumentation.stage('features', window=window):
+        rolling = xg_features.rolling_features(xg_features.build_features(table), window)
+        table['avg_xg_h'] = rolling['avg_xg_for_h']
+        table['avg_xg_a'] = rolling['avg_xg_for_a']
+        # Signal SDM de backtest.js (NaN avant la 6e journée), disponible comme feature
+        table['sdm'] = standings.build_standings(table)[0]['sdm']
+    return table
+
+def split_matches(matches, train_fraction=TRAIN_FRACTION):
+    """ Split chronologique (train, test, validation ?) : la table est déjà triée par date """
+    n_matches = match_table.match_count(matches)
+    if n_matches < MIN_MATCHES_FOR_VALIDATION:
+        return matches, match_table.take(matches, slice(0, 0)), False
+    split_idx = int(n_matches * train_fraction)
+    return match_table.take(matches, slice(0, split_idx)), match_table.take(matches, slice(split_idx, None)), True
+
+def build_match_arrays(matches, archive=None, elo=None):
+    """ Résout une seule fois Elo / xG / résultat de chaque match en tableaux alignés
+
+    elo : notes (elo_h, elo_a) déjà alignées sur matches (Elo natif) au lieu de l'archive ClubElo.
+    """
+    elo_h, elo_a = elo if elo is not None else elo_join.join_elo(matches, archive)
+    exclusion = elo_join.exclusion_mask(elo_h, elo_a, matches['avg_xg_h'], matches['avg_xg_a'])
+    keep = exclusion == elo_join.OK
+
+    return {
+        'xg_h': matches['avg_xg_h'][keep].astype(np.float64),
+        'xg_a': matches['avg_xg_a'][keep].astype(np.float64),
+        'delta_elo': elo_h[keep] - elo_a[keep],
+        'outcome': dixon_coles.match_outcomes(matches['goals_h'][keep], matches['goals_a'][keep]),
+        'sdm': matches['sdm'][keep],
+        'league': matches['league'][keep],
+        'round': matches['round'][keep],
+        'fixture_id': matches['fixture_id'][keep],
+        'goals_h': matches['goals_h'][keep],
+        'goals_a': matches['goals_a'][keep],
+        'row': np.flatnonzero(keep),
+        'exclusion': exclusion,
+        'errors': elo_join.exclusion_report(exclusion)
+    }
+
+def subset_data(data, index):
+    """ Sous-ensemble des tableaux d'évaluation (les compteurs d'erreurs restent ceux du tout) """
+    sub = {key: data[key][index] for key in ('xg_h', 'xg_a', 'delta_elo', 'outcome', 'row') if key in data}
+    sub['errors'] = data['errors']
+    return sub
+
+
+class Dataset:
+    """ Données du modèle, chargées au premier accès puis gardées en mémoire """
+
+    def __init__(self, window=XG_WINDOW, leagues=LEAGUES, archive_path=ELO_ARCHIVE_FILE, elo_params=None):
+        self.window = window
+        self.leagues = leagues
+        self.archive_path = archive_path
+        # Paramètres du moteur native_elo : Elo rejoué depuis l'historique au lieu de l'archive ClubElo
+        self.elo_params = elo_params
+
+    def with_elo_params(self, elo_params):
+        """ Même jeu de matchs (déjà chargé), autre source / réglage Elo """
+        other = Dataset(self.window, self.leagues, self.archive_path, elo_params)
+        if 'matches' in self.__dict__:
+            other.matches = self.matches
+        return other
+
+    @cached_property
+    def archive(self):
+        return load_elo_archive(self.archive_path)
+
+    @cached_property
+    def matches(self):
+        matches = load_all_matches(self.window, self.leagues)
+        print(f"✅ Base chargée : {match_table.match_count(matches)} matchs joués identifiés.")
+        return matches
+
+    @cached_property
+    def split(self):
+        train, test, use_validation = split_matches(self.matches)
+        if use_validation:
+            print(f"   📊 Train : {match_table.match_count(train)} | 🧪 Test : {match_table.match_count(test)}")
+        return train, test, use_validation
+
+    @property
+    def use_validation(self):
+        return self.split[2]
+
+    @cached_property
+    def arrays(self):
+        """ (train, test) évaluables ; une ligne d'exclusions par ligue dans les métriques """
+        train_matches, test_matches, _ = self.split
+        with instrumentation.stage('elo_join', native=self.elo_params is not None):
+            if self.elo_params is None:
+                archive = self.archive
+                train = build_match_arrays(train_matches, archive)
+                test = build_match_arrays(test_matches, archive)
+            else:
+                # Le train est un préfixe de la table : on découpe les notes rejouées au même endroit
+                elo_h, elo_a, _ = native_elo.replay(self.matches, self.elo_params)
+                split = match_table.match_count(train_matches)
+                train = build_match_arrays(train_matches, elo=(elo_h[:split], elo_a[:split]))
+                test = build_match_arrays(test_matches, elo=(elo_h[split:], elo_a[split:]))
+        # Pourquoi les matchs d'une ligue tombent (no_elo / no_xg / not_ft)
+        instrumentation.emit_exclusions(elo_join.exclusion_report_by_league(
+            self.matches, np.concatenate([train['exclusion'], test['exclusion']])))
+        return train, test
+
+    @property
+    def train_data(self):
+        return self.arrays[0]
+
+    @property
+    def test_data(self):
+        return self.arrays[1]
+
+
+_DATASET = None
+
+def get_dataset():
+    """ Jeu de données par défaut (ligues LEAGUES, fenêtre XG_WINDOW), partagé par le processus """
+    global _DATASET
+    if _DATASET is None:
+        _DATASET = Dataset()
+    return _DATASET
+
+def dataset_for(params):
+    """ Jeu par défaut, en Elo natif si les paramètres contiennent ceux du moteur (elo_k...) """
+    elo_params = {name: params[name] for name in native_elo.ELO_PARAM_BOUNDS if name in params}
+    return get_dataset().with_elo_params(elo_params) if elo_params else get_dataset()
+
+# --- ÉVALUATION ---
+
+def evaluate_model(data, params, mode="Training"):
+    """ Log-loss moyenne du modèle, en quelques opérations NumPy sur tous les matchs """
+    if len(data['outcome']) == 0: return 1e10
+
+    avg_loss = dixon_coles.average_log_loss(data['xg_h'], data['xg_a'], data['delta_elo'], data['outcome'], params)
+    if mode == "Test":
+        errors = data['errors']
+        print(f"   🔎 Rapport d'erreurs Test : Elo manquants={errors['no_elo']}, xG manquants={errors['no_xg']}")
+    return avg_loss
+
+def baseline_log_loss(train, test):
+    """ Référence naïve : fréquences H/D/A du train appliquées telles quelles au test """
+    if len(train['outcome']) == 0 or len(test['outcome']) == 0: return None
+    freqs = np.bincount(train['outcome'], minlength=3) / len(train['outcome'])
+    probs = np.broadcast_to(freqs, (len(test['outcome']), 3))
+    return float(dixon_coles.log_losses(probs, test['outcome']).mean())
+
+def load_params(path=BEST_PARAMS_FILE):
+    """ best_params d'un fichier exporté, ou None s'il est absent / incomplet """
+    if not os.path.exists(path): return None
+    with open(path, 'r', encoding='utf-8') as f:
+        params = json.load(f).get('best_params') or {}
+    return params if all(name in params for name in dixon_coles.PARAM_BOUNDS) else None
+
+def export_best_params(dataset, params, n_trials, method='tpe', path=BEST_PARAMS_FILE):
+    """ Écrit best_params.json avec les vraies log-loss (null si aucun match évaluable) """
+    train, test = dataset.train_data, dataset.test_data
+    report = {
+        "best_params": params,
+        "train_log_loss": evaluate_model(train, params) if len(train['outcome']) else None,
+        "test_log_loss": evaluate_model(test, params) if len(test['outcome']) else None,
+        "baseline_log_loss": baseline_log_loss(train, test),
+        "optimization_date": datetime.now().isoformat(),
+        "method": method,
+        "n_trials": n_trials,
+        "train_size": len(train['outcome']),
+        "test_size": len(test['outcome'])
+    }
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, path)
+    print(f"📁 Fichier créé : {path}")
+    return report
@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+import elo_join
+import match_table
+
+# Elo calculé localement en rejouant history_*.json dans l'ordre chronologique :
+# plus de téléchargements ClubElo ni de CLUB_NAME_MAPPING, et les 30 ligues sont
+# couvertes. Chaque ligue a son tableau de notes NumPy indexé par les codes d'équipe
+# locaux ; une seule passe sur la table donne la note pré-match des deux équipes de
+# chaque match (alignée sur la table, comme elo_join.join_elo), et build_archive la
+# remet au format de elo_history_archive.json { ligue: { journée: { équipe: elo } } }.
+#
+# Mise à jour après chaque match :
+#   attendu = 1 / (1 + 10^(-(elo_dom + hfa - elo_ext) / 400))
+#   delta   = k * multiplicateur(écart) * (score - attendu)
+#   multiplicateur = 1 + gd * ln(max(|écart de buts|, 1))   (1 pour un nul ou un but d'écart)
+
+INITIAL_RATING = 1500.0
+NATIVE_ARCHIVE_FILE = 'elo_native_archive.json'
+
+DEFAULT_PARAMS = {'elo_k': 20.0, 'elo_gd': 1.0, 'elo_hfa': 65.0}
+
+# Espace de recherche des paramètres du moteur (ajouté à dixon_coles.PARAM_BOUNDS par optimizer --native-elo)
+ELO_PARAM_BOUNDS = {
+    'elo_k': (5.0, 60.0),
+    'elo_gd': (0.0, 2.0),
+    'elo_hfa': (0.0, 120.0),
+}
+
+
+def engine_params(params):
+    """ (k, gd, hfa) depuis un dict de paramètres, valeurs par défaut sinon """
+    return tuple(float(params.get(name, DEFAULT_PARAMS[name])) for name in ('elo_k', 'elo_gd', 'elo_hfa'))
+
+
+def league_codes(table):
+    """ Code d'équipe local à sa ligue (0..T-1) pour chaque match, et nombre d'équipes par ligue """
+    home_local = np.empty(match_table.match_count(table), dtype=np.int64)
+    away_local = np.empty_like(home_local)
+    teams = {}
+    for code in range(len(table['league_ids'])):
+        index = np.flatnonzero(table['league'] == code)
+        if not len(index): continue
+        codes, inverse = np.unique(np.concatenate([table['home'][index], table['away'][index]]), return_inverse=True)
+        home_local[index], away_local[index] = inverse[:len(index)], inverse[len(index):]
+        teams[code] = codes
+    return home_local, away_local, teams
+
+
+def replay(table, params=DEFAULT_PARAMS, codes=None):
+    """ Notes pré-match (elo_h, elo_a) de chaque match et notes finales {code ligue: tableau}
+
+    codes : résultat de league_codes(table), à réutiliser d'un appel à l'autre (essais Optuna).
+    """
+    k, gd_weight, hfa = engine_params(params)
+    home_local, away_local, teams = codes or league_codes(table)
+    ratings = {code: np.full(len(team_codes), INITIAL_RATING) for code, team_codes in teams.items()}
+    # Listes Python : la boucle séquentielle est bien plus rapide sur des scalaires natifs
+    lists = {code: r.tolist() for code, r in ratings.items()}
+
+    n = match_table.match_count(table)
+    elo_h, elo_a = [0.0] * n, [0.0] * n
+    order = np.argsort(table['timestamp'], kind='stable').tolist()
+    leagues = table['league'].tolist()
+    home, away = home_local.tolist(), away_local.tolist()
+    goals_h, goals_a = table['goals_h'].tolist(), table['goals_a'].tolist()
+    log = np.log
+
+    for i in order:
+        r = lists[leagues[i]]
+        h, a = home[i], away[i]
+        rh, ra = r[h], r[a]
+        elo_h[i], elo_a[i] = rh, ra
+
+        diff = goals_h[i] - goals_a[i]
+        expected = 1 / (1 + 10 ** (-(rh + hfa - ra) / 400))
+        score = 1.0 if diff > 0 else 0.5 if diff == 0 else 0.0
+        margin = abs(diff)
+        multiplier = 1 + gd_weight * float(log(margin)) if margin > 1 else 1.0
+        delta = k * multiplier * (score - expected)
+        r[h] = rh + delta
+        r[a] = ra - delta
+
+    for code, values in lists.items():
+        ratings[code][:] = values
+    return np.array(elo_h), np.array(elo_a), ratings
+
+
+def build_archive(table, elo_h, elo_a):
+    """ Archive { ligue: { journée: { nom d'équipe: elo } } } lisible par elo_join.join_elo """
+    archive = {}
+    leagues, rounds = table['league'].tolist(), table['round'].tolist()
+    home, away = table['home'].tolist(), table['away'].tolist()
+    for i in range(match_table.match_count(table)):
+        entry = archive.setdefault(str(table['league_ids'][leagues[i]]), {}).setdefault(
+            str(table['round_names'][rounds[i]]), {})
+        # Premier match de l'équipe dans la journée, comme l'Elo de début de journée de ClubElo
+        entry.setdefault(str(table['team_names'][home[i]]), float(elo_h[i]))
+        entry.setdefault(str(table['team_names'][away[i]]), float(elo_a[i]))
+    return archive
+
+
+def current_ratings(table, ratings):
+    """ Notes après le dernier match joué : { ligue: { nom d'équipe: elo } } """
+    _, _, teams = league_codes(table)
+    return {str(table['league_ids'][code]): {str(table['team_names'][t]): float(v)
+                                             for t, v in zip(teams[code], ratings[code])}
+            for code in ratings}
+
+
+def save_archive(archive, path=NATIVE_ARCHIVE_FILE):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(archive, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Elo natif rejoué depuis history_*.json")
+    parser.add_argument('--k', type=float, default=DEFAULT_PARAMS['elo_k'])
+    parser.add_argument('--gd', type=float, default=DEFAULT_PARAMS['elo_gd'])
+    parser.add_argument('--hfa', type=float, default=DEFAULT_PARAMS['elo_hfa'])
+    parser.add_argument('--output', default=NATIVE_ARCHIVE_FILE)
+    args = parser.parse_args()
+    params = {'elo_k': args.k, 'elo_gd': args.gd, 'elo_hfa': args.hfa}
+
+    table = match_table.load_match_table(match_table.ALL_LEAGUES)
+    start = time.perf_counter()
+    elo_h, elo_a, ratings = replay(table, params)
+    seconds = time.perf_counter() - start
+    print(f"✅ {match_table.match_count(table)} matchs rejoués ({len(ratings)} ligues) en {seconds * 1000:.1f} ms")
+
+    # Cohérence avec ClubElo là où l'archive existe (écarts domicile - extérieur)
+    if os.path.exists('elo_history_archive.json'):
+        with open('elo_history_archive.json', 'r', encoding='utf-8') as f:
+            club_h, club_a = elo_join.join_elo(table, json.load(f))
+        ok = ~np.isnan(club_h) & ~np.isnan(club_a)
+        if ok.sum() > 2:
+            corr = np.corrcoef(elo_h[ok] - elo_a[ok], club_h[ok] - club_a[ok])[0, 1]
+            print(f"   🔎 Corrélation des écarts avec ClubElo : {corr:.3f} ({ok.sum()} matchs)")
+
+    save_archive(build_archive(table, elo_h, elo_a), args.output)
+    print(f"📁 Fichier créé : {args.output}")
@@ -0,0 +1,248 @@
+import json
+import os
+import shutil
+import time
+import numpy as np
+import match_table
+
+# Cotes bookmaker en colonnes typées : les listes {"value": "Over 2.5", "odd": "1.55"}
+# de ultimate_<id>.json sont lues une seule fois, projetées en codes (marché, sélection,
+# bookmaker), ligne en float et cote en float32, avec la probabilité implicite
+# débarrassée de la marge (normalisation proportionnelle dans chaque marché). Chaque
+# colonne est un .npy de cache/odds_store/, ouvert en mémoire mappée. Les lignes sont
+# triées par une clé entière (fixture, marché, ligne, bookmaker, sélection) : retrouver
+# la cote de N matchs est un searchsorted, et les lignes d'un match ou d'un marché
+# forment une plage contiguë.
+
+STORE_DIR = os.path.join('cache', 'odds_store')
+STORE_VERSION = 1
+
+# Marchés : libellé du fichier -> code
+BTTS, OVER_UNDER, HT_FT = 0, 1, 2
+MARKETS = ['btts', 'over_under', 'ht_ft']
+# "HSH" dans les fichiers : malgré le nom, ce sont des cotes mi-temps / fin de match (Home/Draw...)
+MARKET_LABELS = {'BTTS': BTTS, 'OU25': OVER_UNDER, 'HSH': HT_FT}
+
+YES, NO, OVER, UNDER = 0, 1, 2, 3
+SELECTIONS = ['yes', 'no', 'over', 'under',
+              'home/home', 'home/draw', 'home/away', 'draw/home', 'draw/draw', 'draw/away',
+              'away/home', 'away/draw', 'away/away']
+SELECTION_CODES = {name: code for code, name in enumerate(SELECTIONS)}
+
+# Les fichiers actuels ne gardent que le premier bookmaker de l'API
+DEFAULT_BOOKMAKER = 'api_football_first'
+
+COLUMNS = {
+    'key':        np.int64,    # clé de tri (voir encode_keys)
+    'fixture_id': np.int64,
+    'league':     np.int16,    # code -> league_ids
+    'market':     np.uint8,    # code -> MARKETS
+    'line':       np.float32,  # NaN pour BTTS / HT-FT
+    'selection':  np.uint8,    # code -> SELECTIONS
+    'bookmaker':  np.uint16,   # code -> bookmakers
+    'odd':        np.float32,
+    'implied':    np.float32,  # probabilité implicite sans marge
+    'overround':  np.float32,  # somme des 1/cote du marché (1.05 = 5 % de marge)
+}
+VOCABULARIES = ['league_ids', 'bookmakers']
+
+# Largeur des champs de la clé : fixture | marché (4) | ligne (256 quarts) | bookmaker (64) | sélection (16)
+_MARKET_SLOTS, _LINE_SLOTS, _BOOKMAKER_SLOTS, _SELECTION_SLOTS = 4, 256, 64, 16
+_LINE_OFFSET = 128
+
+
+def line_codes(lines):
+    """ Ligne en quarts de but (0.25 -> ...), 0 si pas de ligne """
+    lines = np.asarray(lines, dtype=np.float64)
+    return np.where(np.isnan(lines), 0, np.round(np.nan_to_num(lines) * 4) + _LINE_OFFSET).astype(np.int64)
+
+
+def encode_keys(fixture_ids, markets, lines, bookmakers, selections):
+    key = np.asarray(fixture_ids, dtype=np.int64) * _MARKET_SLOTS + markets
+    key = key * _LINE_SLOTS + line_codes(lines)
+    key = key * _BOOKMAKER_SLOTS + bookmakers
+    return key * _SELECTION_SLOTS + selections
+
+
+def parse_value(market, value):
+    """ (ligne, code sélection) d'un libellé ; None si inconnu """
+    label = str(value).strip().lower()
+    if market == OVER_UNDER:
+        side, _, line = label.partition(' ')
+        if side not in ('over', 'under'): return None
+        try:
+            return float(line), SELECTION_CODES[side]
+        except ValueError:
+            return None
+    code = SELECTION_CODES.get(label)
+    return (np.nan, code) if code is not None else None
+
+
+def odds_path(league_id):
+    return f'ultimate_{league_id}.json'
+
+
+def build_store(league_ids=match_table.ALL_LEAGUES):
+    """ Lit les ultimate_*.json présents ; renvoie (colonnes triées, vocabulaires, lignes ignorées) """
+    rows = {name: [] for name in ('fixture_id', 'league', 'market', 'line', 'selection', 'bookmaker', 'odd')}
+    leagues, bookmakers, skipped = [], [DEFAULT_BOOKMAKER], 0
+    for lid in league_ids:
+        path = odds_path(lid)
+        if not os.path.exists(path): continue
+        with open(path, 'r', encoding='utf-8') as f:
+            fixtures = json.load(f)
+        league = len(leagues)
+        leagues.append(str(lid))
+        for m in fixtures:
+            name = m.get('bookmaker') or DEFAULT_BOOKMAKER
+            if name not in bookmakers: bookmakers.append(name)
+            bookmaker = bookmakers.index(name)
+            for label, values in (m.get('odds') or {}).items():
+                market = MARKET_LABELS.get(label)
+                for o in values or []:
+                    parsed = parse_value(market, o.get('value')) if market is not None else None
+                    try:
+                        odd = float(o.get('odd'))
+                    except (TypeError, ValueError):
+                        odd = np.nan
+                    if parsed is None or not odd > 1:
+                        skipped += 1
+                        continue
+                    rows['fixture_id'].append(m['info']['id'])
+                    rows['league'].append(league)
+                    rows['market'].append(market)
+                    rows['line'].append(parsed[0])
+                    rows['selection'].append(parsed[1])
+                    rows['bookmaker'].append(bookmaker)
+                    rows['odd'].append(odd)
+
+    store = {name: np.array(values, dtype=COLUMNS[name]) for name, values in rows.items()}
+    store['key'] = encode_keys(store['fixture_id'], store['market'], store['line'],
+                               store['bookmaker'].astype(np.int64), store['selection'])
+    # Doublons éventuels (même fixture / marché / sélection listés deux fois) : on garde le premier
+    keys, first = np.unique(store['key'], return_index=True)
+    store = {name: col[first] for name, col in store.items()}
+
+    # Marge retirée par normalisation dans chaque groupe (fixture, marché, ligne, bookmaker)
+    inv = 1.0 / store['odd'].astype(np.float64)
+    _, group = np.unique(store['key'] // _SELECTION_SLOTS, return_inverse=True)
+    overround = np.bincount(group.ravel(), weights=inv)[group.ravel()] if len(inv) else inv
+    store['implied'] = (inv / overround).astype(np.float32)
+    store['overround'] = overround.astype(np.float32)
+
+    vocab = {'league_ids': leagues, 'bookmakers': bookmakers}
+    return {name: store[name].astype(dtype) for name, dtype in COLUMNS.items()}, vocab, skipped
+
+
+def source_signature(league_ids):
+    signature = {}
+    for lid in league_ids:
+        path = odds_path(lid)
+        if os.path.exists(path):
+            st = os.stat(path)
+            signature[path] = [st.st_size, st.st_mtime_ns, None]
+    return signature
+
+
+def save_store(store, vocab, signature, directory=STORE_DIR):
+    """ Une colonne .npy par fichier ; le dossier complet remplace l'ancien d'un coup """
+    for path, entry in signature.items():
+        if entry[2] is None:
+            entry[2] = match_table.file_sha1(path)
+    tmp_dir, old_dir = directory + '.tmp', directory + '.old'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, col in store.items():
+        np.save(os.path.join(tmp_dir, f'{name}.npy'), col)
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'version': STORE_VERSION, 'sources': signature, 'vocabularies': vocab}, f)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(directory):
+        os.replace(directory, old_dir)
+    os.replace(tmp_dir, directory)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def read_store(directory, signature):
+    """ Colonnes mappées en mémoire si le cache correspond aux sources, sinon None """
+    meta_path = os.path.join(directory, 'meta.json')
+    if not os.path.exists(meta_path): return None
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('version') != STORE_VERSION or not match_table.signature_matches(meta['sources'], signature):
+        return None
+    if match_table.signature_touched(meta['sources'], signature):
+        meta['sources'] = signature
+        tmp_path = meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+    store = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in COLUMNS}
+    store.update({name: np.array(values) for name, values in meta['vocabularies'].items()})
+    return store
+
+
+def load_store(league_ids=match_table.ALL_LEAGUES, directory=STORE_DIR, rebuild=False):
+    """ Store mappé en mémoire, reconstruit si un ultimate_*.json a changé """
+    signature = source_signature(league_ids)
+    store = None if rebuild else read_store(directory, signature)
+    if store is None:
+        columns, vocab, _ = build_store(league_ids)
+        save_store(columns, vocab, signature, directory)
+        store = read_store(directory, signature)
+    return store
+
+
+def lookup(store, fixture_ids, market, selection, line=None, bookmaker=0):
+    """ Ligne du store pour chaque fixture (-1 si pas de cote) ; market / selection : codes """
+    fixture_ids = np.asarray(fixture_ids, dtype=np.int64)
+    lines = np.full(len(fixture_ids), np.nan if line is None else line)
+    keys = encode_keys(fixture_ids, market, lines, bookmaker, selection)
+    pos = np.searchsorted(store['key'], keys)
+    found = pos < len(store['key'])
+    found[found] = store['key'][pos[found]] == keys[found]
+    return np.where(found, pos, -1)
+
+
+def join(store, fixture_ids, market, selection, line=None, bookmaker=0):
+    """ (cote, probabilité sans marge) alignées sur fixture_ids, NaN si absentes """
+    rows = lookup(store, fixture_ids, market, selection, line, bookmaker)
+    found = rows >= 0
+    odd = np.full(len(rows), np.nan, dtype=np.float32)
+    implied = np.full(len(rows), np.nan, dtype=np.float32)
+    odd[found] = store['odd'][rows[found]]
+    implied[found] = store['implied'][rows[found]]
+    return odd, implied
+
+
+def fixture_rows(store, fixture_id, market=None):
+    """ Plage des lignes d'un match (ou d'un de ses marchés) : tranche contiguë du store """
+    base = int(fixture_id) * _MARKET_SLOTS
+    low, high = (base, base + _MARKET_SLOTS) if market is None else (base + market, base + market + 1)
+    span = _LINE_SLOTS * _BOOKMAKER_SLOTS * _SELECTION_SLOTS
+    start, stop = np.searchsorted(store['key'], [low * span, high * span])
+    return slice(int(start), int(stop))
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    columns, vocab, skipped = build_store()
+    signature = source_signature(match_table.ALL_LEAGUES)
+    save_store(columns, vocab, signature)
+    build_seconds = time.perf_counter() - start
+    store = load_store()
+    n_fixtures = len(np.unique(store['fixture_id']))
+    print(f"✅ {len(store['key'])} cotes, {n_fixtures} matchs, {len(vocab['league_ids'])} ligues "
+          f"({skipped} libellés ignorés) en {build_seconds * 1000:.1f} ms -> {STORE_DIR}")
+    for code, name in enumerate(MARKETS):
+        in_market = np.asarray(store['market']) == code
+        if in_market.any():
+            margin = (np.asarray(store['overround'])[in_market] - 1).mean()
+            print(f"   📦 {name:10s} {in_market.sum():5d} cotes, marge moyenne {margin * 100:.1f}%")
+
+    # Jointure vectorisée sur tous les matchs de la table
+    table = match_table.load_match_table()
+    start = time.perf_counter()
+    odd, implied = join(store, table['fixture_id'], OVER_UNDER, OVER, line=2.5)
+    print(f"   ⚡ Over 2.5 joint sur {match_table.match_count(table)} matchs en "
+          f"{(time.perf_counter() - start) * 1000:.2f} ms ({np.isfinite(odd).sum()} cotés)")
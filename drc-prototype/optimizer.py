@@ -1,147 +1,260 @@
-import json
-import numpy as np
-import optuna
-from scipy.stats import poisson
+import argparse
 import os
+import sys
 from datetime import datetime
+import dixon_coles
+import instrumentation
+import model
 
-# --- 1. CONFIGURATION ET CHARGEMENT ---
-LEAGUES = ['39', '61', '78', '140', '135', '94', '88', '197', '203']
-
-def load_all_matches():
-    all_matches = []
-    for lid in LEAGUES:
-        file_path = f'history_{lid}.json'
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                for m in data:
-                    # FILTRE CRUCIAL : On ne prend que les matchs terminés avec un score
-                    status = m.get('fixture', {}).get('status', {}).get('short')
-                    goals_h = m.get('goals', {}).get('home')
-                    
-                    if status == 'FT' and goals_h is not None:
-                        m['league_id_str'] = str(lid)
-                        all_matches.extend([m])
-    return all_matches
-
-# Chargement de l'archive Elo
-if not os.path.exists('elo_history_archive.json'):
-    raise FileNotFoundError("L'archive Elo est manquante.")
-
-with open('elo_history_archive.json', 'r', encoding='utf-8') as f:
-    ELO_ARCHIVE = json.load(f)
-
-MATCHES = load_all_matches()
-
-# Split Chronologique
-if len(MATCHES) < 100:
-    TRAIN_MATCHES = MATCHES
-    TEST_MATCHES = []
-    USE_VALIDATION = False
-else:
-    # On trie par date pour ne pas tester sur le passé avec des données du futur
-    MATCHES.sort(key=lambda x: x['fixture']['date'])
-    split_idx = int(len(MATCHES) * 0.8)
-    TRAIN_MATCHES = MATCHES[:split_idx]
-    TEST_MATCHES = MATCHES[split_idx:]
-    USE_VALIDATION = True
-
-print(f"✅ Base chargée : {len(MATCHES)} matchs joués identifiés.")
-if USE_VALIDATION:
-    print(f"   📊 Train : {len(TRAIN_MATCHES)} | 🧪 Test : {len(TEST_MATCHES)}")
-
-# --- 2. FONCTIONS MATHÉMATIQUES ---
-
-def clubelo_win_probability(delta_elo):
-    return 1 / (10**(-delta_elo / 400) + 1)
-
-def dixon_coles_adjustment(goals_h, goals_a, lambda_h, lambda_a, rho):
-    if rho == 0: return 1.0
-    if goals_h == 0 and goals_a == 0: return 1 - (lambda_h * lambda_a * rho)
-    if goals_h == 0 and goals_a == 1: return 1 + (lambda_h * rho)
-    if goals_h == 1 and goals_a == 0: return 1 + (lambda_a * rho)
-    if goals_h == 1 and goals_a == 1: return 1 - rho
-    return 1.0
-
-def compute_lambdas(xg_h, xg_a, delta_elo, w_xg, w_elo, hfa):
-    delta_elo_adjusted = delta_elo + hfa
-    prob_win_h = clubelo_win_probability(delta_elo_adjusted)
-    prob_win_a = 1 - prob_win_h
-    
-    # Formule de puissance Elo
-    lambda_h = xg_h * w_xg * ((prob_win_h / 0.5) ** w_elo)
-    lambda_a = xg_a * w_xg * ((prob_win_a / 0.5) ** w_elo)
-    
-    return max(lambda_h, 0.01), max(lambda_a, 0.01)
-
-def evaluate_model(matches, params, mode="Training"):
-    w_xg, w_elo, rho, hfa = params['w_xg'], params['w_elo'], params['rho'], params['hfa']
-    total_log_loss = 0
-    count = 0
-    errors = {"no_elo": 0, "no_xg": 0}
-
-    for m in matches:
-        lid = m['league_id_str']
-        round_name = m['league']['round']
-        h_name = m['teams']['home']['name']
-        a_name = m['teams']['away']['name']
-        
-        # 1. Check Elo
-        h_elo = ELO_ARCHIVE.get(lid, {}).get(round_name, {}).get(h_name)
-        a_elo = ELO_ARCHIVE.get(lid, {}).get(round_name, {}).get(a_name)
-        
-        if h_elo is None or a_elo is None:
-            errors["no_elo"] += 1
-            continue
-
-        # 2. Check xG
-        xg_h = m.get('stats', {}).get('home', {}).get('avg_xg')
-        xg_a = m.get('stats', {}).get('away', {}).get('avg_xg')
-        if xg_h is None or xg_a is None:
-            errors["no_xg"] += 1
-            continue
-
-        # 3. Calcul
-        lh, la = compute_lambdas(xg_h, xg_a, h_elo - a_elo, w_xg, w_elo, hfa)
-        
-        prob_h, prob_d, prob_a = 0, 0, 0
-        for i in range(8):
-            for j in range(8):
-                p = poisson.pmf(i, lh) * poisson.pmf(j, la) * dixon_coles_adjustment(i, j, lh, la, rho)
-                if i > j: prob_h += p
-                elif i == j: prob_d += p
-                else: prob_a += p
-
-        # Log-Loss sur le résultat réel
-        actual_h, actual_a = m['goals']['home'], m['goals']['away']
-        res_prob = prob_h if actual_h > actual_a else (prob_d if actual_h == actual_a else prob_a)
-        
-        total_log_loss -= np.log(max(res_prob, 1e-10))
-        count += 1
-
-    if count == 0: return 1e10
-    
-    avg_loss = total_log_loss / count
-    if mode == "Test":
-        print(f"   🔎 Rapport d'erreurs Test : Elo manquants={errors['no_elo']}, xG manquants={errors['no_xg']}")
-    return avg_loss
+# Ligne de commande du modèle (l'API importable est dans model.py) :
+#   python optimizer.py fit [--fast] [--trials 200 --jobs 8 --lookup]
+#   python optimizer.py fit --per-league [--shrinkage 200 --leagues all]
+#   python optimizer.py fit --native-elo   (Elo rejoué localement, k / gd / hfa du moteur dans l'étude)
+#   python optimizer.py evaluate [--params best_params.json] [--bootstrap 10000 --against old.json]
+#   python optimizer.py export-params --study drc_global
+# Sans sous-commande, `python optimizer.py [options]` lance fit comme avant.
+# Optuna, scipy et la table de probabilités ne sont importés que par fit / export-params.
+
+COMMANDS = ('fit', 'evaluate', 'export-params')
+
+# Données des essais Optuna, fixées par set_objective_data (dans fit, puis dans chaque worker)
+TRAIN_CHUNKS = []
+# Calcul des probabilités H/D/A dans la boucle Optuna (--lookup : table précalculée)
+OUTCOME_PROBABILITIES = None
+# --native-elo : (table de matchs, codes locaux) rejouée par native_elo à chaque essai
+NATIVE_ELO = None
+
+def set_objective_data(chunks, lookup=False, native=None):
+    """ Tranches du train, table de probabilités (--lookup) et Elo natif (--native-elo) de l'objectif """
+    global TRAIN_CHUNKS, OUTCOME_PROBABILITIES, NATIVE_ELO
+    TRAIN_CHUNKS, NATIVE_ELO = chunks, native
+    OUTCOME_PROBABILITIES = None
+    if lookup:
+        import prob_table
+        OUTCOME_PROBABILITIES = prob_table.load_table().outcome_probabilities
 
 def objective(trial):
-    p = {
-        'w_xg': trial.suggest_float('w_xg', 0.5, 2.0),
-        'w_elo': trial.suggest_float('w_elo', 0.1, 2.0),
-        'rho': trial.suggest_float('rho', -0.1, 0.2),
-        'hfa': trial.suggest_float('hfa', 20, 120)
+    import optuna
+
+    bounds = dict(dixon_coles.PARAM_BOUNDS)
+    if NATIVE_ELO is not None:
+        import native_elo
+        bounds.update(native_elo.ELO_PARAM_BOUNDS)
+    p = {name: trial.suggest_float(name, low, high) for name, (low, high) in bounds.items()}
+
+    elo_diff = None
+    if NATIVE_ELO is not None:
+        # Les paramètres du moteur changent les notes : on rejoue l'historique (quelques ms)
+        elo_h, elo_a, _ = native_elo.replay(NATIVE_ELO[0], p, NATIVE_ELO[1])
+        elo_diff = elo_h - elo_a
+
+    # Log-loss cumulée rapportée à chaque palier : les essais sans espoir s'arrêtent tôt
+    total_loss, count = 0.0, 0
+    for step, chunk in enumerate(TRAIN_CHUNKS):
+        delta_elo = chunk['delta_elo'] if elo_diff is None else elo_diff[chunk['row']]
+        losses = dixon_coles.match_log_losses(chunk['xg_h'], chunk['xg_a'], delta_elo, chunk['outcome'], p,
+                                                 OUTCOME_PROBABILITIES)
+        total_loss += losses.sum()
+        count += len(losses)
+        if count == 0: continue
+        trial.report(total_loss / count, step)
+        if step < len(TRAIN_CHUNKS) - 1 and trial.should_prune():
+            raise optuna.TrialPruned()
+
+    return total_loss / count if count else 1e10
+
+def print_results(dataset, params):
+    print(f"\n🏆 MEILLEURS PARAMÈTRES : {params}")
+    if dataset.use_validation:
+        print("\n🧪 ÉVALUATION SUR TEST SET :")
+        model.evaluate_model(dataset.test_data, params, mode="Test")
+
+def default_study_name(args):
+    """ Une étude par objectif : drc_global (ClubElo), drc_global_native, drc_global_lookup... """
+    return 'drc_global' + ('_native' if args.native_elo else '') + ('_lookup' if args.lookup else '')
+
+def study_config(args, dataset, train):
+    """ Empreinte de l'objectif Optuna, gardée dans l'étude pour refuser une reprise incompatible """
+    return {
+        'elo': 'native' if args.native_elo else 'clubelo',
+        'lookup': bool(args.lookup),
+        'xg_window': dataset.window,
+        'leagues': [str(league) for league in dataset.leagues],
+        'train_size': len(train['outcome']),
     }
-    return evaluate_model(TRAIN_MATCHES, p)
 
-# --- 3. OPTIMISATION ---
-study = optuna.create_study(direction='minimize')
-study.optimize(objective, n_trials=100)
+def fit(args):
+    if args.per_league:
+        leagues = model.LEAGUES if args.leagues is None else args.leagues.split(',')
+        if args.leagues == 'all':
+            import match_table
+            leagues = match_table.ALL_LEAGUES
+        dataset = model.Dataset(leagues=leagues)
+    else:
+        dataset = model.get_dataset()
+    if args.native_elo:
+        import native_elo
+        dataset = dataset.with_elo_params(native_elo.DEFAULT_PARAMS)
+    train = dataset.train_data
+    if len(train['outcome']) == 0:
+        errors = train['errors']
+        print(f"❌ Aucun match évaluable dans le train (Elo manquants={errors['no_elo']}, xG manquants={errors['no_xg']}).")
+        return 1
+
+    if args.per_league:
+        # Une ligue par processus, tableaux en mémoire partagée (league_fit)
+        import league_fit
+        league_fit.run(dataset, shrinkage=args.shrinkage, processes=args.jobs)
+        return 0
+
+    if args.fast:
+        import fast_fit
+        with instrumentation.stage('fast_fit') as info:
+            result = fast_fit.fit(train)
+            info['n_evals'] = result['n_evals']
+        print(f"⚡ L-BFGS-B : {result['n_evals']} évaluations, log-loss train {result['loss']:.4f} ({result['message']})")
+        best_params, n_trials, method = result['params'], result['n_evals'], 'lbfgs'
+        if args.native_elo:
+            best_params.update(native_elo.DEFAULT_PARAMS)
+    else:
+        import study_runner
+        # Tranches croissantes du train pour l'élagage (successive halving), prêtes avant le fork
+        chunks = [model.subset_data(train, idx) for idx in study_runner.stratified_chunks(len(train['outcome']))]
+        if args.lookup:
+            # Table mappée en mémoire : chaque worker la rouvre sans copie
+            import prob_table
+            table = prob_table.load_table()
+            bound = max(table.error_bounds[m] for m in ('home', 'draw', 'away'))
+            print(f"⚡ Table de probabilités : erreur d'interpolation 1X2 <= {bound:.1e}")
+        native = (dataset.matches, native_elo.league_codes(dataset.matches)) if args.native_elo else None
+        # Données passées explicitement aux workers : sous 'spawn' les globales du module sont vides
+        initargs = (chunks, args.lookup, native)
+        set_objective_data(*initargs)
+        study_name = args.study or default_study_name(args)
+        since = datetime.now()
+        try:
+            with instrumentation.stage('optimize', trials=args.trials, jobs=args.jobs) as info:
+                study = study_runner.run_study(objective, study_name, args.storage or study_runner.DEFAULT_STORAGE,
+                                               args.trials, args.jobs, callbacks=[instrumentation.trial_callback],
+                                               initializer=set_objective_data, initargs=initargs,
+                                               config=study_config(args, dataset, train),
+                                               pruner=study_runner.make_pruner(args.pruner))
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        instrumentation.study_summary(study, since, info['wall_s'])
+        best_params, n_trials, method = study.best_params, study_runner.completed_trials(study), 'tpe'
+        if args.native_elo:
+            dataset = dataset.with_elo_params(best_params)
+
+    print_results(dataset, best_params)
+    model.export_best_params(dataset, best_params, n_trials, method, args.output)
+    return 0
+
+def evaluate(args):
+    params = model.load_params(args.params)
+    if params is None:
+        print(f"❌ Paramètres introuvables ou incomplets : {args.params}")
+        return 1
+    dataset = model.dataset_for(params)
+    train, test = dataset.train_data, dataset.test_data
+    print(f"\n📦 Paramètres : {params}")
+    if len(train['outcome']):
+        print(f"   📊 Log-loss train : {model.evaluate_model(train, params):.4f} ({len(train['outcome'])} matchs)")
+    if len(test['outcome']):
+        loss = model.evaluate_model(test, params, mode="Test")
+        print(f"   🧪 Log-loss test  : {loss:.4f} ({len(test['outcome'])} matchs)")
+    baseline = model.baseline_log_loss(train, test)
+    if baseline is not None:
+        print(f"   ⚖️ Référence naïve : {baseline:.4f}")
+
+    if args.bootstrap:
+        # IC par journées rééchantillonnées, sur le test (le train si pas de validation)
+        import bootstrap
+        import odds_store
+        against = None
+        if args.against:
+            against = model.load_params(args.against)
+            if against is None:
+                print(f"❌ Paramètres introuvables ou incomplets : {args.against}")
+                return 1
+        data = test if len(test['outcome']) else train
+        with instrumentation.stage('bootstrap', resamples=args.bootstrap):
+            report = bootstrap.bootstrap_report(data, params, odds_store.load_store(), against,
+                                                args.bootstrap, seed=args.seed)
+        if report: bootstrap.print_report(report)
+    return 0
+
+def export_params(args):
+    """ Réécrit best_params.json depuis une étude Optuna (--study) ou un fichier de paramètres """
+    if args.study:
+        import study_runner
+        study = study_runner.open_study(args.study, args.storage or study_runner.DEFAULT_STORAGE)
+        if study_runner.completed_trials(study) == 0:
+            print(f"❌ Aucun essai terminé dans l'étude {args.study}.")
+            return 1
+        params, n_trials, method = study.best_params, study_runner.completed_trials(study), 'tpe'
+    else:
+        params = model.load_params(args.params)
+        if params is None:
+            print(f"❌ Paramètres introuvables ou incomplets : {args.params}")
+            return 1
+        n_trials, method = None, 'manual'
+    dataset = model.dataset_for(params)
+    print_results(dataset, params)
+    model.export_best_params(dataset, params, n_trials, method, args.output)
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Optimisation et évaluation des paramètres du modèle")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    fit_cmd = sub.add_parser('fit', help="Ajuste les paramètres et écrit best_params.json")
+    fit_cmd.add_argument('--fast', action='store_true', help="Ajustement L-BFGS-B (gradient analytique) au lieu d'Optuna")
+    fit_cmd.add_argument('--study', help="Nom de l'étude, reprise si elle existe (défaut selon le mode : "
+                                         "drc_global, drc_global_native, drc_global_lookup...)")
+    fit_cmd.add_argument('--storage', help="URL du stockage Optuna (défaut study_runner.DEFAULT_STORAGE)")
+    fit_cmd.add_argument('--trials', type=int, default=100, help="Nombre total d'essais terminés visé")
+    fit_cmd.add_argument('--jobs', type=int, default=os.cpu_count(), help="Processus en parallèle")
+    fit_cmd.add_argument('--pruner', choices=['none', 'median', 'hyperband'], default='median',
+                         help="Élagage des essais sur des tranches croissantes du train")
+    fit_cmd.add_argument('--lookup', action='store_true',
+                         help="Probabilités des essais interpolées sur la table précalculée (prob_table)")
+    fit_cmd.add_argument('--per-league', action='store_true',
+                         help="Un jeu de paramètres par ligue (L-BFGS-B en parallèle) -> best_params_by_league.json")
+    fit_cmd.add_argument('--shrinkage', type=float, default=0.0,
+                         help="Rétrécissement vers l'ajustement global, en matchs équivalents (--per-league)")
+    fit_cmd.add_argument('--leagues', help="Ligues de --per-league : ids séparés par des virgules, ou 'all'")
+    fit_cmd.add_argument('--native-elo', action='store_true',
+                         help="Elo rejoué depuis l'historique (native_elo) ; ses paramètres entrent dans l'étude")
+    fit_cmd.add_argument('--output', default=model.BEST_PARAMS_FILE)
+    fit_cmd.set_defaults(handler=fit)
+
+    eval_cmd = sub.add_parser('evaluate', help="Log-loss train / test de paramètres existants")
+    eval_cmd.add_argument('--params', default=model.BEST_PARAMS_FILE, help="Fichier au format best_params.json")
+    eval_cmd.add_argument('--bootstrap', type=int, default=0, metavar='N',
+                          help="Intervalles de confiance sur N tirages de journées (ex. 10000)")
+    eval_cmd.add_argument('--against', help="Paramètres de référence pour les différences appariées")
+    eval_cmd.add_argument('--seed', type=int, default=0)
+    eval_cmd.set_defaults(handler=evaluate)
+
+    export_cmd = sub.add_parser('export-params', help="Écrit best_params.json depuis une étude ou un fichier")
+    export_cmd.add_argument('--study', help="Étude Optuna dont on exporte le meilleur essai")
+    export_cmd.add_argument('--storage', help="URL du stockage Optuna (défaut study_runner.DEFAULT_STORAGE)")
+    export_cmd.add_argument('--params', default=model.BEST_PARAMS_FILE, help="Fichier source si pas d'étude")
+    export_cmd.add_argument('--output', default=model.BEST_PARAMS_FILE)
+    export_cmd.set_defaults(handler=export_params)
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Compatibilité : `python optimizer.py --fast` = `python optimizer.py fit --fast`
+    if not argv or argv[0] not in COMMANDS + ('-h', '--help'):
+        argv = ['fit'] + argv
+    args = build_parser().parse_args(argv)
+    # DRC_PROFILE=cprofile|tracemalloc : profil du chargement et de la commande
+    instrumentation.start_profiling()
+    return args.handler(args)
 
-# --- 4. RÉSULTATS ---
-print(f"\n🏆 MEILLEURS PARAMÈTRES : {study.best_params}")
-if USE_VALIDATION:
-    print("\n🧪 ÉVALUATION SUR TEST SET :")
-    evaluate_model(TEST_MATCHES, study.best_params, mode="Test")
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
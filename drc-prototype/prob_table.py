@@ -0,0 +1,192 @@
+import json
+import os
+import time
+import numpy as np
+import dixon_coles
+
+# Table de probabilités précalculée sur une grille lambda_h x lambda_a.
+# On y stocke 1X2, Over 2.5 et BTTS (mêmes matrices Dixon-Coles que l'optimiseur,
+# grille 0..MAX_GOALS-1 sans renormalisation) ; une cote devient une interpolation
+# bilinéaire au lieu d'une somme de matrices de score. Les lambdas hors grille
+# (compute_lambdas peut dépasser 6) passent par le calcul exact.
+# Les probabilités sont affines en rho (tau est linéaire en rho) : plutôt qu'un axe
+# rho discrétisé, chaque case garde f(rho=0) et df/drho, ce qui est exact pour tout
+# rho ; l'erreur ne vient que des deux axes lambda.
+
+CACHE_DIR = 'cache'
+TABLE_FILE = os.path.join(CACHE_DIR, 'prob_table.npy')
+SPEC_FILE = os.path.join(CACHE_DIR, 'prob_table.json')
+TABLE_VERSION = 1
+
+MARKETS = ['home', 'draw', 'away', 'over25', 'btts_yes']
+MARKET_INDEX = {name: i for i, name in enumerate(MARKETS)}
+
+# Grille : (début, pas, nombre de points) de l'axe lambda, commun aux deux équipes
+DEFAULT_SPEC = {
+    'lambda': [0.01, 0.025, 241],  # 0.01 (plancher de compute_lambdas) .. 6.01
+    'max_goals': dixon_coles.MAX_GOALS,
+}
+
+
+def axis(start, step, size):
+    return start + step * np.arange(size)
+
+
+def exact_markets(lambda_h, lambda_a, rho, max_goals=dixon_coles.MAX_GOALS):
+    """ Probabilités exactes (N, len(MARKETS)) calculées sur les matrices de score """
+    matrices = dixon_coles.score_matrices(lambda_h, lambda_a, rho, max_goals)
+    flat = matrices.reshape(len(matrices), -1)
+    i, j = np.indices((max_goals, max_goals))
+    out = np.empty((len(matrices), len(MARKETS)))
+    out[:, :3] = flat @ dixon_coles.outcome_masks(max_goals)
+    out[:, 3] = flat @ (i + j > 2.5).ravel().astype(np.float64)
+    out[:, 4] = matrices[:, 1:, 1:].sum(axis=(1, 2))
+    return out
+
+
+def build_table(spec=DEFAULT_SPEC):
+    """ Tableau (lambda_h, lambda_a, [f(0), df/drho], marché) en float32 """
+    lambdas = axis(*spec['lambda'])
+    lh, la = np.meshgrid(lambdas, lambdas, indexing='ij')
+    lh, la = lh.ravel(), la.ravel()
+    at_zero = exact_markets(lh, la, 0.0, spec['max_goals'])
+    slope = exact_markets(lh, la, 1.0, spec['max_goals']) - at_zero
+    table = np.stack([at_zero, slope], axis=1).astype(np.float32)
+    return table.reshape(len(lambdas), len(lambdas), 2, len(MARKETS))
+
+
+def error_bounds(table, rho_range=dixon_coles.PARAM_BOUNDS['rho']):
+    """ Borne d'erreur de l'interpolation par marché, pour rho dans rho_range
+
+    h²/8 * (max|f''_lh| + max|f''_la|), les dérivées secondes étant estimées par les
+    différences secondes de la table (déjà multipliées par h²) aux deux bornes de rho.
+    """
+    bounds = np.zeros(len(MARKETS))
+    for rho in rho_range:
+        values = table[:, :, 0].astype(np.float64) + rho * table[:, :, 1]
+        d2_h = np.abs(np.diff(values, 2, axis=0)).max(axis=(0, 1))
+        d2_a = np.abs(np.diff(values, 2, axis=1)).max(axis=(0, 1))
+        bounds = np.maximum(bounds, (d2_h + d2_a) / 8)
+    float32_eps = np.finfo(np.float32).eps
+    return {name: float(bounds[k] + 2 * float32_eps) for k, name in enumerate(MARKETS)}
+
+
+def save_table(table, spec, table_path=TABLE_FILE, spec_path=SPEC_FILE):
+    os.makedirs(os.path.dirname(table_path), exist_ok=True)
+    tmp_path = table_path + '.tmp.npy'
+    np.save(tmp_path, table)
+    os.replace(tmp_path, table_path)
+    meta = {'version': TABLE_VERSION, 'spec': spec, 'markets': MARKETS, 'error_bounds': error_bounds(table)}
+    tmp_path = spec_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, spec_path)
+    return meta
+
+
+class ProbTable:
+    """ Table mappée en mémoire + interpolation bilinéaire vectorisée """
+
+    def __init__(self, table, meta):
+        self.table = table
+        self.meta = meta
+        self.start, self.step, self.size = meta['spec']['lambda']
+        # Vue (cases, 2 * marchés) : un seul np.take par coin
+        self.flat = table.reshape(self.size * self.size, -1)
+        self.error_bounds = meta['error_bounds']
+        self.high = self.start + self.step * (self.size - 1)
+
+    def _coords(self, values):
+        """ Indice de cellule et poids (bornés au bord ; lookup recalcule les points hors grille) """
+        pos = (np.asarray(values, dtype=np.float64) - self.start) / self.step
+        idx = np.clip(np.floor(pos).astype(np.int64), 0, self.size - 2)
+        return idx, np.clip(pos - idx, 0, 1)
+
+    def lookup(self, lambda_h, lambda_a, rho, markets=MARKETS):
+        """ Probabilités interpolées (N, len(markets)), exactes pour les lambdas hors grille """
+        lambda_h = np.atleast_1d(np.asarray(lambda_h, dtype=np.float64))
+        lambda_a = np.broadcast_to(np.asarray(lambda_a, dtype=np.float64), lambda_h.shape)
+        i, wi = self._coords(lambda_h)
+        j, wj = self._coords(lambda_a)
+        cell = i * self.size + j
+
+        values = 0.0
+        for offset, weight in ((0, (1 - wi) * (1 - wj)), (1, (1 - wi) * wj),
+                               (self.size, wi * (1 - wj)), (self.size + 1, wi * wj)):
+            values = values + weight[:, None] * np.take(self.flat, cell + offset, axis=0)
+        n_markets = len(MARKETS)
+        probs = values[:, :n_markets] + np.reshape(rho, (-1, 1)) * values[:, n_markets:]
+        outside = np.flatnonzero((lambda_h < self.start) | (lambda_h > self.high) |
+                                 (lambda_a < self.start) | (lambda_a > self.high))
+        if len(outside):
+            rho_out = np.broadcast_to(rho, lambda_h.shape)[outside] if np.ndim(rho) else rho
+            probs[outside] = exact_markets(lambda_h[outside], lambda_a[outside], rho_out, self.meta['spec']['max_goals'])
+        if markets is not MARKETS:
+            probs = probs[:, [MARKET_INDEX[m] for m in markets]]
+        return probs
+
+    def outcome_probabilities(self, lambda_h, lambda_a, rho):
+        """ Remplaçant de dixon_coles.outcome_probabilities (N, 3) """
+        return self.lookup(lambda_h, lambda_a, rho)[:, :3]
+
+
+def load_table(spec=DEFAULT_SPEC, table_path=TABLE_FILE, spec_path=SPEC_FILE):
+    """ Table mappée en mémoire ; reconstruite si la grille ou max_goals a changé """
+    meta = None
+    if os.path.exists(table_path) and os.path.exists(spec_path):
+        with open(spec_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != TABLE_VERSION or meta.get('spec') != spec or meta.get('markets') != MARKETS:
+            meta = None
+    if meta is None:
+        meta = save_table(build_table(spec), spec, table_path, spec_path)
+    return ProbTable(np.load(table_path, mmap_mode='r'), meta)
+
+
+_TABLE = None
+
+
+def outcome_probabilities(lambda_h, lambda_a, rho):
+    """ Probabilités H/D/A interpolées sur la table par défaut (chargée au premier appel) """
+    global _TABLE
+    if _TABLE is None:
+        _TABLE = load_table()
+    return _TABLE.outcome_probabilities(lambda_h, lambda_a, rho)
+
+
+def benchmark(n=200_000, seed=0, table=None):
+    """ Précision et vitesse de la table face au calcul exact sur des lambdas aléatoires """
+    table = table or load_table()
+    spec = table.meta['spec']
+    rng = np.random.default_rng(seed)
+    lh = rng.uniform(table.start, 4.0, n)
+    la = rng.uniform(table.start, 4.0, n)
+    rho = rng.uniform(*dixon_coles.PARAM_BOUNDS['rho'], n)
+
+    start = time.perf_counter()
+    exact = exact_markets(lh, la, rho, spec['max_goals'])
+    exact_time = time.perf_counter() - start
+    start = time.perf_counter()
+    approx = table.lookup(lh, la, rho)
+    lookup_time = time.perf_counter() - start
+
+    errors = np.abs(approx - exact).max(axis=0)
+    report = {
+        'n': n,
+        'exact_seconds': exact_time,
+        'lookup_seconds': lookup_time,
+        'speedup': exact_time / lookup_time,
+        'max_error': {name: float(errors[k]) for k, name in enumerate(MARKETS)},
+        'error_bound': table.error_bounds,
+    }
+    return report
+
+
+if __name__ == "__main__":
+    report = benchmark()
+    print(f"🚀 {report['n']} prix : exact {report['exact_seconds']:.3f}s, table {report['lookup_seconds']:.3f}s "
+          f"(x{report['speedup']:.1f})")
+    for name in MARKETS:
+        err, bound = report['max_error'][name], report['error_bound'][name]
+        flag = '✅' if err <= bound else '⚠️'
+        print(f"   {flag} {name:9s} erreur max {err:.2e} (borne {bound:.2e})")
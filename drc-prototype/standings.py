@@ -0,0 +1,170 @@
+import numpy as np
+import match_table
+
+# Classements et signal SDM (rank velocity) de backtest.js / 2_audit.js, en NumPy.
+# Points et différence de buts sont cumulés match par match dans des tableaux par
+# ligue ; on ne classe que les instantanés réellement lus par les fixtures, tous
+# d'un seul argsort, dans une matrice compacte (instantanés x équipes) en int8.
+# SDM et vélocité de n'importe quel match deviennent ensuite des lectures indexées.
+#
+# Mêmes règles que le JS :
+#  - snapshots[r] = classement après le dernier match joué étiqueté journée r, tel
+#    qu'il existait au moment du match évalué (un match reporté ne fuit pas) ;
+#  - tri points desc, puis différence de buts desc, puis id d'équipe croissant
+#    (ordre de Object.values sur des clés numériques) ;
+#  - équipe absente du classement ou instantané manquant -> rang 15 ;
+#  - SDM à partir de la journée 6, si snapshots[R-1] et snapshots[R-5] existent ;
+#    la vélocité compare R-1 à R-6 (calculateSDM lit lastRound - 5).
+# Seul écart : les matchs d'un même coup d'envoi sont pris dans l'ordre de la table
+# (id de fixture croissant), pas dans l'ordre du fichier JSON comme le tri stable du JS.
+
+MISSING_RANK = 15
+MIN_ROUND = 6
+VELOCITY_ROUNDS = 5
+VELOCITY_WEIGHT = 1.2
+
+# Seuils des tiers (|SDM|)
+TIERS = [(15, 'SUPREME'), (10, 'SOLID'), (5, 'VALUE'), (0, 'FAIBLE')]
+
+
+def match_points(goals_h, goals_a):
+    """ Points (domicile, extérieur) de chaque match """
+    goals_h = goals_h.astype(np.int64)
+    goals_a = goals_a.astype(np.int64)
+    pts_h = np.where(goals_h > goals_a, 3, np.where(goals_h == goals_a, 1, 0))
+    pts_a = np.where(goals_a > goals_h, 3, np.where(goals_h == goals_a, 1, 0))
+    return pts_h, pts_a
+
+
+def last_before(positions_by_round, rounds, target_rounds):
+    """ Pour chaque match i, position du dernier match j < i étiqueté target_rounds[i] (-1 sinon) """
+    out = np.full(len(rounds), -1, dtype=np.int64)
+    for label, positions in positions_by_round.items():
+        wanted = np.flatnonzero(target_rounds == label)
+        if len(wanted):
+            out[wanted] = positions[np.searchsorted(positions, wanted) - 1]
+            out[wanted[wanted <= positions[0]]] = -1
+    return out
+
+
+def rank_snapshots(pts, gd, played):
+    """ Rangs (S, T) : 1 = premier, 0 = équipe pas encore au classement ; un seul argsort """
+    n_teams = pts.shape[1]
+    # Clé croissante : présent d'abord, puis points desc, différence desc ; argsort stable
+    # sur les colonnes triées par id d'équipe -> dernier critère id croissant
+    key = (~played).astype(np.int64) << 40
+    key |= (np.int64(1 << 19) - pts) << 20
+    key |= np.int64(1 << 19) - gd
+    order = np.argsort(key, axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, n_teams + 1)[None, :], axis=1)
+    dtype = np.int8 if n_teams < 127 else np.int16
+    return np.where(played, ranks, 0).astype(dtype)
+
+
+def league_standings(table, index):
+    """ Instantanés de classement d'une ligue (index = lignes de la table, ordre chronologique) """
+    home, away = table['home'][index], table['away'][index]
+    rounds = table['round_num'][index].astype(np.int64)
+    n = len(index)
+
+    # Équipes de la ligue, colonnes triées par id API (départage final du JS)
+    codes = np.unique(np.concatenate([home, away]))
+    codes = codes[np.argsort(table['team_ids'][codes], kind='stable')]
+    local = np.full(len(table['team_ids']), -1, dtype=np.int64)
+    local[codes] = np.arange(len(codes))
+    h, a = local[home], local[away]
+
+    # Instantanés lus : journée R-1, R-5 (existence) et R-6 (vélocité)
+    positions_by_round = {label: np.flatnonzero(rounds == label) for label in np.unique(rounds)}
+    prev = last_before(positions_by_round, rounds, rounds - 1)
+    check = last_before(positions_by_round, rounds, rounds - VELOCITY_ROUNDS)
+    old = last_before(positions_by_round, rounds, rounds - 1 - VELOCITY_ROUNDS)
+
+    snapshot_pos = np.unique(np.concatenate([prev, old]))
+    snapshot_pos = snapshot_pos[snapshot_pos >= 0]
+
+    # Cumuls par équipe après chaque match, lus aux seules positions utiles
+    pts_h, pts_a = match_points(table['goals_h'][index], table['goals_a'][index])
+    gd_h = table['goals_h'][index].astype(np.int64) - table['goals_a'][index].astype(np.int64)
+    delta = np.zeros((n, len(codes), 3), dtype=np.int64)  # points, différence, matchs joués
+    delta[np.arange(n), h] = np.stack([pts_h, gd_h, np.ones(n, dtype=np.int64)], axis=1)
+    delta[np.arange(n), a] = np.stack([pts_a, -gd_h, np.ones(n, dtype=np.int64)], axis=1)
+    state = np.cumsum(delta, axis=0)[snapshot_pos]
+    ranks = rank_snapshots(state[:, :, 0], state[:, :, 1], state[:, :, 2] > 0)
+
+    row_of = {pos: row for row, pos in enumerate(snapshot_pos.tolist())}
+    to_row = np.vectorize(lambda pos: row_of.get(pos, -1), otypes=[np.int64])
+    return {
+        'team_codes': codes,
+        'snapshot_pos': index[snapshot_pos] if len(snapshot_pos) else snapshot_pos,
+        'ranks': ranks,
+        'home': h, 'away': a,
+        'row_prev': to_row(prev) if n else prev,
+        'row_old': to_row(old) if n else old,
+        'eligible': (rounds >= MIN_ROUND) & (prev >= 0) & (check >= 0),
+    }
+
+
+def read_ranks(ranks, rows, teams):
+    """ Rang de chaque (instantané, équipe) ; 15 si instantané ou équipe absents """
+    valid = rows >= 0
+    out = np.full(len(rows), MISSING_RANK, dtype=np.int64)
+    values = ranks[rows[valid], teams[valid]].astype(np.int64)
+    out[valid] = np.where(values > 0, values, MISSING_RANK)
+    return out
+
+
+def build_standings(table):
+    """ Colonnes alignées sur la table : rangs R-1 / R-6, vélocités et SDM (NaN si non éligible) """
+    n = match_table.match_count(table)
+    columns = {name: np.full(n, np.nan, dtype=np.float32) for name in ('velocity_h', 'velocity_a', 'sdm')}
+    columns['rank_h'] = np.full(n, MISSING_RANK, dtype=np.int8)
+    columns['rank_a'] = np.full(n, MISSING_RANK, dtype=np.int8)
+    leagues = {}
+
+    for code in range(len(table['league_ids'])):
+        index = np.flatnonzero(table['league'] == code)
+        if not len(index): continue
+        s = league_standings(table, index)
+        leagues[str(table['league_ids'][code])] = s
+
+        r_h = read_ranks(s['ranks'], s['row_prev'], s['home'])
+        r_a = read_ranks(s['ranks'], s['row_prev'], s['away'])
+        v_h = (read_ranks(s['ranks'], s['row_old'], s['home']) - r_h) / VELOCITY_ROUNDS
+        v_a = (read_ranks(s['ranks'], s['row_old'], s['away']) - r_a) / VELOCITY_ROUNDS
+        sdm = (r_a - v_a * VELOCITY_WEIGHT) - (r_h - v_h * VELOCITY_WEIGHT)
+
+        ok = s['eligible']
+        columns['rank_h'][index] = r_h
+        columns['rank_a'][index] = r_a
+        columns['velocity_h'][index[ok]] = v_h[ok]
+        columns['velocity_a'][index[ok]] = v_a[ok]
+        columns['sdm'][index[ok]] = sdm[ok]
+
+    return columns, leagues
+
+
+def sdm_tier(sdm):
+    """ Tier de backtest.js pour un SDM (signe ignoré) """
+    strength = abs(sdm)
+    for threshold, name in TIERS:
+        if strength >= threshold:
+            return name
+    return TIERS[-1][1]
+
+
+if __name__ == "__main__":
+    table = match_table.load_match_table()
+    columns, leagues = build_standings(table)
+    ok = ~np.isnan(columns['sdm'])
+    goals_h, goals_a = table['goals_h'][ok], table['goals_a'][ok]
+    pred_home = columns['sdm'][ok] > 0
+    won = np.where(pred_home, goals_h > goals_a, goals_a > goals_h)
+    print(f"✅ SDM calculé pour {ok.sum()} matchs ({len(leagues)} ligues), "
+          f"{sum(len(s['snapshot_pos']) for s in leagues.values())} instantanés de classement")
+    tiers = np.array([sdm_tier(v) for v in columns['sdm'][ok]])
+    for _, name in TIERS:
+        mask = tiers == name
+        if mask.any():
+            print(f"   🏆 {name:8s} {won[mask].mean() * 100:5.1f}% ({won[mask].sum()}W/{(~won[mask]).sum()}L)")
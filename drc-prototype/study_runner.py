@@ -0,0 +1,117 @@
+import os
+import multiprocessing as mp
+import numpy as np
+import optuna
+
+# Études Optuna persistantes (SQLite) et parallèles.
+# Chaque worker est un processus qui recharge l'étude par son nom depuis le
+# stockage partagé : une interruption ne perd que les essais en cours, et une
+# relance avec le même nom reprend là où on s'était arrêté. L'étude garde l'empreinte
+# de sa configuration (source Elo, table de probabilités, ligues...) : une reprise
+# avec un autre objectif est refusée plutôt que de mélanger des essais incomparables.
+
+DEFAULT_STORAGE = 'sqlite:///optuna_studies.db'
+
+# Un essai élagué compte comme terminé : le budget d'essais reste celui demandé
+FINISHED_STATES = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+
+# Paliers de successive halving : part cumulée du train évaluée avant chaque rapport
+PRUNING_FRACTIONS = (0.125, 0.25, 0.5, 1.0)
+
+
+def make_storage(url=DEFAULT_STORAGE):
+    """ Stockage RDB ; on laisse du temps à SQLite quand plusieurs workers écrivent en même temps """
+    return optuna.storages.RDBStorage(url, engine_kwargs={'connect_args': {'timeout': 60}})
+
+
+def open_study(study_name, storage_url=DEFAULT_STORAGE, **study_kwargs):
+    """ Crée l'étude ou la reprend si elle existe déjà """
+    return optuna.create_study(study_name=study_name, storage=make_storage(storage_url),
+                               direction='minimize', load_if_exists=True, **study_kwargs)
+
+
+def check_config(study, config):
+    """ Enregistre l'empreinte de l'objectif dans l'étude ; ValueError si elle en a une autre """
+    if config is None: return
+    stored = study.user_attrs.get('config')
+    if stored is None:
+        if completed_trials(study):
+            print(f"⚠️ Étude '{study.study_name}' sans empreinte : elle est adoptée pour {config}")
+        study.set_user_attr('config', config)
+    elif stored != config:
+        raise ValueError(f"Étude '{study.study_name}' créée pour {stored}, pas pour {config} : "
+                         f"choisir un autre nom d'étude (--study)")
+
+
+def completed_trials(study):
+    return len(study.get_trials(deepcopy=False, states=FINISHED_STATES))
+
+
+def make_pruner(name, n_steps=len(PRUNING_FRACTIONS)):
+    """ 'median', 'hyperband' ou 'none' """
+    if name == 'median':
+        return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=0)
+    if name == 'hyperband':
+        return optuna.pruners.HyperbandPruner(min_resource=1, max_resource=n_steps, reduction_factor=2)
+    return optuna.pruners.NopPruner()
+
+
+def stratified_chunks(n, fractions=PRUNING_FRACTIONS, seed=0):
+    """ Découpe n matchs chronologiques en tranches dont chaque préfixe couvre toute la saison """
+    # Fenêtres de temps consécutives de `strata` matchs ; dans chaque fenêtre un rang aléatoire
+    # décide du palier où le match entre. Le premier palier a donc des matchs de chaque période.
+    strata = int(round(1 / fractions[0]))
+    n_windows = -(-n // strata)
+    ranks = np.random.default_rng(seed).random((n_windows, strata)).argsort(axis=1).ravel()[:n]
+    order = np.lexsort((np.arange(n), ranks))
+    bounds = [0] + [int(round(f * n)) for f in fractions]
+    return [order[bounds[k]:bounds[k + 1]] for k in range(len(fractions))]
+
+
+def _worker(study_name, storage_url, objective, n_trials, study_kwargs, callbacks=(), initializer=None, initargs=()):
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    # Sous 'spawn' le module de l'objectif est réimporté à vide : ses données sont reposées ici
+    if initializer is not None:
+        initializer(*initargs)
+    study = open_study(study_name, storage_url, **study_kwargs)
+    # Arrêt collectif : chaque worker s'arrête quand l'étude a atteint n_trials essais terminés
+    stop = optuna.study.MaxTrialsCallback(n_trials, states=FINISHED_STATES)
+    study.optimize(objective, callbacks=[stop, *callbacks])
+
+
+def run_study(objective, study_name, storage_url=DEFAULT_STORAGE, n_trials=100, n_jobs=None, callbacks=(),
+              initializer=None, initargs=(), config=None, **study_kwargs):
+    """ Complète l'étude jusqu'à n_trials essais terminés, répartis sur n_jobs processus
+
+    initializer(*initargs) est appelé dans chaque worker avant ses essais (données de l'objectif).
+    config : empreinte JSON de l'objectif, comparée à celle de l'étude reprise (check_config).
+    """
+    study = open_study(study_name, storage_url, **study_kwargs)
+    check_config(study, config)
+    done = completed_trials(study)
+    if done >= n_trials:
+        print(f"♻️  Étude '{study_name}' déjà complète ({done} essais).")
+        return study
+
+    n_jobs = max(1, min(n_jobs or os.cpu_count() or 1, n_trials - done))
+    print(f"🚀 Étude '{study_name}' : {done} essais repris, objectif {n_trials} sur {n_jobs} processus.")
+
+    if n_jobs == 1:
+        _worker(study_name, storage_url, objective, n_trials, study_kwargs, callbacks, initializer, initargs)
+    else:
+        # 'fork' quand il existe : les workers héritent des tableaux de matchs déjà chargés sans copie ;
+        # sous 'spawn' (Windows, macOS) initargs est transmis par pickle
+        methods = mp.get_all_start_methods()
+        ctx = mp.get_context('fork' if 'fork' in methods else 'spawn')
+        args = (study_name, storage_url, objective, n_trials, study_kwargs, callbacks, initializer, initargs)
+        workers = [ctx.Process(target=_worker, args=args) for _ in range(n_jobs)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        # Un worker mort (exception, mémoire...) laisserait l'étude incomplète sans rien dire
+        failed = [w.exitcode for w in workers if w.exitcode != 0]
+        if failed:
+            raise RuntimeError(f"Étude '{study_name}' : {len(failed)} worker(s) en échec (codes {failed})")
+
+    return open_study(study_name, storage_url, **study_kwargs)
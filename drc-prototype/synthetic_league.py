@@ -0,0 +1,189 @@
+import argparse
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, timezone
+import numpy as np
+
+# Générateur de ligues synthétiques pour les benchmarks : fichiers history_<id>.json
+# au format API-Football (fixture / league / teams / goals / score / stats comme
+# enrich-all-history.js) et classements ClubElo en CSV (un par date, lisibles par
+# clubelo_stub_server.py). Les noms de clubs diffèrent légèrement entre les deux
+# sources ("FC Varosa" / "Varosa") pour exercer l'appariement.
+
+BASE_LEAGUE_ID = 9000
+BASE_TEAM_ID = 100000
+BASE_FIXTURE_ID = 90000000
+LAST_SEASON = 2025
+TEAMS_PER_LEAGUE = 20
+MANIFEST_FILE = 'synthetic_manifest.json'
+CLUBELO_DIR = 'clubelo_recorded'
+
+SYLLABLES = ['ar', 'va', 'ro', 'sa', 'ti', 'ne', 'lo', 'ka', 'mi', 'do', 'ber', 'gan',
+             'tor', 'vel', 'lin', 'mar', 'sol', 'dun', 'ham', 'ville', 'burg', 'sen']
+PREFIXES = ['FC', 'Real', 'Sporting', 'Athletic', 'Racing', 'Union', 'Dynamo', 'Olympic']
+SUFFIXES = ['FC', 'SC', 'City', 'United', 'CF']
+
+HOME_ADVANTAGE = 65
+
+
+def club_names(rng, n, taken):
+    """ n clubs : (nom API-Football, nom ClubElo), uniques sur tout le jeu """
+    pairs = []
+    while len(pairs) < n:
+        base = ''.join(rng.choice(SYLLABLES, size=rng.integers(2, 4))).capitalize()
+        # Grands jeux (300 ligues) : on allonge le nom jusqu'à ce qu'il soit libre
+        while base in taken:
+            base += rng.choice(SYLLABLES)
+        taken.add(base)
+        style = rng.integers(4)
+        if style == 0:
+            api = f"{rng.choice(PREFIXES)} {base}"
+        elif style == 1:
+            api = f"{base} {rng.choice(SUFFIXES)}"
+        else:
+            api = base
+        pairs.append((api, base))
+    return pairs
+
+
+def round_robin(n_teams):
+    """ Calendrier aller-retour (méthode du cercle) : liste de journées [(dom, ext)] """
+    teams = list(range(n_teams))
+    rounds = []
+    for r in range(n_teams - 1):
+        pairs = [(teams[i], teams[n_teams - 1 - i]) for i in range(n_teams // 2)]
+        rounds.append([(a, b) if r % 2 == 0 else (b, a) for a, b in pairs])
+        teams = [teams[0]] + [teams[-1]] + teams[1:-1]
+    return rounds + [[(b, a) for a, b in pairs] for pairs in rounds]
+
+
+def match_stats(rng, xg, possession):
+    shots = int(rng.poisson(4 + 5 * xg))
+    on_goal = int(rng.binomial(shots, 0.35))
+    blocked = int(rng.binomial(shots - on_goal, 0.25))
+    inside = int(rng.binomial(shots, 0.65))
+    passes = int(rng.normal(300 + 400 * possession, 40))
+    accurate = int(passes * rng.uniform(0.7, 0.9))
+    return {
+        'shots_on_goal': on_goal, 'shots_off_goal': shots - on_goal - blocked, 'total_shots': shots,
+        'blocked_shots': blocked, 'shots_insidebox': inside, 'shots_outsidebox': shots - inside,
+        'fouls': int(rng.poisson(11)), 'corner_kicks': int(rng.poisson(5)), 'offsides': int(rng.poisson(2)),
+        'ball_possession': f"{round(possession * 100)}%", 'yellow_cards': int(rng.poisson(2)),
+        'red_cards': int(rng.poisson(0.1)) or None, 'goalkeeper_saves': int(rng.poisson(3)),
+        'total_passes': passes, 'passes_accurate': accurate, 'passes_%': f"{round(accurate / passes * 100)}%",
+        'expected_goals': f"{xg:.2f}", 'goals_prevented': 0,
+    }
+
+
+def fixture_json(fixture_id, kickoff, lid, season, round_name, home, away, goals, halftime, stats):
+    return {
+        'fixture': {'id': fixture_id, 'referee': None, 'timezone': 'UTC', 'date': kickoff.isoformat(),
+                    'timestamp': int(kickoff.timestamp()), 'periods': {'first': None, 'second': None},
+                    'venue': {'id': None, 'name': None, 'city': None},
+                    'status': {'long': 'Match Finished', 'short': 'FT', 'elapsed': 90, 'extra': None}},
+        'league': {'id': lid, 'name': f"Synthetic {lid}", 'country': 'Synthetic', 'logo': None, 'flag': None,
+                   'season': season, 'round': round_name, 'standings': True},
+        'teams': {'home': {'id': home[0], 'name': home[1], 'logo': None, 'winner': goals[0] > goals[1]},
+                  'away': {'id': away[0], 'name': away[1], 'logo': None, 'winner': goals[1] > goals[0]}},
+        'goals': {'home': goals[0], 'away': goals[1]},
+        'score': {'halftime': {'home': halftime[0], 'away': halftime[1]},
+                  'fulltime': {'home': goals[0], 'away': goals[1]},
+                  'extratime': {'home': None, 'away': None}, 'penalty': {'home': None, 'away': None}},
+        'stats': stats,
+    }
+
+
+def season_calendar(n_seasons, n_rounds):
+    """ Dates des journées (samedis, une par semaine), communes à toutes les ligues """
+    days = []
+    for season in range(LAST_SEASON - n_seasons + 1, LAST_SEASON + 1):
+        start = datetime(season, 8, 1, 15, tzinfo=timezone.utc)
+        start += timedelta(days=(5 - start.weekday()) % 7)
+        days.append((season, [start + timedelta(days=7 * r) for r in range(n_rounds)]))
+    return days
+
+
+def generate(out_dir, n_leagues=9, n_seasons=1, n_teams=TEAMS_PER_LEAGUE, seed=0):
+    """ Écrit history_<id>.json + CSV ClubElo dans out_dir ; renvoie le manifeste """
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.join(out_dir, CLUBELO_DIR), exist_ok=True)
+    schedule = round_robin(n_teams)
+    calendar = season_calendar(n_seasons, len(schedule))
+    dates = [day.date().isoformat() for _, days in calendar for day in days]
+
+    taken = set()
+    fixture_id = BASE_FIXTURE_ID
+    manifest = {'leagues': [], 'countries': {}, 'mapping': {}, 'dates': dates,
+                'n_seasons': n_seasons, 'n_teams': n_teams, 'seed': seed}
+    # Elo de chaque club à chaque date : (ligue, date, équipe)
+    elo = np.empty((n_leagues, len(dates), n_teams), dtype=np.float32)
+    elo_names = []
+
+    for k in range(n_leagues):
+        lid = BASE_LEAGUE_ID + k
+        names = club_names(rng, n_teams, taken)
+        teams = [(BASE_TEAM_ID + k * n_teams + t, api) for t, (api, _) in enumerate(names)]
+        strength = rng.normal(1500, 120, n_teams)
+        fixtures = []
+        step = 0
+        for season, days in calendar:
+            for day, pairs in zip(days, schedule):
+                elo[k, step] = strength
+                step += 1
+                for slot, (h, a) in enumerate(pairs):
+                    fixture_id += 1
+                    diff = (strength[h] + HOME_ADVANTAGE - strength[a]) / 400
+                    lam_h, lam_a = 1.35 * np.exp(0.5 * diff), 1.1 * np.exp(-0.5 * diff)
+                    goals = int(rng.poisson(lam_h)), int(rng.poisson(lam_a))
+                    halftime = int(rng.binomial(goals[0], 0.45)), int(rng.binomial(goals[1], 0.45))
+                    xg_h, xg_a = lam_h * rng.gamma(6, 1 / 6), lam_a * rng.gamma(6, 1 / 6)
+                    possession = float(np.clip(0.5 + diff / 4 + rng.normal(0, 0.05), 0.25, 0.75))
+                    stats = {'home': match_stats(rng, xg_h, possession), 'away': match_stats(rng, xg_a, 1 - possession)}
+                    kickoff = day + timedelta(hours=2 * (slot % 4), days=slot // 4 % 2)
+                    # Journées numérotées à la suite d'une saison à l'autre : libellés uniques dans le fichier
+                    fixtures.append(fixture_json(fixture_id, kickoff, lid, season, f"Regular Season - {step}",
+                                                 teams[h], teams[a], goals, halftime, stats))
+                    # Mise à jour Elo simplifiée après le match
+                    expected = 1 / (1 + 10 ** (-diff))
+                    score = 1.0 if goals[0] > goals[1] else 0.5 if goals[0] == goals[1] else 0.0
+                    strength[h] += 20 * (score - expected)
+                    strength[a] -= 20 * (score - expected)
+
+        with open(os.path.join(out_dir, f'history_{lid}.json'), 'w', encoding='utf-8') as f:
+            json.dump(fixtures, f, ensure_ascii=False)
+
+        country = f'S{k:03d}'
+        manifest['leagues'].append(str(lid))
+        manifest['countries'][str(lid)] = country
+        manifest['mapping'][str(lid)] = {api: club for api, club in names}
+        elo_names.append([club for _, club in names])
+
+    # Un classement mondial par date, comme api.clubelo.com/<date>
+    for d, date_str in enumerate(dates):
+        rows = [(float(elo[k, d, t]), elo_names[k][t], manifest['countries'][lid])
+                for k, lid in enumerate(manifest['leagues']) for t in range(n_teams)]
+        rows.sort(reverse=True)
+        lines = ['Rank,Club,Country,Level,Elo,From,To']
+        lines += [f"{rank},{club},{country},1,{value:.5f},{date_str},{date_str}"
+                  for rank, (value, club, country) in enumerate(rows, 1)]
+        with gzip.open(os.path.join(out_dir, CLUBELO_DIR, f'{date_str}.csv.gz'), 'wt', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+
+    with open(os.path.join(out_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ligues synthétiques au format API-Football / ClubElo")
+    parser.add_argument('--dir', required=True, help="Dossier de sortie")
+    parser.add_argument('--leagues', type=int, default=9)
+    parser.add_argument('--seasons', type=int, default=1)
+    parser.add_argument('--teams', type=int, default=TEAMS_PER_LEAGUE)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    manifest = generate(args.dir, args.leagues, args.seasons, args.teams, args.seed)
+    n_matches = args.leagues * args.seasons * args.teams * (args.teams - 1)
+    print(f"✅ {args.leagues} ligues x {args.seasons} saison(s) : {n_matches} matchs, "
+          f"{len(manifest['dates'])} classements ClubElo -> {args.dir}")
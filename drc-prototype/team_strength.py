@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+import numpy as np
+import dixon_coles
+import match_table
+
+# Modèle Dixon-Coles attaque / défense par équipe, ajusté directement sur les scores
+# de history_*.json : aucune dépendance à ClubElo ni aux xG, donc utilisable sur les
+# 30 ligues du scanner.
+#   log λ_dom = mu + home + att[dom] - def[ext]
+#   log λ_ext = mu + att[ext] - def[dom]
+# Les matchs sont pondérés par exp(-xi * âge en jours). Les deux log-lambdas de tous
+# les matchs sont le produit d'une matrice creuse (2N x P) par le vecteur de
+# paramètres, d'où une log-vraisemblance et un gradient exacts en quelques opérations
+# creuses ; L-BFGS-B s'arrête en une fraction de seconde par ligue. Une petite pénalité
+# L2 sur att / def fixe le niveau (sinon défini à une constante près) et tempère les
+# équipes qui ont peu joué. Les paramètres de chaque ligue sont conservés dans
+# TEAM_PARAMS_FILE : le ré-ajustement du lendemain repart de là (départ à chaud).
+
+TEAM_PARAMS_FILE = 'team_strength_params.json'
+XI_PER_DAY = 0.0019        # Demi-vie ~1 an (0.0065 par demi-semaine chez Dixon & Coles)
+RIDGE = 0.01               # Pénalité L2 sur att / def, relative à la log-vraisemblance moyenne
+RHO_BOUNDS = (-0.2, 0.2)
+MIN_WEIGHT = 1e-3          # Matchs plus anciens ignorés (poids négligeable)
+SECONDS_PER_DAY = 86400
+
+
+def league_matches(table, league_id, as_of=None):
+    """ Matchs d'une ligue joués avant as_of (timestamp) """
+    codes = np.flatnonzero(np.asarray(table['league_ids']).astype(str) == str(league_id))
+    index = np.flatnonzero(np.isin(table['league'], codes))
+    if as_of is not None:
+        index = index[table['timestamp'][index] < as_of]
+    return index
+
+
+def design_matrix(home, away, n_teams):
+    """ Matrice creuse (2N x P) : lignes 0..N-1 = buts domicile, N..2N-1 = buts extérieur
+
+    Colonnes : mu, home, att[0..T-1], def[0..T-1] (rho est hors de la partie linéaire).
+    """
+    from scipy import sparse
+
+    n = len(home)
+    att, dfn = 2, 2 + n_teams
+    rows = np.concatenate([np.repeat(np.arange(n), 4), np.repeat(np.arange(n, 2 * n), 3)])
+    cols = np.concatenate([
+        np.stack([np.zeros(n, int), np.ones(n, int), att + home, dfn + away], axis=1).ravel(),
+        np.stack([np.zeros(n, int), att + away, dfn + home], axis=1).ravel(),
+    ])
+    vals = np.concatenate([np.tile([1.0, 1.0, 1.0, -1.0], n), np.tile([1.0, 1.0, -1.0], n)])
+    return sparse.csr_matrix((vals, (rows, cols)), shape=(2 * n, 2 + 2 * n_teams))
+
+
+def low_score_terms(lh, la, rho, goals_h, goals_a):
+    """ log tau et ses dérivées (d/dλ_dom, d/dλ_ext, d/drho) pour chaque match """
+    tau = np.ones(len(lh))
+    d_lh, d_la, d_rho = np.zeros(len(lh)), np.zeros(len(lh)), np.zeros(len(lh))
+    s00 = (goals_h == 0) & (goals_a == 0)
+    s01 = (goals_h == 0) & (goals_a == 1)
+    s10 = (goals_h == 1) & (goals_a == 0)
+    s11 = (goals_h == 1) & (goals_a == 1)
+    tau[s00] = 1 - lh[s00] * la[s00] * rho
+    d_lh[s00], d_la[s00], d_rho[s00] = -la[s00] * rho, -lh[s00] * rho, -lh[s00] * la[s00]
+    tau[s01] = 1 + lh[s01] * rho
+    d_lh[s01], d_rho[s01] = rho, lh[s01]
+    tau[s10] = 1 + la[s10] * rho
+    d_la[s10], d_rho[s10] = rho, la[s10]
+    tau[s11] = 1 - rho
+    d_rho[s11] = -1.0
+
+    # Plancher : tau peut devenir négatif pour des lambdas extrêmes, on coupe le gradient
+    valid = tau > 1e-10
+    tau = np.where(valid, tau, 1e-10)
+    inv = np.where(valid, 1 / tau, 0.0)
+    return np.log(tau), d_lh * inv, d_la * inv, d_rho * inv
+
+
+def loss_and_gradient(theta, X, goals, weights, ridge=RIDGE):
+    """ -log-vraisemblance pondérée moyenne + pénalité, et son gradient (P + 1,) """
+    beta, rho = theta[:-1], theta[-1]
+    n = len(weights)
+    eta = X @ beta
+    lam = np.exp(eta)
+    lh, la = lam[:n], lam[n:]
+    log_tau, dt_lh, dt_la, dt_rho = low_score_terms(lh, la, rho, goals[:n], goals[n:])
+
+    w2 = np.concatenate([weights, weights])
+    total = weights.sum()
+    loglik = (w2 * (goals * eta - lam)).sum() + (weights * log_tau).sum()
+    # d/d eta : Poisson (y - λ) + correction Dixon-Coles (d log tau / dλ * λ)
+    resid = w2 * (goals - lam)
+    resid[:n] += weights * dt_lh * lh
+    resid[n:] += weights * dt_la * la
+
+    teams = beta[2:]
+    loss = -loglik / total + 0.5 * ridge * teams @ teams
+    grad = np.empty_like(theta)
+    grad[:-1] = -(X.T @ resid) / total
+    grad[2:-1] += ridge * teams
+    grad[-1] = -(weights * dt_rho).sum() / total
+    return loss, grad
+
+
+def fit_league(table, league_id, as_of=None, xi=XI_PER_DAY, ridge=RIDGE, start=None, max_iter=500):
+    """ Ajuste une ligue ; start = paramètres précédents de la ligue (départ à chaud) """
+    from scipy.optimize import minimize
+
+    as_of = int(time.time()) if as_of is None else int(as_of)
+    index = league_matches(table, league_id, as_of)
+    age_days = (as_of - table['timestamp'][index]) / SECONDS_PER_DAY
+    weights = np.exp(-xi * age_days)
+    index, weights = index[weights >= MIN_WEIGHT], weights[weights >= MIN_WEIGHT]
+    if len(index) == 0: return None
+
+    # Équipes locales : id API -> colonne
+    codes = np.unique(np.concatenate([table['home'][index], table['away'][index]]))
+    team_ids = [int(t) for t in table['team_ids'][codes]]
+    local = np.full(len(table['team_ids']), -1, dtype=np.int64)
+    local[codes] = np.arange(len(codes))
+    home, away = local[table['home'][index]], local[table['away'][index]]
+    n_teams = len(codes)
+
+    X = design_matrix(home, away, n_teams)
+    goals = np.concatenate([table['goals_h'][index], table['goals_a'][index]]).astype(np.float64)
+
+    # Départ : paramètres de la veille pour les équipes connues, 0 pour les nouvelles
+    theta0 = np.zeros(3 + 2 * n_teams)
+    theta0[0] = np.log(max(goals.mean(), 0.1))
+    theta0[1] = 0.25
+    if start:
+        theta0[0], theta0[1], theta0[-1] = start['mu'], start['home'], start['rho']
+        for k, tid in enumerate(team_ids):
+            if str(tid) in start['teams']:
+                theta0[2 + k], theta0[2 + n_teams + k] = start['teams'][str(tid)]
+    theta0[-1] = np.clip(theta0[-1], *RHO_BOUNDS)
+
+    bounds = [(None, None)] * (2 + 2 * n_teams) + [RHO_BOUNDS]
+    started = time.perf_counter()
+    res = minimize(loss_and_gradient, theta0, args=(X, goals, weights, ridge), jac=True,
+                   method='L-BFGS-B', bounds=bounds, options={'maxiter': max_iter})
+    beta = res.x
+    names = table['team_names'][codes]
+    return {
+        'league': str(league_id),
+        'as_of': as_of,
+        'xi': xi,
+        'mu': float(beta[0]),
+        'home': float(beta[1]),
+        'rho': float(beta[-1]),
+        'teams': {str(tid): [float(beta[2 + k]), float(beta[2 + n_teams + k])] for k, tid in enumerate(team_ids)},
+        'team_names': {str(tid): str(name) for tid, name in zip(team_ids, names)},
+        'matches': int(len(index)),
+        'loss': float(res.fun),
+        'n_iter': int(res.nit),
+        'converged': bool(res.success),
+        'seconds': time.perf_counter() - started,
+        'warm_start': bool(start),
+    }
+
+
+def expected_goals(params, home_ids, away_ids):
+    """ (λ_dom, λ_ext) de matchs à venir ; une équipe inconnue a att = def = 0 """
+    teams = params['teams']
+    att_h, def_h = np.array([teams.get(str(t), (0.0, 0.0)) for t in home_ids], dtype=np.float64).T.reshape(2, -1)
+    att_a, def_a = np.array([teams.get(str(t), (0.0, 0.0)) for t in away_ids], dtype=np.float64).T.reshape(2, -1)
+    lambda_h = np.exp(params['mu'] + params['home'] + att_h - def_a)
+    lambda_a = np.exp(params['mu'] + att_a - def_h)
+    return lambda_h, lambda_a
+
+
+def outcome_probabilities(params, home_ids, away_ids):
+    """ Probabilités (N, 3) domicile / nul / extérieur """
+    lambda_h, lambda_a = expected_goals(params, home_ids, away_ids)
+    return dixon_coles.outcome_probabilities(lambda_h, lambda_a, params['rho'])
+
+
+def load_params(path=TEAM_PARAMS_FILE):
+    if not os.path.exists(path): return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_params(params, path=TEAM_PARAMS_FILE):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(params, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def refit_all(league_ids=match_table.ALL_LEAGUES, as_of=None, xi=XI_PER_DAY, ridge=RIDGE, path=TEAM_PARAMS_FILE,
+              cold=False):
+    """ Ré-ajuste toutes les ligues (départ à chaud depuis path) et réécrit le fichier """
+    table = match_table.load_match_table(match_table.ALL_LEAGUES)
+    previous = {} if cold else load_params(path)
+    fitted = dict(previous)
+    for lid in league_ids:
+        fit = fit_league(table, lid, as_of, xi, ridge, previous.get(str(lid)))
+        if fit is None:
+            print(f"   ⚠️ Ligue {lid:>4s} : aucun match")
+            continue
+        fitted[str(lid)] = fit
+        print(f"   🏆 Ligue {lid:>4s} : {fit['matches']:5d} matchs, {len(fit['teams']):3d} équipes, "
+              f"home={fit['home']:+.3f} rho={fit['rho']:+.3f} | {fit['n_iter']:3d} it. "
+              f"{fit['seconds'] * 1000:6.1f} ms{' (à chaud)' if fit['warm_start'] else ''}")
+    save_params(fitted, path)
+    print(f"📁 Fichier créé : {path}")
+    return fitted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Forces attaque / défense par équipe (Dixon-Coles pondéré dans le temps)")
+    parser.add_argument('--leagues', help="Ids séparés par des virgules (défaut : les 30 ligues)")
+    parser.add_argument('--as-of', help="Date d'ajustement AAAA-MM-JJ (défaut : maintenant)")
+    parser.add_argument('--xi', type=float, default=XI_PER_DAY, help="Décroissance par jour")
+    parser.add_argument('--ridge', type=float, default=RIDGE)
+    parser.add_argument('--cold', action='store_true', help="Ignore les paramètres précédents")
+    parser.add_argument('--output', default=TEAM_PARAMS_FILE)
+    args = parser.parse_args()
+
+    leagues = args.leagues.split(',') if args.leagues else match_table.ALL_LEAGUES
+    as_of = None
+    if args.as_of:
+        as_of = datetime.strptime(args.as_of, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp()
+    started = time.perf_counter()
+    refit_all(leagues, as_of, args.xi, args.ridge, args.output, args.cold)
+    print(f"✅ {len(leagues)} ligues ajustées en {time.perf_counter() - started:.2f} s")
@@ -0,0 +1,278 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+import numpy as np
+import dixon_coles
+import elo_join
+import fast_fit
+import market_pricer
+import match_table
+import model
+import native_elo
+import odds_store
+import xg_features
+
+# Walk-forward : on avance journée par journée, on ré-ajuste les paramètres sur les
+# matchs joués avant le coup d'envoi de la journée (fenêtre croissante ou glissante,
+# départ à chaud depuis l'ajustement précédent) et on note la journée hors échantillon :
+# log-loss, Brier et ROI des value bets BTTS / Over-Under 2.5 sur les cotes d'odds_store.
+# Les moyennes xG sont pré-match par construction (une seule passe chronologique de
+# xg_features) : rien n'est recalculé d'une étape à l'autre, le train d'une étape est
+# un simple préfixe des tableaux de la ligue. L'Elo vient de l'archive ClubElo (ses
+# ligues par défaut) ou, avec --native-elo, du moteur native_elo (les 30 ligues).
+
+ELO_ARCHIVE_FILE = 'elo_history_archive.json'
+RESULTS_FILE = 'walk_forward_results.json'
+
+MIN_TRAIN = 60       # Matchs évaluables avant le premier ajustement
+SLIDING_ROUNDS = 10  # Taille de la fenêtre glissante, en journées
+MIN_EDGE = 0.05      # Value bet si proba * cote - 1 > MIN_EDGE
+
+# Sélections pariées : (nom, marché, sélection, ligne) dans odds_store
+BET_SELECTIONS = (
+    ('btts_yes', odds_store.BTTS, odds_store.YES, None), ('btts_no', odds_store.BTTS, odds_store.NO, None),
+    ('over25', odds_store.OVER_UNDER, odds_store.OVER, 2.5), ('under25', odds_store.OVER_UNDER, odds_store.UNDER, 2.5),
+)
+
+def load_archive(path=ELO_ARCHIVE_FILE):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def default_leagues(archive=None):
+    """ Ligues notables : celles de l'archive ClubElo, ou les 30 ligues en Elo natif (archive None) """
+    if archive is None:
+        return match_table.ALL_LEAGUES
+    return [lid for lid in match_table.ALL_LEAGUES if lid in archive]
+
+
+def load_league_arrays(league_ids, archive, window=xg_features.DEFAULT_WINDOW, elo_params=None):
+    """ Tableaux évaluables par ligue ; features et jointure Elo calculées une seule fois
+
+    elo_params : paramètres native_elo ; l'Elo est alors rejoué depuis l'historique au lieu de l'archive.
+    """
+    table = match_table.select_leagues(match_table.load_match_table(match_table.ALL_LEAGUES), league_ids)
+    rolling = xg_features.rolling_features(xg_features.build_features(table), window)
+    if elo_params is None:
+        elo_h, elo_a = elo_join.join_elo(table, archive)
+    else:
+        elo_h, elo_a, _ = native_elo.replay(table, elo_params)
+    exclusion = elo_join.exclusion_mask(elo_h, elo_a, rolling['avg_xg_for_h'], rolling['avg_xg_for_a'])
+
+    leagues = {}
+    for code, lid in enumerate(table['league_ids']):
+        in_league = table['league'] == code
+        # Le vocabulaire garde les 30 ligues de la table : on ne retient que celles sélectionnées
+        if not in_league.any(): continue
+        keep = np.flatnonzero(in_league & (exclusion == elo_join.OK))
+        leagues[str(lid)] = {
+            'xg_h': rolling['avg_xg_for_h'][keep].astype(np.float64),
+            'xg_a': rolling['avg_xg_for_a'][keep].astype(np.float64),
+            'delta_elo': elo_h[keep] - elo_a[keep],
+            'outcome': dixon_coles.match_outcomes(table['goals_h'][keep], table['goals_a'][keep]),
+            'goals_h': table['goals_h'][keep],
+            'goals_a': table['goals_a'][keep],
+            'timestamp': table['timestamp'][keep],
+            'round': table['round'][keep],
+            'fixture_id': table['fixture_id'][keep],
+            'errors': elo_join.exclusion_report(exclusion[in_league]),
+        }
+    return leagues
+
+
+def round_schedule(arrays):
+    """ Journées dans l'ordre de leur premier coup d'envoi : [(code, début)] """
+    rounds = np.unique(arrays['round'])
+    starts = np.array([arrays['timestamp'][arrays['round'] == r].min() for r in rounds])
+    order = np.argsort(starts, kind='stable')
+    return list(zip(rounds[order].tolist(), starts[order].tolist()))
+
+
+def brier_scores(probs, outcomes):
+    """ Score de Brier multi-classe (somme sur H/D/A) par match """
+    onehot = np.eye(3)[outcomes]
+    return ((probs - onehot) ** 2).sum(axis=1)
+
+
+def bet_returns(lambda_h, lambda_a, rho, data, store, min_edge=MIN_EDGE):
+    """ Mises et gains nets par match (mise 1 sur chaque sélection cotée avec avantage) """
+    n = len(lambda_h)
+    staked, pnl = np.zeros(n), np.zeros(n)
+    if store is None or not n: return staked, pnl
+    odds = {name: odds_store.join(store, data['fixture_id'], market, selection, line)[0].astype(np.float64)
+            for name, market, selection, line in BET_SELECTIONS}
+    priced = np.flatnonzero(np.any([np.isfinite(odd) for odd in odds.values()], axis=0))
+    if not len(priced): return staked, pnl
+
+    markets = market_pricer.price_markets(lambda_h[priced], lambda_a[priced], rho, ou_lines=(2.5,), ah_lines=())
+    probs = {'btts_yes': markets['btts_yes'], 'btts_no': markets['btts_no'],
+             'over25': markets['over'][2.5], 'under25': markets['under'][2.5]}
+    gh = data['goals_h'][priced].astype(np.int64)
+    ga = data['goals_a'][priced].astype(np.int64)
+    both, over = (gh > 0) & (ga > 0), gh + ga > 2
+    won = {'btts_yes': both, 'btts_no': ~both, 'over25': over, 'under25': ~over}
+
+    for name in probs:
+        odd = odds[name][priced]
+        bet = np.nan_to_num(probs[name] * odd - 1, nan=-1.0) > min_edge
+        staked[priced] += bet
+        pnl[priced] += np.where(bet, np.where(won[name], odd - 1, -1.0), 0.0)
+    return staked, pnl
+
+
+def value_bets(lambda_h, lambda_a, rho, arrays, index, store, min_edge=MIN_EDGE):
+    """ Mises unitaires sur les sélections avec avantage ; renvoie (nb paris, mises, gains nets) """
+    data = {key: arrays[key][index] for key in ('fixture_id', 'goals_h', 'goals_a')}
+    staked, pnl = bet_returns(lambda_h, lambda_a, rho, data, store, min_edge)
+    return int(staked.sum()), float(staked.sum()), float(pnl.sum())
+
+
+def walk_forward_league(league_id, arrays, start_params, mode='expanding', window=SLIDING_ROUNDS,
+                        min_train=MIN_TRAIN, min_edge=MIN_EDGE):
+    """ Walk-forward d'une ligue : une ligne par journée notée, plus le résumé """
+    # Store déjà construit par run_walk_forward : ici on ne fait que le mapper en mémoire
+    store = odds_store.load_store()
+    schedule = round_schedule(arrays)
+    rank = {code: k for k, (code, _) in enumerate(schedule)}
+    round_rank = np.array([rank[r] for r in arrays['round'].tolist()], dtype=np.int64)
+
+    params = start_params
+    steps = []
+    started = time.perf_counter()
+    for k, (code, kickoff) in enumerate(schedule):
+        # Train : tout ce qui est joué avant le coup d'envoi de la journée (préfixe trié)
+        end = int(np.searchsorted(arrays['timestamp'], kickoff, side='left'))
+        train_idx = np.arange(end)
+        if mode == 'sliding':
+            train_idx = train_idx[round_rank[:end] >= k - window]
+        if len(train_idx) < min_train: continue
+        test_idx = np.flatnonzero(arrays['round'] == code)
+
+        train = {key: arrays[key][train_idx] for key in ('xg_h', 'xg_a', 'delta_elo', 'outcome')}
+        fit = fast_fit.fit(train, start=params)
+        params = fit['params']
+
+        lh, la = dixon_coles.compute_lambdas(arrays['xg_h'][test_idx], arrays['xg_a'][test_idx],
+                                             arrays['delta_elo'][test_idx], params['w_xg'], params['w_elo'], params['hfa'])
+        probs = dixon_coles.outcome_probabilities(lh, la, params['rho'])
+        outcomes = arrays['outcome'][test_idx]
+        bets, staked, pnl = value_bets(lh, la, params['rho'], arrays, test_idx, store, min_edge)
+        steps.append({
+            'round_start': int(kickoff),
+            'n_train': len(train_idx),
+            'n_test': len(test_idx),
+            'log_loss': float(dixon_coles.log_losses(probs, outcomes).sum()),
+            'brier': float(brier_scores(probs, outcomes).sum()),
+            'bets': bets, 'staked': staked, 'pnl': pnl,
+            'n_evals': fit['n_evals'],
+            'params': params,
+        })
+
+    return {'league': league_id, 'summary': summarize(steps, time.perf_counter() - started, arrays['errors']),
+            'steps': steps}
+
+
+def summarize(steps, seconds=0.0, errors=None):
+    """ Moyennes pondérées par le nombre de matchs notés """
+    n = sum(s['n_test'] for s in steps)
+    staked = sum(s['staked'] for s in steps)
+    pnl = sum(s['pnl'] for s in steps)
+    return {
+        'rounds': len(steps),
+        'matches': n,
+        'log_loss': sum(s['log_loss'] for s in steps) / n if n else None,
+        'brier': sum(s['brier'] for s in steps) / n if n else None,
+        'bets': sum(s['bets'] for s in steps),
+        'staked': staked,
+        'pnl': pnl,
+        'roi': pnl / staked if staked else None,
+        'fits': len(steps),
+        'seconds': seconds,
+        'errors': errors,
+    }
+
+
+def _league_job(job):
+    return walk_forward_league(*job)
+
+
+def run_walk_forward(leagues, start_params, mode='expanding', window=SLIDING_ROUNDS,
+                     min_train=MIN_TRAIN, min_edge=MIN_EDGE, processes=None):
+    """ Une ligue par processus ; résultats dans l'ordre des ligues """
+    # Cotes (re)construites une seule fois avant les workers, qui les relisent en mémoire mappée
+    odds_store.load_store()
+    jobs = [(lid, arrays, start_params, mode, window, min_train, min_edge)
+            for lid, arrays in leagues.items() if len(arrays['outcome']) >= min_train]
+    processes = min(processes or os.cpu_count(), len(jobs)) if jobs else 1
+    if processes <= 1:
+        results = [_league_job(job) for job in jobs]
+    else:
+        methods = mp.get_all_start_methods()
+        ctx = mp.get_context('fork' if 'fork' in methods else 'spawn')
+        with ctx.Pool(processes) as pool:
+            results = pool.map(_league_job, jobs, chunksize=1)
+
+    # Ligues sans aucune journée notée (jamais assez de matchs avant une journée)
+    scored = [r['league'] for r in results if r['steps']]
+    skipped = [lid for lid in leagues if lid not in scored]
+    results = [r for r in results if r['steps']]
+    all_steps = [s for r in results for s in r['steps']]
+    return {'mode': mode, 'window': window if mode == 'sliding' else None, 'min_edge': min_edge,
+            'leagues': results, 'skipped': skipped,
+            'total': summarize(all_steps, sum(r['summary']['seconds'] for r in results))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest walk-forward avec ré-ajustement journée par journée")
+    parser.add_argument('--leagues', nargs='+', help="Défaut : ligues de l'archive ClubElo (toutes avec --native-elo)")
+    parser.add_argument('--native-elo', action='store_true',
+                        help="Elo rejoué depuis l'historique (native_elo) : toutes les ligues sont notables")
+    parser.add_argument('--mode', choices=['expanding', 'sliding'], default='expanding')
+    parser.add_argument('--window', type=int, default=SLIDING_ROUNDS, help="Journées de la fenêtre glissante")
+    parser.add_argument('--xg-window', type=int, default=xg_features.DEFAULT_WINDOW)
+    parser.add_argument('--min-train', type=int, default=MIN_TRAIN)
+    parser.add_argument('--min-edge', type=float, default=MIN_EDGE)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="Processus en parallèle")
+    parser.add_argument('--output', default=RESULTS_FILE)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    start_params = model.load_params()
+    if args.native_elo:
+        # Paramètres du moteur de best_params.json (fit --native-elo), valeurs par défaut sinon
+        archive, elo_params = None, dict(native_elo.DEFAULT_PARAMS, **{
+            name: value for name, value in (start_params or {}).items() if name in native_elo.ELO_PARAM_BOUNDS})
+    else:
+        archive, elo_params = load_archive(), None
+    leagues = load_league_arrays(args.leagues or default_leagues(archive), archive, args.xg_window, elo_params)
+    report = run_walk_forward(leagues, start_params, args.mode, args.window,
+                              args.min_train, args.min_edge, args.jobs)
+
+    for r in report['leagues']:
+        s = r['summary']
+        roi = f"{s['roi'] * 100:+.1f}%" if s['roi'] is not None else "-"
+        print(f"   🏆 {r['league']:>4} : {s['rounds']} journées, {s['matches']} matchs, "
+              f"log-loss {s['log_loss']:.4f}, Brier {s['brier']:.4f}, {s['bets']} paris, ROI {roi}")
+    # Ligues écartées : sans aucun xG (rien à noter quelle que soit la source Elo) ou trop peu de matchs
+    no_xg = [lid for lid in report['skipped'] if not len(leagues[lid]['outcome']) and leagues[lid]['errors']['no_xg']]
+    too_few = [lid for lid in report['skipped'] if lid not in no_xg]
+    if no_xg:
+        print(f"   ⚠️ Ligues sans xG : {', '.join(no_xg)}")
+    if too_few:
+        print(f"   ⚠️ Ligues sans assez de matchs évaluables : {', '.join(too_few)}")
+    t = report['total']
+    if t['matches']:
+        print(f"✅ Total : {t['matches']} matchs notés, log-loss {t['log_loss']:.4f}, Brier {t['brier']:.4f}, "
+              f"{t['bets']} paris, P&L {t['pnl']:+.2f} u ({time.perf_counter() - started:.1f}s)")
+
+    tmp_path = args.output + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, args.output)
+    print(f"📁 Fichier créé : {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import numpy as np
+
+# Moyennes glissantes par équipe, calculées avant chaque match (sans fuite du futur).
+# Une seule passe chronologique sur la table : chaque équipe a un tampon circulaire
+# de MAX_WINDOW valeurs (xG pour, xG contre, buts encaissés). Pour chaque match on
+# garde les sommes cumulées des k derniers matchs (k = 1..MAX_WINDOW), si bien que
+# la moyenne sur n'importe quelle fenêtre w <= MAX_WINDOW est une simple lecture
+# de colonne : la fenêtre peut devenir un paramètre Optuna sans rien recalculer.
+
+MAX_WINDOW = 12
+DEFAULT_WINDOW = 8  # Même fenêtre que xg-backtest.js
+
+STATS = ['xg_for', 'xg_against', 'goals_against']
+
+
+def build_features(table, max_window=MAX_WINDOW):
+    """ Sommes cumulées pré-match (N, max_window) par stat et par côté, plus la profondeur d'historique """
+    n = len(table['fixture_id'])
+    n_teams = len(table['team_ids'])
+    home, away = table['home'], table['away']
+
+    # Valeurs postées par chaque côté après le match : (xG pour, xG contre, buts encaissés)
+    posted_h = np.stack([table['xg_h'], table['xg_a'], table['goals_a']], axis=1).astype(np.float32)
+    posted_a = np.stack([table['xg_a'], table['xg_h'], table['goals_h']], axis=1).astype(np.float32)
+    # Comme xg-backtest.js : l'historique n'avance que si le match a des stats xG
+    has_xg = ~(np.isnan(table['xg_h']) | np.isnan(table['xg_a']))
+
+    ring = np.zeros((n_teams, max_window, len(STATS)), dtype=np.float32)
+    head = np.zeros(n_teams, dtype=np.int64)   # prochaine case à écrire
+    depth = np.zeros(n_teams, dtype=np.int64)  # nombre de valeurs présentes (<= max_window)
+
+    # Décalages pour relire le tampon du plus récent au plus ancien
+    back = np.arange(1, max_window + 1)
+    recent = {'h': np.zeros((n, max_window, len(STATS)), dtype=np.float32),
+              'a': np.zeros((n, max_window, len(STATS)), dtype=np.float32)}
+    count = {'h': np.zeros(n, dtype=np.int16), 'a': np.zeros(n, dtype=np.int16)}
+
+    for i in range(n):
+        for side, team in (('h', home[i]), ('a', away[i])):
+            recent[side][i] = ring[team, (head[team] - back) % max_window]
+            count[side][i] = depth[team]
+
+        if has_xg[i]:
+            for team, values in ((home[i], posted_h[i]), (away[i], posted_a[i])):
+                ring[team, head[team]] = values
+                head[team] = (head[team] + 1) % max_window
+                depth[team] = min(depth[team] + 1, max_window)
+
+    features = {'max_window': max_window}
+    for side in ('h', 'a'):
+        # Cases au-delà de la profondeur réelle : zéro, elles ne sont jamais lues seules
+        valid = back[None, :] <= count[side][:, None]
+        cum = np.cumsum(recent[side] * valid[:, :, None], axis=1)
+        for k, stat in enumerate(STATS):
+            features[f'cum_{stat}_{side}'] = cum[:, :, k]
+        features[f'count_{side}'] = count[side]
+    return features
+
+
+def rolling_features(features, window=DEFAULT_WINDOW):
+    """ Moyennes sur les `window` derniers matchs de chaque équipe (NaN si historique trop court) """
+    if not 1 <= window <= features['max_window']:
+        raise ValueError(f"Fenêtre {window} hors de [1, {features['max_window']}]")
+
+    out = {}
+    for side in ('h', 'a'):
+        enough = features[f'count_{side}'] >= window
+        for stat in STATS:
+            mean = features[f'cum_{stat}_{side}'][:, window - 1] / window
+            out[f'avg_{stat}_{side}'] = np.where(enough, mean, np.nan).astype(np.float32)
+    return out